@@ -3,7 +3,13 @@ import torch.nn as nn
 import numpy as np
 import matplotlib.pyplot as plt
 from src.airfoil2D.generate_naca import generate_naca4
-from shapely.geometry import Point, Polygon
+from src.airfoil2D.pinn_geometry import AirfoilMask, naca4_batch, airfoil_polygon, polygon_distance, panel_geometry, check_fractions
+from src.airfoil2D.pinn_sampling import CollocationPool, ResidualSampler
+from src.airfoil2D.pinn_checkpoint import CheckpointWriter, load_checkpoint, rng_state, set_rng_state
+from src.airfoil2D.pinn_distributed import get_rank, get_world_size, shard, broadcast_model, all_reduce_, all_reduce_gradients, all_gather, all_gather_object, launch
+from src.airfoil2D.pinn_subdomains import SUBDOMAIN_BOXES, SUBDOMAIN_NAMES, subdomain_index, interface_points
+from src.airfoil2D.pinn_profiler import PhaseProfiler, profile_phase
+from src.airfoil2D.pinn_cache import TensorCache
 import argparse
 try:
     import pyvista as pv
@@ -68,6 +74,8 @@ class Normalizer:
 
 # --- 1. PINN Architecture (MLP with SiLU with Fourier Embedding) ---
 hidden_layer = 128 
+# Memory bound of the spatial latent cached per model for inference (see predict)
+SPATIAL_CACHE_MB = 1024
 
 class FourierEmbedding(nn.Module):
     """
@@ -84,6 +92,7 @@ class FourierEmbedding(nn.Module):
         super().__init__()
         freqs = 2**torch.linspace(0, n_freq-1, n_freq)
         self.register_buffer('freqs',freqs)
+        self.out_features = 2*2*n_freq
 
     def forward(self,x):
         """
@@ -98,70 +107,1008 @@ class FourierEmbedding(nn.Module):
         x_proj = x.unsqueeze(-1) * self.freqs
         return torch.cat([torch.sin(x_proj), torch.cos(x_proj)], dim=1).flatten(1)    
 
+    def jet(self, xy, order=2):
+        """
+        Embedding and its exact derivatives along x and y (see taylor_derivatives).
+
+        Args:
+            xy (torch.Tensor): Coordinates [N, 2].
+            order (int): 1 for the first derivatives only, 2 to add the second derivatives.
+
+        Returns:
+            tuple: (h [N, H], dh [2, N, H], d2h [2, N, H] or None).
+        """
+        freqs = self.freqs
+        proj = xy.unsqueeze(-1) * freqs
+        sin, cos = torch.sin(proj), torch.cos(proj)
+        zero = torch.zeros_like(sin[:,0])
+
+        # Embedding features are ordered (sin x, sin y, cos x, cos y), each with n_freq columns
+        h = torch.cat([sin, cos], dim=1).flatten(1)
+        dh = torch.stack([
+            torch.stack([freqs*cos[:,0], zero, -freqs*sin[:,0], zero], dim=1).flatten(1),
+            torch.stack([zero, freqs*cos[:,1], zero, -freqs*sin[:,1]], dim=1).flatten(1),
+        ])
+        d2h = None
+        if order == 2:
+            freqs2 = freqs**2
+            d2h = torch.stack([
+                torch.stack([-freqs2*sin[:,0], zero, -freqs2*cos[:,0], zero], dim=1).flatten(1),
+                torch.stack([zero, -freqs2*sin[:,1], zero, -freqs2*cos[:,1]], dim=1).flatten(1),
+            ])
+        return h, dh, d2h
+
+class HashGridEncoding(nn.Module):
+    """
+    Multiresolution hash-grid encoding of (x, y) (Instant-NGP), in plain PyTorch.
+
+    Each level is a regular grid over the domain with a trainable feature vector per vertex,
+    stored in a table of its own (vertices are hashed into the table once the grid is larger).
+    A point gets, for every level, the blend of the features of the 4 vertices of its cell.
+    The blend uses smoothstep weights instead of bilinear ones: a bilinear blend is piecewise
+    linear, so its second derivatives (the viscous terms) would vanish inside every cell.
+    """
+    def __init__(self, bounds, n_levels=16, n_features=2, log2_table_size=14, base_resolution=8, max_resolution=256):
+        """
+        Initializes the grids.
+
+        Args:
+            bounds (tuple): Domain (x_min, x_max, y_min, y_max); points outside are clamped to it.
+            n_levels (int): Number of grid resolutions.
+            n_features (int): Features per vertex.
+            log2_table_size (int): Log2 of the number of entries of each level's table.
+            base_resolution, max_resolution (int): Cells along the longest side of the domain on the
+                                                   coarsest and finest levels (geometric progression).
+        """
+        super().__init__()
+        growth = (max_resolution / base_resolution)**(1 / max(n_levels - 1, 1))
+        resolutions = torch.floor(base_resolution * growth**torch.arange(n_levels, dtype=torch.float64))
+        extent = torch.tensor([bounds[1] - bounds[0], bounds[3] - bounds[2]], dtype=torch.float64)
+        # Square cells: the scale (cells per unit length) is shared by x and y
+        scale = resolutions[:, None] / extent.max()
+        self.register_buffer('origin', torch.tensor([bounds[0], bounds[2]], dtype=torch.float32))
+        self.register_buffer('scale', scale.float())
+        self.register_buffer('cells', torch.ceil(scale * extent).long())
+        self.tables = nn.Parameter(torch.empty(n_levels, 2**log2_table_size, n_features).uniform_(-1e-4, 1e-4))
+        self.out_features = n_levels*n_features
+
+    def forward(self, x):
+        """
+        Encodes the input coordinates.
+
+        Args:
+            x (torch.Tensor): Input coordinates [N, 2].
+
+        Returns:
+            torch.Tensor: Encoded features [N, n_levels*n_features].
+        """
+        return self.jet(x, order=0)[0]
+
+    def jet(self, xy, order=2):
+        """
+        Encoding and its exact derivatives along x and y (see taylor_derivatives).
+
+        Args:
+            xy (torch.Tensor): Coordinates [N, 2].
+            order (int): 0 for the encoding only, 1 to add the first derivatives, 2 the second ones.
+
+        Returns:
+            tuple: (h [N, H], dh [2, N, H] or None, d2h [2, N, H] or None).
+        """
+        n_levels, table_size, n_features = self.tables.shape
+        # Position in cell units per level [N, L, 2], integer cell and smoothstep weight of its upper vertex
+        pos = torch.minimum(torch.clamp((xy.unsqueeze(1) - self.origin) * self.scale, min=0), self.cells.to(xy.dtype))
+        cell = torch.minimum(torch.floor(pos).long(), self.cells - 1)
+        f = pos - cell
+        w1 = f*f*(3 - 2*f)
+
+        # Vertex indices of the 4 corners (dx, dy) = (0,0), (1,0), (0,1), (1,1) [N, L, 4]
+        corner = torch.tensor([[0, 0], [1, 0], [0, 1], [1, 1]], device=xy.device)
+        vertex = cell.unsqueeze(2) + corner
+        ix, iy = vertex[..., 0], vertex[..., 1]
+        width = (self.cells[:, 0] + 1)[:, None]
+        dense = ((self.cells + 1).prod(1) <= table_size)[:, None]
+        index = torch.where(dense, ix + iy*width, (ix ^ (iy*2654435761)) & (table_size - 1))
+        index = index + torch.arange(n_levels, device=xy.device)[:, None]*table_size
+        features = self.tables.reshape(-1, n_features)[index]
+
+        # Corner weights and their derivatives, per axis [N, L, 4, 2]
+        sign = 2*corner - 1
+        w = torch.where(corner.bool(), w1.unsqueeze(2), 1 - w1.unsqueeze(2))
+
+        def blend(weights):
+            return (weights.unsqueeze(-1)*features).sum(2).flatten(1)
+
+        h = blend(w[..., 0]*w[..., 1])
+        if order == 0:
+            return h, None, None
+        dw = sign * (6*f*(1 - f)*self.scale).unsqueeze(2)
+        dh = torch.stack([blend(dw[..., 0]*w[..., 1]), blend(w[..., 0]*dw[..., 1])])
+        d2h = None
+        if order == 2:
+            d2w = sign * ((6 - 12*f)*self.scale**2).unsqueeze(2)
+            d2h = torch.stack([blend(d2w[..., 0]*w[..., 1]), blend(w[..., 0]*d2w[..., 1])])
+        return h, dh, d2h
+
 class PINN(nn.Module):
     """
     Physics-Informed Neural Network (PINN) model architecture for predicting 
     fluid flow (u, v, p) around an airfoil based on spatial and parametric inputs.
     """
-    def __init__(self):
+    def __init__(self, geometric=False, constraint=None, encoder='fourier', hidden=hidden_layer):
         """
         Initializes the PINN architecture with a local spatial network, 
         a global parametric network, and an output combination layer.
+
+        Args:
+            geometric (bool): Condition the parametric branch on (alpha, m, p, t) instead of alpha
+                              only, so one model covers the NACA 4-digit family.
+            constraint (HardBoundary, optional): Output transform imposing the Dirichlet
+                                                 conditions exactly.
+            encoder (str): Spatial encoder of the local branch, 'fourier' (FourierEmbedding) or
+                           'hash' (trainable HashGridEncoding over the domain).
+            hidden (int): Width of the hidden layers.
         """
         super(PINN, self).__init__()
-        self.register_buffer('mu', torch.zeros(3))
-        self.register_buffer('sigma', torch.ones(3))
-        self.fourier_xy = FourierEmbedding(n_freq=6)
+        self.geometric = geometric
+        self.constraint = constraint
+        self.encoding = encoder
+        self.hidden = hidden
+        # bf16 mode (see enable_bf16): Linear layers under autocast, everything else in fp32
+        self.mixed_precision = False
+        # Spatial latent of the inference point sets, reused across angles (see predict)
+        self.feature_cache = TensorCache(SPATIAL_CACHE_MB * 2**20)
+        n_cond = 4 if geometric else 1
+        # Normalization statistics of (x, y, alpha) or (x, y, alpha, m, p, t)
+        self.register_buffer('mu', torch.zeros(2 + n_cond))
+        self.register_buffer('sigma', torch.ones(2 + n_cond))
+        if encoder == 'hash':
+            self.hash_xy = HashGridEncoding((x_min, x_max, y_min, y_max))
+        else:
+            self.fourier_xy = FourierEmbedding(n_freq=6)
         self.local_net = nn.Sequential(
-            nn.Linear(2*2*6, hidden_layer),
+            nn.Linear(self.encoder.out_features, hidden),
             nn.SiLU(),
-            nn.Linear(hidden_layer, hidden_layer),
+            nn.Linear(hidden, hidden),
             nn.SiLU(),
-            nn.Linear(hidden_layer, hidden_layer),
+            nn.Linear(hidden, hidden),
             nn.SiLU(),
-            nn.Linear(hidden_layer, hidden_layer),
+            nn.Linear(hidden, hidden),
             nn.SiLU(),
-            nn.Linear(hidden_layer, hidden_layer),
+            nn.Linear(hidden, hidden),
             nn.SiLU(),
-            nn.Linear(hidden_layer, hidden_layer),
+            nn.Linear(hidden, hidden),
         )
         self.global_net = nn.Sequential(
-            nn.Linear(1, hidden_layer),
+            nn.Linear(n_cond, hidden),
             nn.SiLU(),
-            nn.Linear(hidden_layer, hidden_layer),
+            nn.Linear(hidden, hidden),
         )
         self.output_net = nn.Sequential(
-            nn.Linear(hidden_layer, hidden_layer),
+            nn.Linear(hidden, hidden),
             nn.SiLU(),
-            nn.Linear(hidden_layer, 3)
+            nn.Linear(hidden, 3)
         )
 
+    @property
+    def encoder(self):
+        """
+        Spatial encoder of the local branch.
+        """
+        return self.hash_xy if self.encoding == 'hash' else self.fourier_xy
+
     def forward(self, x, y, alpha):
         """
-        Forward pass for predicting flow fields.
+        Forward pass for predicting flow fields (network output, then the hard-constraint
+        transform if any).
 
         Args:
             x (torch.Tensor): Spatial x-coordinates.
             y (torch.Tensor): Spatial y-coordinates.
-            alpha (torch.Tensor): Angle of attack (AOA).
+            alpha (torch.Tensor): Angle of attack (AOA) [N, 1], or the (alpha, m, p, t)
+                                  conditioning [N, 4] of a geometric model (see conditioning).
 
         Returns:
             torch.Tensor: Predicted flow components [u, v, p].
         """
+        out = self.network(x, y, alpha)
+        if self.constraint is not None:
+            out = self.constraint(out, x, y, alpha)
+        return out
+
+    def network(self, x, y, alpha):
+        """
+        Raw network output, before any output transform.
+
+        Args:
+            x (torch.Tensor): Spatial x-coordinates.
+            y (torch.Tensor): Spatial y-coordinates.
+            alpha (torch.Tensor): Angle of attack (AOA) [N, 1], or the (alpha, m, p, t)
+                                  conditioning [N, 4] of a geometric model (see conditioning).
+
+        Returns:
+            torch.Tensor: Predicted flow components [u, v, p].
+        """
+        return self.head(self.spatial_features(x, y), alpha)
+
+    def spatial_features(self, x, y):
+        """
+        Spatial latent: output of the local branch, which only depends on the position.
+
+        Args:
+            x, y (torch.Tensor): Spatial coordinates [N, 1].
+
+        Returns:
+            torch.Tensor: Latent [N, hidden].
+        """
         # Concatenate x and y for the network input
         inputs_local = torch.cat([x, y], dim=1)
-        alpha_norm = (alpha - self.mu[2:3]) / self.sigma[2:3]
+        with torch.autocast(x.device.type, dtype=torch.bfloat16, enabled=self.mixed_precision):
+            return self.local_net(self.encoder(inputs_local))
+
+    def head(self, spatial, alpha):
+        """
+        Raw network output from the spatial latent: parametric branch, elementwise product
+        and output layers.
+
+        Args:
+            spatial (torch.Tensor): Spatial latent [N, hidden] (see spatial_features).
+            alpha (torch.Tensor): Angle of attack (or geometric conditioning) [N, 1], or a single
+                                  row [1, 1] shared by every point.
+
+        Returns:
+            torch.Tensor: Predicted flow components [u, v, p].
+        """
+        alpha_norm = (alpha - self.mu[2:]) / self.sigma[2:]
+
+        with torch.autocast(spatial.device.type, dtype=torch.bfloat16, enabled=self.mixed_precision):
+            param = self.global_net(alpha_norm)
 
-        spatial_fourier = self.fourier_xy(inputs_local)
-        spatial = self.local_net(spatial_fourier)
-        param = self.global_net(alpha_norm)
+            combined = spatial*param
 
-        combined = spatial*param
+            out = self.output_net(combined)
+        return out.float()
 
-        return self.output_net(combined)
+    def latent_bytes(self, n_points, order=0):
+        """
+        Memory of the spatial latent of n_points in fp32, with its x and y derivatives for
+        order 1 (see predict and surface_derivatives), used to bypass a cache it would not fit in.
+        """
+        return n_points * self.local_net[-1].out_features * 4 * (3 if order else 1)
+
+def _jet_mul(a, b):
+    """
+    Product of two fields stacked with their derivatives (value, d/dx, d/dy, d2/dx2, d2/dy2) on dim 0.
+    """
+    return torch.stack([a[0]*b[0],
+                        a[1]*b[0] + a[0]*b[1],
+                        a[2]*b[0] + a[0]*b[2],
+                        a[3]*b[0] + 2*a[1]*b[1] + a[0]*b[3],
+                        a[4]*b[0] + 2*a[2]*b[2] + a[0]*b[4]])
+
+def _jet_inv(a):
+    """
+    Reciprocal of a field stacked with its derivatives, see _jet_mul.
+    """
+    r = 1 / a[0]
+    return torch.stack([r, -r**2*a[1], -r**2*a[2], 2*r**3*a[1]**2 - r**2*a[3], 2*r**3*a[2]**2 - r**2*a[4]])
+
+class HardBoundary(nn.Module):
+    """
+    Output transform imposing the Dirichlet conditions exactly (distance-function hard constraints,
+    Sukumar & Srivastava, 2022):
+
+        (u, v) = U_inf (cos alpha, sin alpha) * phi + D * (N_u, N_v),    p = N_p
+
+    D = d_wall * d_outer vanishes on the airfoil polygon and on the inlet, bottom and top sides,
+    phi = d_wall / (d_wall + d_outer) goes from 0 on the wall (no-slip) to 1 on those sides
+    (freestream). Only the outlet condition is left to the loss.
+
+    d_wall is the distance to a coarse polygon of the contour (airfoil_polygon), d_outer the
+    R-equivalence of the distances to the three sides. Their derivatives are in closed form,
+    so the transform adds no functorch pass to calc_derivatives; for a fixed batch they are
+    computed once (see constrain_batch).
+    """
+    def __init__(self, vertices, u_inf=0.3):
+        """
+        Args:
+            vertices (torch.Tensor): Closed airfoil polygon [S + 1, 2] (see airfoil_polygon).
+            u_inf (float): Freestream velocity of the Dirichlet sides.
+        """
+        super().__init__()
+        self.register_buffer('vertices', torch.as_tensor(vertices, dtype=torch.float32))
+        self.u_inf = u_inf
+
+    def fields(self, x, y, order=2):
+        """
+        Blending function phi and distance function D at the given points.
+
+        Args:
+            x, y (torch.Tensor): Spatial coordinates [N, 1].
+            order (int): 0 for the values only, 2 to add the derivatives.
+
+        Returns:
+            torch.Tensor: [1, N, 2] values of (phi, D) for order 0, or [5, N, 2] stacked
+                          (value, d/dx, d/dy, d2/dx2, d2/dy2) for order 2.
+        """
+        d_wall = polygon_distance(x, y, self.vertices, order=order)
+
+        # Distances to the inlet, bottom and top sides (linear fields)
+        zero, one = torch.zeros_like(x), torch.ones_like(x)
+        inlet = torch.stack([x - x_min, one, zero, zero, zero])
+        bottom = torch.stack([y - y_min, zero, one, zero, zero])
+        top = torch.stack([y_max - y, zero, -one, zero, zero])
+        # R-equivalence 1 / (1/a + 1/b + 1/c), written as abc / (ab + bc + ca) to stay finite on the sides
+        product = _jet_mul(_jet_mul(inlet, bottom), top)
+        pairs = _jet_mul(inlet, bottom) + _jet_mul(bottom, top) + _jet_mul(top, inlet)
+        pairs = torch.cat([pairs[:1].clamp(min=1e-12), pairs[1:]])
+        d_outer = _jet_mul(product, _jet_inv(pairs))
+        if order == 0:
+            d_outer = d_outer[:1]
+            return torch.cat([d_wall / (d_wall + d_outer), d_wall * d_outer], dim=2)
+
+        phi = _jet_mul(d_wall, _jet_inv(d_wall + d_outer))
+        return torch.cat([phi, _jet_mul(d_wall, d_outer)], dim=2)
+
+    def compose(self, derivatives, fields, alpha):
+        """
+        Applies the transform to raw network outputs and derivatives.
+
+        Args:
+            derivatives (tuple): Raw (out, d_dx, d_dy[, d2_dx2, d2_dy2]) as returned by calc_derivatives.
+            fields (torch.Tensor): Output of fields() at the same points.
+            alpha (torch.Tensor): Angle of attack per point [N, 1] (first column of the conditioning).
+
+        Returns:
+            tuple: The transformed outputs and derivatives, same layout.
+        """
+        alpha = alpha[:,0:1]
+        freestream = self.u_inf*torch.cat([torch.cos(alpha), torch.sin(alpha), torch.zeros_like(alpha)], dim=1)
+        phi = fields[..., 0:1]
+        # D multiplies the velocity outputs only, the pressure is left free
+        velocity = torch.tensor([1.0, 1.0, 0.0], device=fields.device)
+        scale = fields[..., 1:2]*velocity
+
+        out = derivatives[0]
+        result = [freestream*phi[0] + (scale[0] + 1 - velocity)*out]
+        for k in (1, 2):
+            if len(derivatives) > k:
+                result.append(freestream*phi[k] + scale[k]*out + (scale[0] + 1 - velocity)*derivatives[k])
+        for k in (3, 4):
+            if len(derivatives) > k:
+                result.append(freestream*phi[k] + scale[k]*out + 2*scale[k - 2]*derivatives[k - 2] + (scale[0] + 1 - velocity)*derivatives[k])
+        return tuple(result)
+
+    def forward(self, out, x, y, alpha):
+        """
+        Transforms raw network outputs [N, 3] into (u, v, p) satisfying the Dirichlet conditions.
+        """
+        return self.compose((out,), self.fields(x, y, order=0), alpha)[0]
+
+class XPINN(nn.Module):
+    """
+    Domain-decomposed PINN (XPINN): one PINN per subdomain, each trained in its own process
+    and coupled to its neighbours through interface losses (see train_xpinn).
+    Predictions are stitched: every point is evaluated by the network of its subdomain.
+    """
+    def __init__(self, boxes, networks):
+        """
+        Args:
+            boxes (sequence): Subdomain boxes [B, 4] (see subdomain_index).
+            networks (list): B + 1 PINN, one per box and the last one for the far field.
+        """
+        super().__init__()
+        self.register_buffer('boxes', torch.as_tensor(boxes, dtype=torch.float32))
+        self.networks = nn.ModuleList(networks)
+        self.geometric = networks[0].geometric
+        self.constraint = None
+
+    def stitch(self, fn, x, y):
+        """
+        Evaluates fn(network, selection) on the points of each subdomain and scatters the results.
+
+        Args:
+            fn (callable): Returns a tuple of [n, 3] tensors for the selected points.
+            x, y (torch.Tensor): Point coordinates [N, 1].
+
+        Returns:
+            tuple: The [N, 3] tensors, in the order returned by fn.
+        """
+        index = subdomain_index(x, y, self.boxes)
+        results = None
+        for i, network in enumerate(self.networks):
+            selection = index == i
+            if not selection.any():
+                continue
+            parts = fn(network, selection)
+            if results is None:
+                results = [part.new_zeros(x.shape[0], part.shape[1]) for part in parts]
+            for result, part in zip(results, parts):
+                result[selection] = part
+        return tuple(results)
+
+    def forward(self, x, y, alpha):
+        """
+        Stitched prediction of the subdomain networks.
+
+        Args:
+            x, y (torch.Tensor): Spatial coordinates [N, 1].
+            alpha (torch.Tensor): Angle of attack (or geometric conditioning) per point.
+
+        Returns:
+            torch.Tensor: Predicted flow components [u, v, p].
+        """
+        return self.stitch(lambda network, sel: (network(x[sel], y[sel], alpha[sel]),), x, y)[0]
+
+    def derivatives(self, x, y, alpha, order=2):
+        """
+        Stitched outputs and spatial derivatives (see calc_derivatives).
+        """
+        return self.stitch(lambda network, sel: calc_derivatives(network, x[sel], y[sel], alpha[sel], order), x, y)
+
+def _build_pinn(state):
+    """
+    PINN matching a saved state dict: alpha-only or geometric parametric branch, hidden width,
+    spatial encoder and hard-constraint transform.
+    """
+    constraint = HardBoundary(state['constraint.vertices']) if 'constraint.vertices' in state else None
+    return PINN(geometric=state['global_net.0.weight'].shape[1] == 4, constraint=constraint,
+                encoder='hash' if 'hash_xy.tables' in state else 'fourier',
+                hidden=state['global_net.0.weight'].shape[0])
+
+def load_model(path, device):
+    """
+    Loads a PINN state dict, building the alpha-only or the geometric architecture
+    from the shape of the parametric branch, with the spatial encoder and the
+    hard-constraint transform that were saved. A domain-decomposed checkpoint
+    (train_xpinn) gives an XPINN of the saved subdomain networks.
+
+    Args:
+        path (str): Path to the model .pth.
+        device (torch.device): Computing device.
+
+    Returns:
+        PINN or XPINN: The model with its weights loaded.
+    """
+    state = torch.load(path, map_location=device)
+    if 'boxes' in state:
+        networks = []
+        for i in range(state['boxes'].shape[0] + 1):
+            prefix = f"networks.{i}."
+            networks.append(_build_pinn({k[len(prefix):]: v for k, v in state.items() if k.startswith(prefix)}))
+        model = XPINN(state['boxes'], networks).to(device)
+    else:
+        model = _build_pinn(state).to(device)
+    model.load_state_dict(state)
+    return model
+
+def warm_start(model, path):
+    """
+    Initializes a model from an existing checkpoint for fine-tuning.
+
+    Matching tensors are copied. For a tensor whose shape changed, the overlapping block is
+    copied and the rest keeps its fresh initialization. The only exception is the first layer of
+    the parametric branch, whose new conditioning columns (e.g. m, p, t when going from an alpha
+    model to a geometric one) are zeroed so the model starts from the checkpoint's flow.
+    The mu/sigma buffers of the model, recomputed by the caller for the new data, are kept:
+    the first parametric layer is re-expressed for them so the alpha response is unchanged.
+    The hard-constraint polygon is never copied (it follows the current airfoil).
+
+    Args:
+        model (PINN): Freshly built model, with mu/sigma already set.
+        path (str): Checkpoint (.pth state dict) to start from.
+
+    Returns:
+        dict: Names of the 'copied', 'partial' (reshaped) and 'skipped' tensors.
+    """
+    source = torch.load(path, map_location=model.mu.device)
+    state = model.state_dict()
+    report = {'copied': [], 'partial': [], 'skipped': []}
+
+    with torch.no_grad():
+        for name, tensor in state.items():
+            if name in ('mu', 'sigma') or name.startswith('constraint.') or name not in source:
+                report['skipped'].append(name)
+                continue
+            saved = source[name].to(tensor.dtype)
+            if saved.shape == tensor.shape:
+                tensor.copy_(saved)
+                report['copied'].append(name)
+                continue
+            block = tuple(slice(0, min(a, b)) for a, b in zip(tensor.shape, saved.shape))
+            if name == 'global_net.0.weight':
+                tensor.zero_()
+            tensor[block] = saved[block]
+            report['partial'].append(name)
+
+        # Same pre-activation of the first parametric layer under the new normalization:
+        # W' = W sigma_new / sigma_old, b' = b + W (mu_new - mu_old) / sigma_old
+        n_cond = min(source['mu'].shape[0], model.mu.shape[0]) - 2
+        mu_old, sigma_old = source['mu'][2:2 + n_cond].to(model.mu.dtype), source['sigma'][2:2 + n_cond].to(model.mu.dtype)
+        mu_new, sigma_new = model.mu[2:2 + n_cond], model.sigma[2:2 + n_cond]
+        first = model.global_net[0]
+        weight = first.weight[:, :n_cond].clone()
+        first.bias += weight @ ((mu_new - mu_old) / sigma_old)
+        first.weight[:, :n_cond] = weight * sigma_new / sigma_old
+
+    return report
+
+def parameter_groups(model, lr, table_lr_scale=10.0):
+    """
+    AdamW parameter groups of a model. Hash-grid tables get a higher learning rate and no weight
+    decay: each entry is only updated by the few points falling in the cells around it.
+
+    Args:
+        model (PINN): The neural network model.
+        lr (float): Learning rate of the network weights.
+        table_lr_scale (float): Learning rate multiplier of the hash-grid tables.
+
+    Returns:
+        list: Parameter groups for torch.optim.AdamW (a single group for a Fourier model).
+    """
+    tables = [param for name, param in model.named_parameters() if name.startswith('hash_xy.')]
+    weights = [param for name, param in model.named_parameters() if not name.startswith('hash_xy.')]
+    groups = [{'params': weights, 'lr': lr}]
+    if tables:
+        groups.append({'params': tables, 'lr': lr*table_lr_scale, 'weight_decay': 0.0})
+    return groups
 
 # --- 2. Functions ---
-def calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model):
+def conditioning(model, x, alpha, m=None, p=None, t=None):
+    """
+    Builds the parametric input of the model for a set of points: the angle of attack,
+    plus the NACA parameters (as chord fractions, e.g. 0.02, 0.4, 0.12) for a geometric model.
+
+    Args:
+        model (PINN): The neural network model.
+        x (torch.Tensor): Point coordinates [N, 1], used for the shape and device.
+        alpha (float or torch.Tensor): Angle of attack in radians, scalar or per point [N, 1].
+        m, p, t (float, optional): NACA 4-digit parameters, required by a geometric model.
+
+    Returns:
+        torch.Tensor: [N, 1] angle column, or [N, 4] (alpha, m, p, t) columns.
+    """
+    if not torch.is_tensor(alpha):
+        alpha = torch.full_like(x, alpha)
+    if not model.geometric:
+        return alpha
+    return torch.cat([alpha, torch.full_like(x, m), torch.full_like(x, p), torch.full_like(x, t)], dim=1)
+
+def predict(model, x, y, alpha, m=None, p=None, t=None, cache_key=None):
+    """
+    Inference of (u, v, p) at a point set for one angle of attack.
+
+    The spatial branch does not depend on the angle: with a cache_key its latent (and the
+    hard-constraint fields) are kept in model.feature_cache, bounded by SPATIAL_CACHE_MB, and a
+    new angle on the same points only runs the parametric branch, once, and the output layers.
+    Entries are tied to the current weights: any in-place update of the model invalidates them.
+    A point set whose latent does not fit in the bound is evaluated without the cache.
+
+    Args:
+        model (PINN or XPINN): The neural network model.
+        x, y (torch.Tensor): Spatial coordinates [N, 1].
+        alpha (float): Angle of attack in radians.
+        m, p, t (float, optional): NACA 4-digit parameters, required by a geometric model.
+        cache_key (hashable, optional): Identifies the point set, e.g. ('grid', bounds, grid_size).
+                                        None evaluates the full model without caching.
+
+    Returns:
+        torch.Tensor: Predicted flow components [N, 3].
+    """
+    if isinstance(model, XPINN):
+        return model.stitch(lambda network, sel: (predict(network, x[sel], y[sel], alpha, m, p, t, cache_key),), x, y)[0]
+    with torch.no_grad():
+        # A latent larger than the cache bound would be computed, stored and dropped at every angle
+        if cache_key is None or not model.feature_cache.admit(model.latent_bytes(x.shape[0])):
+            return model(x, y, conditioning(model, x, alpha, m, p, t))
+
+        # Weights updated in place (training, load_state_dict) bump their version counters
+        versions = tuple(tensor._version for tensor in model.state_dict(keep_vars=True).values())
+        key = (cache_key, x.shape[0], x.device, versions)
+
+        def features():
+            fields = model.constraint.fields(x, y, order=0) if model.constraint is not None else None
+            return model.spatial_features(x, y), fields
+        spatial, fields = model.feature_cache.get_or_compute(key, features)
+
+        # One conditioning row, broadcast over the points
+        cond = conditioning(model, x[:1], alpha, m, p, t)
+        out = model.head(spatial, cond)
+        if model.constraint is not None:
+            out = model.constraint.compose((out,), fields, cond)[0]
+        return out
+
+def fits_feature_cache(model, n_points, order=0):
+    """
+    Whether the spatial latents of n_points (with their Jacobian for order 1) fit in the feature
+    cache, in the cache of every subdomain network for an XPINN. A refusal counts as a bypass.
+    """
+    networks = model.networks if isinstance(model, XPINN) else (model,)
+    return all([network.feature_cache.admit(network.latent_bytes(n_points, order)) for network in networks])
+
+def stream_field(model, bounds, grid_size, alpha, m=None, p=None, t=None, surface=None, tile_size=256, out=None, cache=True):
+    """
+    Generator evaluating (u, v, p) on a regular grid tile by tile, so memory stays bounded by
+    the tile size and the caller can consume (plot, save, reduce) tiles as they finish.
+
+    Each tile is written into the output array, which can be preallocated by the caller or be
+    a memory map (e.g. np.lib.format.open_memmap) for grids that do not fit in memory.
+    With cache, the spatial latent of each tile is kept for the next angle (see predict) when
+    the tiles of the whole grid fit in SPATIAL_CACHE_MB. Otherwise a sweep would evict every
+    tile before it is reused, so the grid is streamed without the cache.
+
+    Args:
+        model (PINN or XPINN): The neural network model.
+        bounds (tuple): Grid extents (x_min, x_max, y_min, y_max).
+        grid_size (int): Number of points per direction.
+        alpha (float): Angle of attack in radians.
+        m, p, t (float, optional): NACA 4-digit parameters, required by a geometric model.
+        surface (AirfoilMask, optional): Points inside the airfoil are set to NaN.
+        tile_size (int): Tile edge in grid points (tile_size**2 points per forward pass).
+        out (np.ndarray, optional): Output array [3, grid_size, grid_size] (u, v, p), float32 by
+                                    default; allocated when None.
+        cache (bool): Cache the spatial latent of the tiles.
+
+    Yields:
+        tuple: (tile_slice, u, v, p): the (rows, columns) slices of the tile in the grid, as in
+               np.meshgrid(x, y), and the tile values, views of out.
+    """
+    if out is None:
+        out = np.empty((3, grid_size, grid_size), dtype=np.float32)
+    x_grid = np.linspace(bounds[0], bounds[1], grid_size)
+    y_grid = np.linspace(bounds[2], bounds[3], grid_size)
+    device = next(model.parameters()).device
+    cache = cache and fits_feature_cache(model, grid_size**2)
+
+    model.eval()
+    for i in range(0, grid_size, tile_size):
+        for j in range(0, grid_size, tile_size):
+            tile_slice = (slice(i, min(i + tile_size, grid_size)), slice(j, min(j + tile_size, grid_size)))
+            X, Y = np.meshgrid(x_grid[tile_slice[1]], y_grid[tile_slice[0]])
+            x_tile = torch.tensor(X.reshape(-1, 1), dtype=torch.float32, device=device)
+            y_tile = torch.tensor(Y.reshape(-1, 1), dtype=torch.float32, device=device)
+
+            key = ('tile', tuple(bounds), grid_size, i, j, tile_size) if cache else None
+            values = predict(model, x_tile, y_tile, alpha, m, p, t, cache_key=key)
+            if surface is not None:
+                values[surface.contains(x_tile, y_tile).view(-1)] = float('nan')
+
+            tile = out[(slice(None),) + tile_slice]
+            tile[...] = values.T.reshape(tile.shape).cpu().numpy()
+            yield tile_slice, tile[0], tile[1], tile[2]
+
+def surface_derivatives(model, x, y, alpha, m=None, p=None, t=None, cache_key=None):
+    """
+    Outputs and first spatial derivatives at a fixed point set (e.g. the surface panels of
+    calc_force) for a batch of angles of attack.
+
+    The spatial branch does not depend on the angle: its latent and Jacobian with respect to
+    (x, y) are propagated once (see taylor_derivatives) and, with a cache_key, kept in
+    model.feature_cache (tied to the current weights, see predict). Each angle then only chains
+    the Jacobian through the parametric product and the output layers. The cached part is
+    computed without gradients; the angle part follows the current grad mode, so the results
+    can be differentiated with respect to alpha.
+
+    Args:
+        model (PINN or XPINN): The neural network model.
+        x, y (torch.Tensor): Spatial coordinates [N, 1].
+        alpha (torch.Tensor): Angles of attack in radians [A] or [A, 1].
+        m, p, t (float, optional): NACA 4-digit parameters, required by a geometric model.
+        cache_key (hashable, optional): Identifies the point set. None computes the spatial part
+                                        without caching it.
+
+    Returns:
+        tuple: (out, d_dx, d_dy), each [A, N, 3] with columns (u, v, p).
+    """
+    alpha = alpha.reshape(-1, 1).float()
+    n_alpha, n_points = alpha.shape[0], x.shape[0]
+    if isinstance(model, XPINN):
+        # Stitched as [n, A*3] columns, one subdomain network at a time
+        def subdomain(network, sel):
+            parts = surface_derivatives(network, x[sel], y[sel], alpha, m, p, t, cache_key)
+            return tuple(part.permute(1, 0, 2).reshape(part.shape[1], -1) for part in parts)
+        return tuple(part.view(n_points, n_alpha, 3).permute(1, 0, 2) for part in model.stitch(subdomain, x, y))
+
+    def features():
+        with torch.no_grad():
+            h, dh, _ = model.encoder.jet(torch.cat([x, y], dim=1), order=1)
+            h, dh, _ = _propagate(model.local_net, h, dh, None)
+            fields = model.constraint.fields(x, y) if model.constraint is not None else None
+        return h, dh, fields
+
+    if cache_key is None or not model.feature_cache.admit(model.latent_bytes(n_points, order=1)):
+        spatial, d_spatial, fields = features()
+    else:
+        versions = tuple(tensor._version for tensor in model.state_dict(keep_vars=True).values())
+        key = ('jacobian', cache_key, n_points, x.device, versions)
+        spatial, d_spatial, fields = model.feature_cache.get_or_compute(key, features)
+
+    # One parametric row per angle, broadcast over the points: [A, N, H] flattened angle-major
+    cond = conditioning(model, alpha, alpha, m, p, t)
+    param = model.global_net((cond - model.mu[2:]) / model.sigma[2:]).unsqueeze(1)
+    h = (spatial*param).reshape(n_alpha*n_points, -1)
+    dh = (d_spatial.unsqueeze(1)*param).reshape(2, n_alpha*n_points, -1)
+    out, dh, _ = _propagate(model.output_net, h, dh, None)
+    derivatives = (out, dh[0], dh[1])
+    if model.constraint is not None:
+        derivatives = model.constraint.compose(derivatives, fields.repeat(1, n_alpha, 1), cond.repeat_interleave(n_points, dim=0))
+    return tuple(d.view(n_alpha, n_points, 3) for d in derivatives)
+
+def calc_derivatives(model, x, y, alpha, order=2, fields=None):
+    """
+    Computes the PINN outputs and their spatial derivatives in a single batched pass.
+
+    Each output row only depends on its own input point, so a forward-mode jvp with a
+    unit tangent along x (or y) returns that derivative at every point at once. Nesting
+    the jvp gives the Hessian diagonal, and vmap evaluates both directions together.
+    In bf16 mode (enable_bf16) the explicit taylor_derivatives pass is used instead, with the
+    Linear layers in bf16 and the chain rule in fp32.
+    With a hard-constrained model the transform is applied to the raw derivatives in closed form.
+
+    Args:
+        model (PINN): The neural network model.
+        x, y (torch.Tensor): Spatial coordinates [N, 1].
+        alpha (float or torch.Tensor): Angle of attack, scalar or per point [N, 1].
+        order (int): 1 for the Jacobian only, 2 to add the second derivatives.
+        fields (torch.Tensor, optional): Precomputed HardBoundary.fields at these points.
+
+    Returns:
+        tuple: (out, d_dx, d_dy) for order 1, (out, d_dx, d_dy, d2_dx2, d2_dy2) for order 2.
+               Every tensor is [N, 3] with columns (u, v, p).
+    """
+    if not torch.is_tensor(alpha):
+        alpha = torch.full_like(x, alpha)
+    if isinstance(model, XPINN):
+        return model.derivatives(x, y, alpha, order)
+    if model.mixed_precision:
+        derivatives = taylor_derivatives(model, x, y, alpha, order, autocast=True)
+    elif getattr(model, 'compiled_derivatives', None) is not None:
+        derivatives = model.compiled_derivatives(model, x, y, alpha, order)
+    else:
+        derivatives = network_derivatives(model, x, y, alpha, order)
+    if model.constraint is None:
+        return derivatives
+    if fields is None:
+        fields = model.constraint.fields(x, y)
+    return model.constraint.compose(derivatives, fields, alpha)
+
+def network_derivatives(model, x, y, alpha, order=2):
+    """
+    Eager forward-mode derivatives of the raw network output (see calc_derivatives).
+
+    Args:
+        model (PINN): The neural network model.
+        x, y (torch.Tensor): Spatial coordinates [N, 1].
+        alpha (torch.Tensor): Angle of attack per point [N, 1].
+        order (int): 1 for the Jacobian only, 2 to add the second derivatives.
+
+    Returns:
+        tuple: As calc_derivatives.
+    """
+    inputs = torch.cat([x, y], dim=1).detach()
+
+    def field(xy):
+        return model.network(xy[:,0:1], xy[:,1:2], alpha)
+
+    def directional(tangent):
+        def first(xy):
+            return torch.func.jvp(field, (xy,), (tangent,))
+        if order == 1:
+            return first(inputs)
+        (out, d1), (_, d2) = torch.func.jvp(first, (inputs,), (tangent,))
+        return out, d1, d2
+
+    # One unit tangent per spatial direction, batched by vmap
+    tangents = torch.eye(2, dtype=inputs.dtype, device=inputs.device)[:, None, :].expand(-1, inputs.shape[0], -1)
+    results = torch.func.vmap(directional)(tangents)
+
+    out = results[0][0]
+    d_dx, d_dy = results[1][0], results[1][1]
+    if order == 1:
+        return out, d_dx, d_dy
+    d2_dx2, d2_dy2 = results[2][0], results[2][1]
+    return out, d_dx, d_dy, d2_dx2, d2_dy2
+
+def _propagate(net, h, dh, d2h, autocast=False):
+    """
+    Pushes values and spatial derivatives through a Linear/SiLU stack.
+
+    Args:
+        net (nn.Sequential): Stack of nn.Linear and nn.SiLU layers.
+        h (torch.Tensor): Layer input [N, H].
+        dh, d2h (torch.Tensor): First and second derivatives of h along x and y [2, N, H] (d2h may be None).
+        autocast (bool): Run the Linear layers on the values in bf16 (outputs cast back to fp32).
+                         The derivatives are propagated in fp32: they feed the second derivatives
+                         of the Navier-Stokes residual.
+
+    Returns:
+        tuple: (h, dh, d2h) at the output of the stack.
+    """
+    for layer in net:
+        if isinstance(layer, nn.Linear):
+            with torch.autocast(h.device.type, dtype=torch.bfloat16, enabled=autocast):
+                h = layer(h).float()
+            weight = layer.weight.float()
+            dh = dh @ weight.T
+            d2h = d2h @ weight.T if d2h is not None else None
+        elif isinstance(layer, nn.SiLU):
+            s = torch.sigmoid(h)
+            ds = s*(1 + h*(1 - s))
+            if d2h is not None:
+                d2h = s*(1 - s)*(2 + h*(1 - 2*s))*dh**2 + ds*d2h
+            dh = ds*dh
+            h = h*s
+        else:
+            raise TypeError(f"Unsupported layer for derivative propagation: {type(layer).__name__}")
+    return h, dh, d2h
+
+def taylor_derivatives(model, x, y, alpha, order=2, autocast=False):
+    """
+    Same outputs as network_derivatives, computed by propagating the x and y derivatives
+    explicitly through the spatial encoder (its jet) and the Linear/SiLU stacks.
+
+    Only plain tensor operations are involved (no functorch transform), so the whole
+    derivative pass and its backward can be captured by torch.compile.
+
+    Args:
+        model (PINN): The neural network model.
+        x, y (torch.Tensor): Spatial coordinates [N, 1].
+        alpha (torch.Tensor): Angle of attack per point [N, 1].
+        order (int): 1 for the Jacobian only, 2 to add the second derivatives.
+        autocast (bool): bf16 Linear layers, fp32 elsewhere (see _propagate).
+
+    Returns:
+        tuple: As calc_derivatives.
+    """
+    h, dh, d2h = model.encoder.jet(torch.cat([x, y], dim=1), order)
+    h, dh, d2h = _propagate(model.local_net, h, dh, d2h, autocast)
+    with torch.autocast(x.device.type, dtype=torch.bfloat16, enabled=autocast):
+        param = model.global_net((alpha - model.mu[2:]) / model.sigma[2:]).float()
+    h, dh, d2h = _propagate(model.output_net, h*param, dh*param, d2h*param if d2h is not None else None, autocast)
+
+    if order == 1:
+        return h, dh[0], dh[1]
+    return h, dh[0], dh[1], d2h[0], d2h[1]
+
+def compile_model(model, n_probe=64):
+    """
+    Opt-in compiled mode: compiles the forward pass and the derivative pass with torch.compile.
+
+    Nested forward-mode jvp is not traced by torch.compile, so calc_derivatives is routed to a
+    compiled taylor_derivatives. Both compiled functions are run once on a probe batch, with a
+    backward pass, and checked against the eager path. If anything fails the model stays eager.
+
+    Args:
+        model (PINN): The neural network model (modified in place).
+        n_probe (int): Number of points of the probe batch.
+
+    Returns:
+        bool: True if the compiled mode is active.
+    """
+    if isinstance(model, XPINN):
+        return all([compile_model(network, n_probe) for network in model.networks])
+    device = model.mu.device
+    x = torch.rand(n_probe, 1, device=device)*3 - 1
+    y = torch.rand(n_probe, 1, device=device)*2 - 1
+    alpha = torch.rand(n_probe, model.mu.shape[0] - 2, device=device)*0.4 - 0.2
+    try:
+        forward = torch.compile(model.forward, dynamic=True)
+        derivatives = torch.compile(taylor_derivatives, dynamic=True)
+        with torch.no_grad():
+            if not torch.allclose(forward(x, y, alpha), model(x, y, alpha), atol=1e-5):
+                raise RuntimeError("compiled forward does not match the eager model")
+        for order in (1, 2):
+            compiled = derivatives(model, x, y, alpha, order)
+            for a, b in zip(compiled, network_derivatives(model, x, y, alpha, order)):
+                if not torch.allclose(a, b, atol=1e-4):
+                    raise RuntimeError("compiled derivatives do not match the eager derivatives")
+            sum(d.square().sum() for d in compiled).backward()
+    except Exception as e:
+        print(f"torch.compile failed ({type(e).__name__}: {e}), running eagerly.")
+        return False
+    finally:
+        model.zero_grad(set_to_none=True)
+
+    model.forward = forward
+    model.compiled_derivatives = derivatives
+    return True
+
+def bf16_residual_error(model, probe, rho, mu):
+    """
+    Accuracy guard of the bf16 mode: relative L2 difference between the Navier-Stokes residuals
+    computed with bf16 Linear layers and in full fp32, on a fixed probe set.
+
+    Args:
+        model (PINN): The neural network model.
+        probe (tuple): Probe points (x, y, alpha), each [N, 1] (alpha [N, 4] for a geometric model).
+        rho (float): Fluid density.
+        mu (float): Dynamic viscosity.
+
+    Returns:
+        float: ||r_bf16 - r_fp32|| / ||r_fp32||.
+    """
+    x, y, alpha = probe
+    with torch.no_grad():
+        exact = torch.cat(ns_residuals(*taylor_derivatives(model, x, y, alpha), rho, mu), dim=1)
+        mixed = torch.cat(ns_residuals(*taylor_derivatives(model, x, y, alpha, autocast=True), rho, mu), dim=1)
+    error = ((mixed - exact).norm() / exact.norm().clamp(min=1e-12)).reshape(1)
+    # Data-parallel ranks hold different probe points: decide on the mean error
+    return all_reduce_(error, average=True).item()
+
+def enable_bf16(model, probe, rho, mu, tol=0.05):
+    """
+    Opt-in mixed precision: the Linear layers run under autocast in bf16 (native bf16 matrix
+    units on recent CPUs), while the derivatives feeding the Navier-Stokes residual, the losses
+    and their reductions stay in fp32. The mode is only kept if bf16_residual_error is within tol;
+    otherwise the model runs in fp32. Call it again to re-check (the residual shrinks as training
+    converges, so the same bf16 rounding becomes relatively larger).
+
+    Args:
+        model (PINN): The neural network model (modified in place).
+        probe (tuple): Probe points (x, y, alpha) of the accuracy guard.
+        rho (float): Fluid density.
+        mu (float): Dynamic viscosity.
+        tol (float): Maximum relative residual error of the bf16 path.
+
+    Returns:
+        tuple: (enabled, error) with the relative residual error of the probe set.
+    """
+    error = bf16_residual_error(model, probe, rho, mu)
+    model.mixed_precision = error <= tol
+    return model.mixed_precision, error
+
+def ns_residuals(out, d_dx, d_dy, d2_dx2, d2_dy2, rho, mu):
+    """
+    Pointwise residuals of the steady incompressible Navier-Stokes equations.
+
+    Args:
+        out, d_dx, d_dy, d2_dx2, d2_dy2 (torch.Tensor): Outputs and derivatives from calc_derivatives.
+        rho (float): Fluid density.
+        mu (float): Dynamic viscosity.
+
+    Returns:
+        tuple: (ns_x, ns_y, continuity), each [N, 1]
+    """
+    u, v = out[:,0:1], out[:,1:2]
+    ns_x = rho*(u*d_dx[:,0:1] + v*d_dy[:,0:1]) + d_dx[:,2:3] - mu*(d2_dx2[:,0:1] + d2_dy2[:,0:1])
+    ns_y = rho*(u*d_dx[:,1:2] + v*d_dy[:,1:2]) + d_dy[:,2:3] - mu*(d2_dx2[:,1:2] + d2_dy2[:,1:2])
+    continuity = d_dx[:,0:1] + d_dy[:,1:2]
+    return ns_x, ns_y, continuity
+
+def calc_residual(model, x, y, alpha, rho, mu, chunk_size=16384):
+    """
+    Pointwise magnitude of the PDE residual, evaluated without building an autograd graph.
+    Used to score candidate collocation points.
+
+    Args:
+        model (PINN): The neural network model.
+        x, y (torch.Tensor): Spatial coordinates [N, 1].
+        alpha (float or torch.Tensor): Angle of attack, scalar or per point [N, 1].
+        rho (float): Fluid density.
+        mu (float): Dynamic viscosity.
+        chunk_size (int): Points per derivative pass.
+
+    Returns:
+        torch.Tensor: Residual norm sqrt(ns_x**2 + ns_y**2 + continuity**2) per point [N].
+    """
+    if not torch.is_tensor(alpha):
+        alpha = torch.full_like(x, alpha)
+    residual = []
+    # Nested forward-mode SiLU derivatives are not available under torch.no_grad:
+    # freeze the parameters instead so that no graph is recorded
+    requires_grad = [param.requires_grad for param in model.parameters()]
+    model.requires_grad_(False)
+    try:
+        for start in range(0, x.shape[0], chunk_size):
+            sl = slice(start, start + chunk_size)
+            ns_x, ns_y, continuity = ns_residuals(*calc_derivatives(model, x[sl], y[sl], alpha[sl]), rho, mu)
+            residual.append(torch.sqrt(ns_x**2 + ns_y**2 + continuity**2).view(-1))
+    finally:
+        for param, flag in zip(model.parameters(), requires_grad):
+            param.requires_grad_(flag)
+    return torch.cat(residual)
+
+def calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model, weights=None):
     """
     Computes the total loss for the PINN, integrating PDE (physics) loss and 
     boundary condition (BC) losses.
@@ -176,93 +1123,295 @@ def calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc,
         alpha (float): Angle of attack.
         mask_side (torch.Tensor): Identifiers for which boundary each BC point belongs to.
         model (PINN): The neural network model.
+        weights (torch.Tensor, optional): Loss weights, see combine_losses. Defaults to LOSS_WEIGHTS.
 
     Returns:
         tuple: (total_loss, loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil)
     """
     
     # --- 1. Loss PDE (Physics) ---
-    out = model(x_col, y_col, torch.full_like(x_col,alpha))
-    u_pred_col = out[:,0:1]
-    v_pred_col = out[:,1:2]
-    p_pred_col = out[:,2:3]
-    
-    # Calculate first derivatives (du/dx, du/dy) using autograd
-    du_dx = torch.autograd.grad(u_pred_col, x_col, torch.ones_like(u_pred_col), create_graph=True, retain_graph=True)[0]
-    du_dy = torch.autograd.grad(u_pred_col, y_col, torch.ones_like(u_pred_col), create_graph=True, retain_graph=True)[0]
-    
-    # Calculate second derivatives (d2u/dx2, d2u/dy2)
-    d2u_dx2 = torch.autograd.grad(du_dx, x_col, torch.ones_like(du_dx), create_graph=True, retain_graph=True)[0]
-    d2u_dy2 = torch.autograd.grad(du_dy, y_col, torch.ones_like(du_dy), create_graph=True, retain_graph=True)[0]
-
-    # Calculate first derivatives (dv/dx, dv/dy) using autograd
-    dv_dx = torch.autograd.grad(v_pred_col, x_col, torch.ones_like(v_pred_col), create_graph=True, retain_graph=True)[0]
-    dv_dy = torch.autograd.grad(v_pred_col, y_col, torch.ones_like(v_pred_col), create_graph=True, retain_graph=True)[0]
-    
-    # Calculate second derivatives (d2v/dx2, d2v/dy2)
-    d2v_dx2 = torch.autograd.grad(dv_dx, x_col, torch.ones_like(dv_dx), create_graph=True, retain_graph=True)[0]
-    d2v_dy2 = torch.autograd.grad(dv_dy, y_col, torch.ones_like(dv_dy), create_graph=True, retain_graph=True)[0]
-
-    # Calculate first derivatives (dp/dx, dp/dy) using autograd
-    dp_dx = torch.autograd.grad(p_pred_col, x_col, torch.ones_like(p_pred_col), create_graph=True, retain_graph=True)[0]
-    dp_dy = torch.autograd.grad(p_pred_col, y_col, torch.ones_like(p_pred_col), create_graph=True, retain_graph=True)[0]
-    
-    # Navier-Stokes incompressible equation 
-    # rho u . grad(u) = - grad(p) + mu*grad**2(u)
-    # grad(u) = 0
-    ns_x = rho*(u_pred_col*du_dx + v_pred_col*du_dy) + dp_dx - mu*(d2u_dx2 + d2u_dy2)
-    ns_y = rho*(u_pred_col*dv_dx + v_pred_col*dv_dy) + dp_dy - mu*(d2v_dx2 + d2v_dy2)
-    loss_ns = torch.mean(ns_x ** 2) + torch.mean(ns_y ** 2)
-    loss_continuity = torch.mean((du_dx + dv_dy) ** 2)
-    loss_pde = loss_ns + loss_continuity
+    with profile_phase('pde'):
+        out, d_dx, d_dy, d2_dx2, d2_dy2 = calc_derivatives(model, x_col, y_col, alpha)
+        
+        # Navier-Stokes incompressible equation 
+        # rho u . grad(u) = - grad(p) + mu*grad**2(u)
+        # grad(u) = 0
+        ns_x, ns_y, continuity = ns_residuals(out, d_dx, d_dy, d2_dx2, d2_dy2, rho, mu)
+        loss_ns = torch.mean(ns_x ** 2) + torch.mean(ns_y ** 2)
+        loss_continuity = torch.mean(continuity ** 2)
+        loss_pde = loss_ns + loss_continuity
     
     # --- 2. Loss BC (Boundary Conditions) ---
-    out_bc = model(x_bc, y_bc, torch.full_like(x_bc,alpha))
+    # Per-side means as masked sums: boolean indexing would force a host sync to size its output
+    # (a side without points, e.g. in an XPINN subdomain, contributes 0)
+    def side_mean(values, side):
+        mask = (mask_side.to(values.device) == side).to(values.dtype)
+        return torch.sum(values * mask) / torch.clamp(torch.sum(mask), min=1)
+
+    if model.constraint is not None:
+        # Inlet, top, bottom and wall conditions hold exactly: only the outlet condition is evaluated
+        with profile_phase('boundary'):
+            out_bc, d_dx_bc, _ = calc_derivatives(model, x_bc, y_bc, alpha, order=1)
+        nu = mu/rho
+        loss_outlet = side_mean((-out_bc[:,2:3] + nu*d_dx_bc[:,0:1]) ** 2, 1) + side_mean((nu*d_dx_bc[:,1:2]) ** 2, 1)
+        zero = torch.zeros_like(loss_pde)
+        loss = combine_losses(loss_pde, zero, loss_outlet, zero, zero, zero, weights)
+        return loss, loss_pde, zero, loss_outlet, zero, zero, zero
+
+    with profile_phase('boundary'):
+        out_bc, d_dx_bc, _ = calc_derivatives(model, x_bc, y_bc, alpha, order=1)
     u_pred_bc = out_bc[:,0:1]
     v_pred_bc = out_bc[:,1:2]
     p_pred_bc = out_bc[:,2:3]
 
-    # Calculate first derivatives (du/dx, du/dy) using autograd
-    du_dx_bc = torch.autograd.grad(u_pred_bc, x_bc, torch.ones_like(u_pred_bc), create_graph=True, retain_graph=True)[0]
-    dv_dx_bc = torch.autograd.grad(v_pred_bc, x_bc, torch.ones_like(v_pred_bc), create_graph=True, retain_graph=True)[0]
+    # First derivatives along x (du/dx, dv/dx) for the outlet condition
+    du_dx_bc = d_dx_bc[:,0:1]
+    dv_dx_bc = d_dx_bc[:,1:2]
 
-    loss_inlet_u = torch.mean((u_pred_bc[mask_side == 0] - u_bc[mask_side == 0]) ** 2)
-    loss_inlet_v = torch.mean((v_pred_bc[mask_side == 0] - v_bc[mask_side == 0]) ** 2)
+    loss_inlet_u = side_mean((u_pred_bc - u_bc) ** 2, 0)
+    loss_inlet_v = side_mean((v_pred_bc - v_bc) ** 2, 0)
     loss_inlet = loss_inlet_u + loss_inlet_v
 
-    loss_top_u = torch.mean((u_pred_bc[mask_side == 2] - u_bc[mask_side == 2]) ** 2)
-    loss_top_v = torch.mean((v_pred_bc[mask_side == 2] - v_bc[mask_side == 2]) ** 2)
+    loss_top_u = side_mean((u_pred_bc - u_bc) ** 2, 2)
+    loss_top_v = side_mean((v_pred_bc - v_bc) ** 2, 2)
     loss_top = loss_top_u + loss_top_v
 
-    loss_bot_u = torch.mean((u_pred_bc[mask_side == 3] - u_bc[mask_side == 3]) ** 2)
-    loss_bot_v = torch.mean((v_pred_bc[mask_side == 3] - v_bc[mask_side == 3]) ** 2)
+    loss_bot_u = side_mean((u_pred_bc - u_bc) ** 2, 3)
+    loss_bot_v = side_mean((v_pred_bc - v_bc) ** 2, 3)
     loss_bot = loss_bot_u + loss_bot_v
 
     nu = mu/rho
-    loss_outlet_x = torch.mean((-p_pred_bc[mask_side == 1] + nu*(du_dx_bc[mask_side == 1]))** 2)
-    loss_outlet_y = torch.mean((nu*(dv_dx_bc[mask_side == 1]))** 2)
+    loss_outlet_x = side_mean((-p_pred_bc + nu*du_dx_bc) ** 2, 1)
+    loss_outlet_y = side_mean((nu*dv_dx_bc) ** 2, 1)
     loss_outlet = loss_outlet_x + loss_outlet_y
     #loss_outlet = torch.mean((p_pred_bc[mask_side == 1]) ** 2)
 
-    out_wall = model(x_airfoil, y_airfoil, torch.full_like(x_airfoil,alpha))
-    u_pred_wall = out_wall[:,0:1]
-    v_pred_wall = out_wall[:,1:2]
-    loss_wall_airfoil_u = torch.mean((u_pred_wall) ** 2)
-    loss_wall_airfoil_v = torch.mean((v_pred_wall) ** 2)
-    loss_wall_airfoil = loss_wall_airfoil_u + loss_wall_airfoil_v
+    if x_airfoil.shape[0] > 0:
+        with profile_phase('wall'):
+            out_wall = model(x_airfoil, y_airfoil, torch.full_like(x_airfoil,alpha))
+        u_pred_wall = out_wall[:,0:1]
+        v_pred_wall = out_wall[:,1:2]
+        loss_wall_airfoil_u = torch.mean((u_pred_wall) ** 2)
+        loss_wall_airfoil_v = torch.mean((v_pred_wall) ** 2)
+        loss_wall_airfoil = loss_wall_airfoil_u + loss_wall_airfoil_v
+    else:
+        loss_wall_airfoil = torch.zeros_like(loss_pde)
 
 
     # --- Total Loss --
-    loss = 15*loss_pde + 4*loss_top + 4*loss_bot + 5*loss_inlet + 1*loss_outlet + 10*loss_wall_airfoil
+    loss = combine_losses(loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil, weights)
     return loss, loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil
 
+# Hand-tuned weights of (PDE, inlet, outlet, top, bot, airfoil)
+LOSS_WEIGHTS = (15.0, 5.0, 1.0, 4.0, 4.0, 10.0)
+
+def combine_losses(loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil, weights=None):
+    """
+    Weighted sum of the PDE and boundary loss components.
+
+    Args:
+        weights (torch.Tensor, optional): Weights of (PDE, inlet, outlet, top, bot, airfoil).
+                                          Defaults to the fixed LOSS_WEIGHTS.
+
+    Returns:
+        torch.Tensor: The total loss.
+    """
+    if weights is None:
+        weights = LOSS_WEIGHTS
+    return (weights[0]*loss_pde + weights[3]*loss_top + weights[4]*loss_bot
+            + weights[1]*loss_inlet + weights[2]*loss_outlet + weights[5]*loss_wall_airfoil)
+
+class LossBalancer:
+    """
+    Self-balancing loss weights by gradient-norm balancing (learning-rate annealing variant,
+    Wang, Teng & Perdikaris, 2021).
+
+    Every `every` steps, the gradient of each loss component is taken with respect to the last
+    layer of the network only, which back-propagates through the output head and not the whole
+    graph. Each weight then moves towards the value that gives every term the same gradient norm,
+    with an exponential moving average. The weights are rescaled to keep the sum of LOSS_WEIGHTS,
+    so the effective learning rate of the AdamW schedule is unchanged.
+    """
+    def __init__(self, model, every=10, beta=0.1, device='cpu'):
+        """
+        Args:
+            model (PINN): The neural network model.
+            every (int): Steps between two weight updates.
+            beta (float): Moving-average rate of the weight updates.
+            device (torch.device): Computing device of the weights.
+        """
+        self.weights = torch.tensor(LOSS_WEIGHTS, device=device)
+        self.total = sum(LOSS_WEIGHTS)
+        self.params = list(model.output_net[-1].parameters())
+        self.every = every
+        self.beta = beta
+
+    def update(self, step, components):
+        """
+        Updates the weights from the loss components of the current step (graph retained).
+
+        Args:
+            step (int): Current optimization step.
+            components (tuple): (loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil)
+        """
+        if step % self.every != 0:
+            return
+        norms = []
+        for component in components:
+            grad = torch.autograd.grad(component, self.params, retain_graph=True, allow_unused=True, materialize_grads=True)
+            norms.append(torch.sqrt(sum((g**2).sum() for g in grad)))
+        target = 1.0 / (torch.stack(norms) + 1e-12)
+        target = self.total * target / target.sum()
+        # New tensor rather than in-place: the current loss graph still holds the old weights
+        self.weights = (1 - self.beta)*self.weights + self.beta*target
+        # Data-parallel ranks see different batches: keep one set of weights
+        all_reduce_(self.weights, average=True)
+
+class LossRecorder:
+    """
+    Device-side ring buffer of the loss components of the AdamW phase.
+
+    record() only writes the detached losses into a preallocated row, so the training step
+    never waits for the device. The rows are copied to the host in one transfer by flush(),
+    every `capacity` steps or when the caller needs the values (prints, early stopping).
+    """
+    def __init__(self, capacity=100, device='cpu'):
+        """
+        Args:
+            capacity (int): Number of steps kept on the device between two flushes.
+            device (torch.device): Computing device of the buffer.
+        """
+        self.buffer = torch.zeros(capacity, 7, device=device)
+        self.count = 0
+        self.rows = []
+
+    def record(self, loss, *components):
+        """
+        Stores the losses of one step: (total, pde, inlet, outlet, top, bot, airfoil).
+        """
+        self.buffer[self.count] = torch.stack([loss, *components]).detach()
+        self.count += 1
+        if self.count == self.buffer.shape[0]:
+            self._drain()
+
+    def _drain(self):
+        """
+        Copies the rows held on the device to the host (single synchronization).
+        With data-parallel training the rows are averaged over the ranks first.
+        """
+        if self.count > 0:
+            rows = all_reduce_(self.buffer[:self.count].clone(), average=True)
+            self.rows.extend(rows.tolist())
+            self.count = 0
+
+    def flush(self):
+        """
+        Returns the losses recorded since the previous flush.
+
+        Returns:
+            list: One row per step, each [total, pde, inlet, outlet, top, bot, airfoil].
+        """
+        self._drain()
+        rows, self.rows = self.rows, []
+        return rows
+
+def chunk_size_from_memory(budget_mb, hidden):
+    """
+    Converts a memory budget into a number of points per chunk for calc_loss_multi.
+    The second-order derivative pass keeps roughly 420 hidden-width float32 activations per point.
+
+    Args:
+        budget_mb (float): Memory budget in MB.
+        hidden (int): Hidden width of the trained network (model.hidden).
+
+    Returns:
+        int: Points per chunk.
+    """
+    return max(1, int(budget_mb * 1024**2 / (420 * hidden * 4)))
+
+def calc_loss_multi(batch, rho, mu, model, chunk_size=None, weights=None, backward=True):
+    """
+    Fused multi-angle objective: the mean over angles of calc_loss, evaluated on the whole
+    fixed batch in one forward/derivative pass with a per-point alpha column.
+
+    Per-angle means become per-point weights (1 / segment size) so every loss component is a
+    weighted sum. This makes the objective additive over points: with chunk_size set, each chunk
+    is evaluated and back-propagated on its own to bound the peak memory.
+    The parameter gradients are accumulated in the model (backward is called here, unless
+    backward=False: the graph is then dropped without touching the gradients).
+
+    Args:
+        batch (dict): Fixed multi-angle batch built by multi_angle_batch (see also constrain_batch).
+        rho (float): Fluid density.
+        mu (float): Dynamic viscosity.
+        model (PINN): The neural network model.
+        chunk_size (int, optional): Maximum number of points per pass. None evaluates everything at once.
+        weights (torch.Tensor, optional): Loss weights, see combine_losses. Defaults to LOSS_WEIGHTS.
+        backward (bool): Back-propagate the objective into the parameter gradients.
+
+    Returns:
+        tuple: Detached (total_loss, loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil)
+    """
+    nu = mu/rho
+
+    def fields(name, sl):
+        # Distance fields precomputed by constrain_batch (hard-constrained model only)
+        key = 'fields_' + name
+        return batch[key][:, sl] if key in batch else None
+
+    def col_terms(sl):
+        derivatives = calc_derivatives(model, batch['x_col'][sl], batch['y_col'][sl], batch['alpha_col'][sl], fields=fields('col', sl))
+        ns_x, ns_y, continuity = ns_residuals(*derivatives, rho, mu)
+        loss_pde = torch.sum(batch['w_col'][sl] * (ns_x**2 + ns_y**2 + continuity**2))
+        zero = torch.zeros_like(loss_pde)
+        return torch.stack([loss_pde, zero, zero, zero, zero, zero])
+
+    def bc_terms(sl):
+        out, d_dx, _ = calc_derivatives(model, batch['x_bc'][sl], batch['y_bc'][sl], batch['alpha_bc'][sl], order=1, fields=fields('bc', sl))
+        side = batch['side_bc'][sl]
+        dirichlet = (out[:,0:1] - batch['u_bc'][sl])**2 + (out[:,1:2] - batch['v_bc'][sl])**2
+        outlet = (-out[:,2:3] + nu*d_dx[:,0:1])**2 + (nu*d_dx[:,1:2])**2
+        residual = torch.where(side.view(-1,1) == 1, outlet, dirichlet)
+        # Segment-wise reduction by boundary side: 0 inlet, 1 outlet, 2 top, 3 bottom
+        sides = torch.zeros(4, dtype=residual.dtype, device=residual.device).index_add_(0, side, (batch['w_bc'][sl] * residual).view(-1))
+        return torch.cat([torch.zeros_like(sides[0:1]), sides, torch.zeros_like(sides[0:1])])
+
+    def wall_terms(sl):
+        out = model(batch['x_wall'][sl], batch['y_wall'][sl], batch['alpha_wall'][sl])
+        loss_wall = torch.sum(batch['w_wall'][sl] * (out[:,0:1]**2 + out[:,1:2]**2))
+        zero = torch.zeros_like(loss_wall)
+        return torch.stack([zero, zero, zero, zero, zero, loss_wall])
+
+    def total(components):
+        return combine_losses(*components, weights)
+
+    pieces = [(col_terms, batch['x_col'].shape[0]), (bc_terms, batch['x_bc'].shape[0]), (wall_terms, batch['x_wall'].shape[0])]
+    # A constrained batch has no wall points
+    pieces = [(terms, n_points) for terms, n_points in pieces if n_points > 0]
+
+    if chunk_size is None:
+        components = sum(terms(slice(None)) for terms, _ in pieces)
+        if backward:
+            total(components).backward()
+        components = components.detach()
+    else:
+        components = 0
+        for terms, n_points in pieces:
+            for start in range(0, n_points, chunk_size):
+                part = terms(slice(start, start + chunk_size))
+                if backward:
+                    total(part).backward()
+                components = components + part.detach()
+
+    return (total(components), *components)
+
 def calc_force(m, p, t, mu, rho, alpha, model, device):
     """
     Computes aerodynamic lift (Cl) and drag (Cd) coefficients by integrating 
     surface pressure and viscous stresses over the airfoil profile.
 
     Args:
-        m, p, t (float): NACA 4-digit airfoil parameters.
+        m, p, t (float): NACA 4-digit airfoil parameters as chord fractions (0.02, 0.4, 0.12 for a 2412).
         mu (float): Dynamic viscosity.
         rho (float): Fluid density.
         alpha (float): Angle of attack in radians.
@@ -273,40 +1422,17 @@ def calc_force(m, p, t, mu, rho, alpha, model, device):
         tuple: (lift_coefficient Cl, drag_coefficient Cd)
     """
 
-    x_s, y_s = generate_naca4(m, p, t, 1000)
-
-    vec_dx = []
-    vec_dy = []
-    dl = []
-    vec_n = []
-    x_mid = []
-    y_mid = []
-    for i in range(len(x_s)-1):
-        vec_dx.append(x_s[i+1] - x_s[i]) 
-        vec_dy.append(y_s[i+1] - y_s[i])
-        dl.append(np.sqrt(vec_dx[i]**2 + vec_dy[i]**2))
-        vec_n.append((vec_dy[i]/dl[i], -vec_dx[i]/dl[i]))
-        x_mid.append((x_s[i] + x_s[i+1])/2)
-        y_mid.append((y_s[i] + y_s[i+1])/2)
-       
-    vec_dx = torch.tensor(vec_dx).to(device).view(-1,1)
-    vec_dy = torch.tensor(vec_dy).to(device).view(-1,1)
-    dl = torch.tensor(dl).to(device).view(-1,1)
-    vec_n = torch.tensor(vec_n).to(device)
-    x_mid = torch.tensor(x_mid, requires_grad=True, dtype=torch.float32).to(device).view(-1,1)
-    y_mid = torch.tensor(y_mid, requires_grad=True, dtype=torch.float32).to(device).view(-1,1)  
-
-    # Prediction
+    # Panel normals, lengths and midpoints (cached per airfoil and device)
+    vec_n, dl, x_mid, y_mid = panel_geometry(m, p, t, 1000, device)
+
+    # Prediction (spatial Jacobian at the panels cached per airfoil, see surface_derivatives)
     model.eval()
-    out = model(x_mid, y_mid, torch.full_like(x_mid,alpha))
-    u_pred = out[:,0:1]
-    v_pred = out[:,1:2]
+    out, d_dx, d_dy = (d[0] for d in surface_derivatives(model, x_mid, y_mid, torch.tensor([float(alpha)], device=device),
+                                                         m, p, t, cache_key=('panels', m, p, t)))
     p_pred = out[:,2:3]
 
-    du_dx = torch.autograd.grad(u_pred, x_mid, torch.ones_like(u_pred), create_graph=True, retain_graph=True)[0]
-    du_dy = torch.autograd.grad(u_pred, y_mid, torch.ones_like(u_pred), create_graph=True, retain_graph=True)[0]
-    dv_dx = torch.autograd.grad(v_pred, x_mid, torch.ones_like(v_pred), create_graph=True, retain_graph=True)[0]
-    dv_dy = torch.autograd.grad(v_pred, y_mid, torch.ones_like(v_pred), create_graph=True, retain_graph=True)[0]
+    du_dx, du_dy = d_dx[:,0:1], d_dy[:,0:1]
+    dv_dx, dv_dy = d_dx[:,1:2], d_dy[:,1:2]
 
     F_v_x = torch.sum(mu*(du_dx*vec_n[:,0:1] + du_dy*vec_n[:,1:2])* dl)
     F_v_y = torch.sum(mu*(dv_dx*vec_n[:,0:1] + dv_dy*vec_n[:,1:2])* dl)
@@ -325,22 +1451,93 @@ def calc_force(m, p, t, mu, rho, alpha, model, device):
 
     return Cl,Cd
 
+def polar(m, p, t, alphas, mu, rho, model, device, slope=False, chunk_size=5000, csv_path=None):
+    """
+    Aerodynamic polar: Cl and Cd over a set of angles of attack, integrated as in calc_force.
+    The spatial Jacobian at the surface midpoints is computed once (surface_derivatives) and
+    the angles are chained through the output layers in batches of at most chunk_size points,
+    instead of one calc_force call per angle.
+
+    Args:
+        m, p, t (float): NACA 4-digit airfoil parameters as chord fractions (see calc_force).
+        alphas (array-like): Angles of attack in radians [A].
+        mu (float): Dynamic viscosity.
+        rho (float): Fluid density.
+        model (PINN): Trained PINN model.
+        device (torch.device): Computing device (CPU/CUDA).
+        slope (bool): Also compute the lift slope dCl/dalpha (per radian) by reverse-mode autograd
+                      through the angle input of the model.
+        chunk_size (int, optional): Maximum number of surface points per pass (whole angles). Passes
+                                    of a few thousand points are the fastest on CPU; None runs
+                                    all the angles at once.
+        csv_path (str, optional): Writes the polar as CSV (alpha_deg, cl, cd[, dcl_dalpha]).
+
+    Returns:
+        dict: 'alpha', 'cl', 'cd' (and 'dcl_dalpha' when slope is set) as numpy arrays [A].
+    """
+    alphas = np.atleast_1d(np.asarray(alphas, dtype=np.float64))
+    vec_n, dl, x_mid, y_mid = panel_geometry(m, p, t, 1000, device)
+    n_panels = x_mid.shape[0]
+    per_pass = max(1, chunk_size // n_panels) if chunk_size else len(alphas)
+    V_inf = 0.3
+
+    model.eval()
+    results = {'cl': [], 'cd': [], 'dcl_dalpha': []}
+    for start in range(0, len(alphas), per_pass):
+        alpha = torch.tensor(alphas[start:start + per_pass], dtype=torch.float64, device=device)
+        n_alpha = alpha.shape[0]
+        with torch.set_grad_enabled(slope):
+            if slope:
+                alpha.requires_grad_(True)
+            out, d_dx, d_dy = surface_derivatives(model, x_mid, y_mid, alpha, m, p, t, cache_key=('panels', m, p, t))
+
+            # [A, P, .] per angle and panel, summed over the panels as in calc_force
+            p_pred = out[...,2:3]
+            F_v_x = torch.sum(mu*(d_dx[...,0:1]*vec_n[:,0:1] + d_dy[...,0:1]*vec_n[:,1:2])*dl, dim=(1, 2))
+            F_v_y = torch.sum(mu*(d_dx[...,1:2]*vec_n[:,0:1] + d_dy[...,1:2]*vec_n[:,1:2])*dl, dim=(1, 2))
+            Fp = torch.sum(-p_pred*vec_n*dl, dim=1)
+            F_tot = Fp + torch.stack([F_v_x, F_v_y], dim=1)
+
+            vec_drag = torch.stack([torch.cos(alpha), torch.sin(alpha)], dim=1)
+            vec_lift = torch.stack([-torch.sin(alpha), torch.cos(alpha)], dim=1)
+            Cl = torch.sum(F_tot*vec_lift, dim=1)/(0.5*rho*V_inf**2)
+            Cd = torch.sum(F_tot*vec_drag, dim=1)/(0.5*rho*V_inf**2)
+            if slope:
+                # Angles are independent: the gradient of the sum is the slope of each one
+                results['dcl_dalpha'].append(torch.autograd.grad(Cl.sum(), alpha)[0].detach().cpu().numpy())
+        results['cl'].append(Cl.detach().cpu().numpy())
+        results['cd'].append(Cd.detach().cpu().numpy())
+
+    result = {'alpha': alphas}
+    result.update({name: np.concatenate(values) for name, values in results.items() if values})
+
+    if csv_path is not None:
+        columns = [result['alpha']*180/np.pi, result['cl'], result['cd']] + ([result['dcl_dalpha']] if slope else [])
+        header = "alpha_deg,cl,cd" + (",dcl_dalpha" if slope else "")
+        np.savetxt(csv_path, np.stack(columns, axis=1), delimiter=",", header=header, comments="", fmt="%.8g")
+    return result
+
 
 # --- 3. Data Generation (Collocation, Boundary, and Sparse Data) ---
+# Computational domain
+x_min, x_max = -1.0, 2.0
+y_min, y_max = -1.0, 1.0
+
 def generate_airfoil(m,p,t, device) :
     """
     Generates airfoil surface coordinates and a geometric representation.
 
     Args:
-        m, p, t (float): NACA 4-digit parameters.
+        m, p, t (float): NACA 4-digit parameters as chord fractions (0.02, 0.4, 0.12 for a 2412).
         device (torch.device): Computing device.
 
     Returns:
-        tuple: (x_airfoil, y_airfoil, surface_polygon)
+        tuple: (x_airfoil, y_airfoil, surface) where surface is an AirfoilMask classifier
     """
 
+    check_fractions(m, p, t)
     x_airfoil,y_airfoil = generate_naca4(m,p,t,2000)
-    surface = Polygon(np.column_stack((x_airfoil, y_airfoil)))
+    surface = AirfoilMask(x_airfoil, y_airfoil, device)
 
     x_airfoil = torch.tensor(x_airfoil, dtype=torch.float32).to(device).view(-1,1)
     y_airfoil = torch.tensor(y_airfoil, dtype=torch.float32).to(device).view(-1,1)
@@ -353,7 +1550,7 @@ def data_generation(x_airfoil, y_airfoil, surface, batch_size, device, fixed_alp
 
     Args:
         x_airfoil, y_airfoil (torch.Tensor): Airfoil surface points.
-        surface (Polygon): Shapely representation of the airfoil.
+        surface (AirfoilMask): Vectorized classifier of the airfoil interior.
         batch_size (int): Number of points to sample.
         device (torch.device): Computing device.
         fixed_alpha (float, optional): Fixed AOA in radians. If None, samples randomly.
@@ -386,10 +1583,8 @@ def data_generation(x_airfoil, y_airfoil, surface, batch_size, device, fixed_alp
     x_col = torch.cat([x_col_global, x_col_local])
     y_col = torch.cat([y_col_global,y_col_local])
 
-    x_np =  x_col.detach().cpu().numpy()
-    y_np =  y_col.detach().cpu().numpy()
-
-    mask = [not surface.contains(Point(x,y)) for x,y in zip(x_np,y_np)]
+    with profile_phase('masking'):
+        mask = ~surface.contains(x_col, y_col).view(-1)
     x_col = x_col[mask].detach().requires_grad_(True)
     y_col = y_col[mask].detach().requires_grad_(True)
 
@@ -403,7 +1598,7 @@ def data_generation(x_airfoil, y_airfoil, surface, batch_size, device, fixed_alp
     p_bc = torch.zeros(num_bc, 1).to(device)
 
     # Enforce boundaries
-    mask_side = torch.randint(0, 4, (num_bc, 1))
+    mask_side = torch.randint(0, 4, (num_bc, 1)).to(device)
     x_bc[mask_side == 0] = x_min # Left boundary
     x_bc[mask_side == 1] = x_max # Right boundary
     y_bc[mask_side == 2] = y_min # Bottom boundary
@@ -426,33 +1621,317 @@ def data_generation(x_airfoil, y_airfoil, surface, batch_size, device, fixed_alp
 
     return x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha_rad, mask_side
 
+def multi_angle_batch(x_airfoil, y_airfoil, surface, angles_rad, batch_per_angle, device, pool=None, n_total=None):
+    """
+    Builds the fixed multi-angle batch used by the L-BFGS phase and calc_loss_multi.
+
+    Points of every angle are concatenated with a per-point alpha column. The weights
+    (1 / size of the point's angle or angle-side segment, divided by the number of angles)
+    turn the per-angle means of calc_loss into weighted sums.
+
+    Args:
+        x_airfoil, y_airfoil (torch.Tensor): Airfoil surface points.
+        surface (AirfoilMask): Vectorized classifier of the airfoil interior.
+        angles_rad (array-like): Angles of attack in radians.
+        batch_per_angle (int): Number of points sampled per angle.
+        device (torch.device): Computing device.
+        pool (CollocationPool, optional): Sobol point pool. If None, points come from data_generation.
+        n_total (int, optional): Number of angles of the whole objective when angles_rad is only a
+                                 shard of it (data-parallel L-BFGS). Defaults to len(angles_rad).
+
+    Returns:
+        dict: Collocation, boundary and wall points with their alpha, weights and targets.
+    """
+    n_angles = len(angles_rad) if n_total is None else n_total
+    col, bc = [], []
+    for i, angle_rad in enumerate(angles_rad):
+        if pool is not None:
+            x_c, y_c, x_b, y_b, u_b, v_b, p_b, alpha_val, m_side = pool.sample(batch_per_angle, fixed_alpha=angle_rad)
+        else:
+            x_c, y_c, x_b, y_b, u_b, v_b, p_b, alpha_val, m_side = data_generation(
+                x_airfoil, y_airfoil, surface, batch_per_angle, device, fixed_alpha=angle_rad)
+        side = m_side.view(-1).to(device)
+
+        # Segment sizes: one segment per angle for the PDE, one per (angle, side) for the BC
+        w_side = 1.0 / (n_angles * torch.bincount(side, minlength=4).clamp(min=1).to(x_b.dtype))
+        col.append((x_c.detach(), y_c.detach(), torch.full_like(x_c, alpha_val).detach(),
+                    torch.full_like(x_c, 1.0 / (n_angles * x_c.shape[0])).detach()))
+        bc.append((x_b.detach(), y_b.detach(), torch.full_like(x_b, alpha_val).detach(),
+                   w_side[side].view(-1,1), side, u_b, v_b, p_b))
+
+    n_shard = len(angles_rad)
+    x_col, y_col, alpha_col, w_col = (torch.cat(c) for c in zip(*col))
+    x_bc, y_bc, alpha_bc, w_bc, side_bc, u_bc, v_bc, p_bc = (torch.cat(b) for b in zip(*bc))
+
+    # Airfoil wall points repeated for every angle
+    n_wall = x_airfoil.shape[0]
+    alphas = torch.tensor(np.asarray(angles_rad), dtype=torch.float32, device=device).view(-1,1)
+
+    return {
+        "x_col": x_col, "y_col": y_col, "alpha_col": alpha_col, "w_col": w_col,
+        "x_bc": x_bc, "y_bc": y_bc, "alpha_bc": alpha_bc, "w_bc": w_bc, "side_bc": side_bc,
+        "u_bc": u_bc, "v_bc": v_bc, "p_bc": p_bc,
+        "x_wall": x_airfoil.repeat(n_shard, 1),
+        "y_wall": y_airfoil.repeat(n_shard, 1),
+        "alpha_wall": alphas.repeat_interleave(n_wall, dim=0),
+        "w_wall": torch.full((n_shard*n_wall, 1), 1.0 / (n_angles*n_wall), device=device),
+    }
+
+# Ranges of the flow cases of a geometric PINN: alpha (degrees), then m, p, t (chord fractions)
+CASE_RANGES = ((-10.0, 15.0), (0.0, 0.06), (0.2, 0.6), (0.08, 0.18))
+
+def sample_cases(n_cases, sobol_seed=None):
+    """
+    Draws flow cases (alpha, m, p, t) uniformly within CASE_RANGES.
+
+    Args:
+        n_cases (int): Number of cases.
+        sobol_seed (int, optional): If set, the cases are a scrambled Sobol sequence with this
+                                    seed (reproducible, space-filling), otherwise random.
+
+    Returns:
+        torch.Tensor: Cases [n_cases, 4] with alpha in radians.
+    """
+    if sobol_seed is None:
+        u = torch.rand(n_cases, 4)
+    else:
+        u = torch.quasirandom.SobolEngine(dimension=4, scramble=True, seed=sobol_seed).draw(n_cases)
+    low = torch.tensor([r[0] for r in CASE_RANGES])
+    high = torch.tensor([r[1] for r in CASE_RANGES])
+    cases = low + u * (high - low)
+    cases[:,0] *= np.pi / 180
+    return cases
+
+def multi_geometry_batch(cases, batch_per_case, device, n_wall_points=200, n_total=None):
+    """
+    Builds a batch over several flow cases (alpha, m, p, t) for a geometric PINN, in the
+    multi_angle_batch format used by calc_loss_multi. The alpha columns hold the [N, 4]
+    conditioning of every point.
+
+    All contours come from one naca4_batch call; each case is then masked with its own
+    AirfoilMask and sampled like data_generation.
+
+    Args:
+        cases (array-like): Flow cases [C, 4], alpha in radians.
+        batch_per_case (int): Number of points sampled per case.
+        device (torch.device): Computing device.
+        n_wall_points (int): Chordwise stations of the wall contours (2*n_wall_points - 1 wall points per case).
+        n_total (int, optional): Number of cases of the whole objective when cases is a shard of it.
+
+    Returns:
+        dict: Collocation, boundary and wall points with their conditioning, weights and targets.
+    """
+    cases = torch.as_tensor(cases, dtype=torch.float32).view(-1, 4)
+    n_cases = cases.shape[0] if n_total is None else n_total
+    x_contours, y_contours = naca4_batch(cases[:,1], cases[:,2], cases[:,3], n_points=n_wall_points, device=device)
+
+    col, bc, wall = [], [], []
+    for i, case in enumerate(cases.tolist()):
+        x_airfoil = x_contours[i].view(-1,1)
+        y_airfoil = y_contours[i].view(-1,1)
+        surface = AirfoilMask(x_airfoil, y_airfoil, device)
+        x_c, y_c, x_b, y_b, u_b, v_b, p_b, _, m_side = data_generation(x_airfoil, y_airfoil, surface, batch_per_case, device, fixed_alpha=case[0])
+        side = m_side.view(-1).to(device)
+        cond = torch.tensor([case], dtype=torch.float32, device=device)
+
+        # Segment sizes: one segment per case for the PDE and the wall, one per (case, side) for the BC
+        w_side = 1.0 / (n_cases * torch.bincount(side, minlength=4).clamp(min=1).to(x_b.dtype))
+        col.append((x_c.detach(), y_c.detach(), cond.expand(x_c.shape[0], -1),
+                    torch.full_like(x_c, 1.0 / (n_cases * x_c.shape[0])).detach()))
+        bc.append((x_b.detach(), y_b.detach(), cond.expand(x_b.shape[0], -1),
+                   w_side[side].view(-1,1), side, u_b, v_b, p_b))
+        wall.append((x_airfoil, y_airfoil, cond.expand(x_airfoil.shape[0], -1),
+                     torch.full_like(x_airfoil, 1.0 / (n_cases * x_airfoil.shape[0]))))
+
+    x_col, y_col, alpha_col, w_col = (torch.cat(c) for c in zip(*col))
+    x_bc, y_bc, alpha_bc, w_bc, side_bc, u_bc, v_bc, p_bc = (torch.cat(b) for b in zip(*bc))
+    x_wall, y_wall, alpha_wall, w_wall = (torch.cat(w) for w in zip(*wall))
+
+    return {
+        "x_col": x_col, "y_col": y_col, "alpha_col": alpha_col, "w_col": w_col,
+        "x_bc": x_bc, "y_bc": y_bc, "alpha_bc": alpha_bc, "w_bc": w_bc, "side_bc": side_bc,
+        "u_bc": u_bc, "v_bc": v_bc, "p_bc": p_bc,
+        "x_wall": x_wall, "y_wall": y_wall, "alpha_wall": alpha_wall, "w_wall": w_wall,
+    }
+
+def constrain_batch(model, batch):
+    """
+    Reduces a fixed multi-angle batch for a hard-constrained model: the wall points and the
+    inlet, bottom and top points are dropped (their conditions hold exactly) and the distance
+    fields of the remaining points are computed once, instead of at every objective evaluation.
+
+    Args:
+        model (PINN): Model with a HardBoundary constraint.
+        batch (dict): Batch built by multi_angle_batch.
+
+    Returns:
+        dict: The reduced batch, with the 'fields_col' and 'fields_bc' entries read by calc_loss_multi.
+    """
+    batch = dict(batch)
+    outlet = batch['side_bc'] == 1
+    for key in ('x_bc', 'y_bc', 'alpha_bc', 'w_bc', 'side_bc', 'u_bc', 'v_bc', 'p_bc'):
+        batch[key] = batch[key][outlet]
+    for key in ('x_wall', 'y_wall', 'alpha_wall', 'w_wall'):
+        batch[key] = batch[key][:0]
+    batch['fields_col'] = model.constraint.fields(batch['x_col'], batch['y_col'])
+    batch['fields_bc'] = model.constraint.fields(batch['x_bc'], batch['y_bc'])
+    return batch
+
 # --- 4. Model Training ---
-def train(x_airfoil, y_airfoil, surface, rho, mu, batch_size, device):
+# Fixed multi-angle set of the L-BFGS phase, and number of flow cases in geometric mode
+LBFGS_ANGLES_DEG = np.linspace(-10, 15, 20)
+LBFGS_CASES = 40
+
+def train(x_airfoil, y_airfoil, surface, rho, mu, batch_size, device, chunk_size=None, sampler='random', seed=0,
+          adaptive_fraction=0.5, refine_every=50, loss_weights='fixed', compile_mode=False,
+          checkpoint_path="pinn_checkpoint.pt", checkpoint_every=100, resume=False, geometric=False, cases_per_step=8,
+          hard_constraints=False, init_from=None, fine_tune_tol=0.02, encoder='fourier', precision='fp32', precision_tol=0.05,
+          profile=None, profile_epochs=20, lbfgs_memory=None):
     """
     Trains the PINN model using a two-phase optimization (AdamW followed by L-BFGS) 
     and saves the resulting parameters.
 
     Args:
         x_airfoil, y_airfoil (torch.Tensor): Airfoil geometry.
-        surface (Polygon): Airfoil polygon for point masking.
+        surface (AirfoilMask): Airfoil classifier for point masking.
         rho (float): Fluid density.
         mu (float): Fluid viscosity.
         batch_size (int): Training batch size.
         device (torch.device): Computing device.
+        chunk_size (int, optional): Points per pass of the fused L-BFGS objective (None for a single pass).
+        sampler (str): 'random' draws new uniform points every epoch with data_generation,
+                       'sobol' reads them from a device-resident CollocationPool,
+                       'adaptive' adds residual-based adaptive points (ResidualSampler) to the Sobol points.
+        seed (int): Seed of the Sobol pool stream.
+        adaptive_fraction (float): Share of the batch given to adaptive points in 'adaptive' mode.
+        refine_every (int): AdamW epochs between two adaptive refinements.
+        loss_weights (str): 'fixed' uses LOSS_WEIGHTS, 'balanced' adapts them during AdamW with a LossBalancer.
+        compile_mode (bool): Compile the forward and derivative passes with compile_model (eager fallback).
+        checkpoint_path (str): Training checkpoint file, written from a background thread (None to disable).
+        checkpoint_every (int): AdamW epochs between two checkpoints (every 10 epochs during L-BFGS).
+        resume (bool): Continue from the state stored in checkpoint_path, if it exists.
+        geometric (bool): Train one geometry-parametric model over CASE_RANGES (alpha and NACA m, p, t)
+                          instead of the given airfoil. Each AdamW step draws cases_per_step random
+                          cases (multi_geometry_batch); L-BFGS uses a fixed Sobol set of cases.
+        cases_per_step (int): Flow cases per AdamW step in geometric mode.
+        hard_constraints (bool): Impose the no-slip, inlet, top and bottom conditions exactly with a
+                                 HardBoundary output transform; their loss terms are dropped.
+        init_from (str, optional): Fine-tune mode: start from this checkpoint (see warm_start) with a
+                                   lower learning rate, and stop each phase on convergence instead of
+                                   running the full schedule.
+        fine_tune_tol (float): Relative loss improvement under which a fine-tuning phase has converged:
+                               over a 100-epoch window for AdamW (the learning rate is then cut, and the
+                               phase stops at the floor), over 10 epochs of the best loss for L-BFGS.
+        encoder (str): Spatial encoder of the model, 'fourier' or 'hash' (see PINN).
+        precision (str): 'fp32', or 'bf16' to run the Linear layers of the AdamW phase in bf16
+                         (enable_bf16). The accuracy guard runs every 100 epochs on a fixed probe set
+                         and the rest of the training falls back to fp32 once the relative residual
+                         error exceeds precision_tol. L-BFGS always runs in fp32.
+        precision_tol (float): Tolerance of the bf16 accuracy guard.
+        profile (str, optional): 'phases' to time the phases of the AdamW step (sampling, loss,
+                                 backward, optimizer, ...), 'torch' to also record them with
+                                 torch.profiler (operators and allocations). The profiled epochs
+                                 are written to pinn_profile.json (Chrome trace) and
+                                 pinn_profile.txt (summary table). None: no profiling overhead.
+        profile_epochs (int): Number of AdamW epochs profiled, after 2 warm-up epochs.
+        lbfgs_memory (float, optional): Memory budget in MB per pass of the fused L-BFGS objective;
+                                        sets chunk_size for the width of the model (chunk_size_from_memory).
+
+    Data-parallel mode: when called by every rank of a process group (see launch), each rank
+    samples its own share of the batch (batch_size / world size) with its own seed, and the
+    gradients are all-reduced for AdamW. For L-BFGS each rank holds a shard of the angles and
+    the multi-angle objective and its gradient are summed over the ranks. Rank 0 saves the model.
     """
+    if geometric and (sampler != 'random' or loss_weights != 'fixed'):
+        raise ValueError("geometric training supports sampler='random' and loss_weights='fixed' only")
+    if hard_constraints and (geometric or loss_weights != 'fixed'):
+        raise ValueError("hard constraints need a single airfoil and loss_weights='fixed'")
+
+    rank, world_size = get_rank(), get_world_size()
+    # Each rank holds a shard of the L-BFGS angles (or cases): fail now rather than after AdamW
+    n_shards = LBFGS_CASES if geometric else len(LBFGS_ANGLES_DEG)
+    if world_size > n_shards:
+        raise ValueError(f"At most {n_shards} ranks are supported (one L-BFGS {'case' if geometric else 'angle'} per rank), got {world_size}")
+    if world_size > 1:
+        seed = seed + rank
+        torch.manual_seed(seed)
+        np.random.seed(seed)
+        random.seed(seed)
+        batch_size = batch_size // world_size
+        if checkpoint_path:
+            checkpoint_path = f"{checkpoint_path}.rank{rank}"
+
+    if sampler in ('sobol', 'adaptive'):
+        pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=seed)
+    else:
+        pool = None
 
-    x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = data_generation(x_airfoil, y_airfoil, surface, batch_size, device)
-    alpha_range = torch.linspace(-10*np.pi/180, 15*np.pi/180, x_col.shape[0]).unsqueeze(1).to(device)
-    x_cat = torch.cat([x_col, y_col, alpha_range], dim=1).to(device)
+    def sample(size, fixed_alpha=None):
+        if pool is not None:
+            return pool.sample(size, fixed_alpha=fixed_alpha)
+        return data_generation(x_airfoil, y_airfoil, surface, size, device, fixed_alpha=fixed_alpha)
+
+    if geometric:
+        # Statistics over (x, y) and the conditioning (alpha, m, p, t) of a spread of cases
+        batch = multi_geometry_batch(sample_cases(64, sobol_seed=seed), max(1, batch_size // 64), device)
+        x_cat = torch.cat([batch['x_col'], batch['y_col'], batch['alpha_col']], dim=1)
+    else:
+        x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sample(batch_size)
+        alpha_range = torch.linspace(-10*np.pi/180, 15*np.pi/180, x_col.shape[0]).unsqueeze(1).to(device)
+        x_cat = torch.cat([x_col, y_col, alpha_range], dim=1).to(device)
     x_norm = Normalizer(x_cat, device=device)
-    model = PINN().to(device)
+    constraint = HardBoundary(airfoil_polygon(x_airfoil, y_airfoil)) if hard_constraints else None
+    model = PINN(geometric=geometric, constraint=constraint, encoder=encoder).to(device)
+    if lbfgs_memory:
+        chunk_size = chunk_size_from_memory(lbfgs_memory, model.hidden)
 
     with torch.no_grad(): 
         model.mu.copy_(x_norm.mean)
         model.sigma.copy_(x_norm.std)
 
-    optimizer = torch.optim.AdamW(model.parameters(), lr=0.002)
-    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=1500, eta_min = 1e-5)
+    if init_from is not None:
+        report = warm_start(model, init_from)
+        print(f"Fine-tuning from {init_from}: {len(report['copied'])} tensors copied, "
+              f"reshaped: {report['partial'] or 'none'}, not copied: {report['skipped']}")
+
+    # Same initialization and input normalization on every rank
+    broadcast_model(model)
+
+    if compile_mode:
+        compile_model(model)
+
+    # bf16 accuracy guard: fixed probe points at -4, 0 and 8 degrees, drawn without moving the training RNG streams
+    probe = None
+    if precision == 'bf16':
+        saved_rng = rng_state()
+        if geometric:
+            probe_batch = multi_geometry_batch(sample_cases(3, sobol_seed=1), 512, device)
+            probe = (probe_batch['x_col'].detach(), probe_batch['y_col'].detach(), probe_batch['alpha_col'])
+        else:
+            probe_points = [data_generation(x_airfoil, y_airfoil, surface, 512, device, fixed_alpha=a*np.pi/180) for a in (-4.0, 0.0, 8.0)]
+            probe = (torch.cat([b[0] for b in probe_points]).detach(), torch.cat([b[1] for b in probe_points]).detach(),
+                     torch.cat([torch.full_like(b[0], b[7]) for b in probe_points]).detach())
+        set_rng_state(saved_rng)
+        enabled, error = enable_bf16(model, probe, rho, mu, precision_tol)
+        print(f"bf16 mode {'enabled' if enabled else 'disabled'} (relative residual error {error:.4f}, tolerance {precision_tol})")
+
+    # Residual-based refinement of part of the collocation points
+    adaptive = None
+    if sampler == 'adaptive':
+        n_adaptive = int(adaptive_fraction*batch_size)
+        adaptive = ResidualSampler(pool, lambda x, y, a: calc_residual(model, x, y, a, rho, mu), n_adaptive, seed=seed)
+
+    # Self-balancing loss weights (frozen at their final AdamW value for L-BFGS)
+    balancer = LossBalancer(model, device=device) if loss_weights == 'balanced' else None
+    weights = None
+
+    if init_from is None:
+        optimizer = torch.optim.AdamW(parameter_groups(model, 0.002), lr=0.002)
+        scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=1500, eta_min = 1e-5)
+    else:
+        # Short adaptive schedule: the learning rate only drops when the loss stops improving
+        optimizer = torch.optim.AdamW(parameter_groups(model, 1e-5), lr=1e-5)
+        scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, factor=0.3, patience=0, threshold=fine_tune_tol)
 
     # --- Training Loop and Loss Function ---
 
@@ -464,148 +1943,218 @@ def train(x_airfoil, y_airfoil, surface, rho, mu, batch_size, device):
     loss_outlet_history = []
     loss_airfoil_history = []
     loss_top_bottom_history = []
-
+    histories = (loss_history, loss_stop, loss_pde_history, loss_inlet_history, loss_outlet_history, loss_airfoil_history, loss_top_bottom_history)
+
+    # Device-side buffer of the AdamW losses, flushed in bulk to the history lists
+    recorder = LossRecorder(capacity=100, device=device)
+    last_losses = None
+
+    def flush_history():
+        nonlocal last_losses
+        for total, pde, inlet, outlet, top, bot, airfoil in recorder.flush():
+            loss_history.append(total)
+            loss_pde_history.append(pde)
+            loss_airfoil_history.append(airfoil)
+            loss_inlet_history.append(inlet)
+            loss_outlet_history.append(outlet)
+            loss_top_bottom_history.append(top + bot)
+            last_losses = (total, pde, inlet, outlet, top, bot, airfoil)
+
+    # --- Checkpointing ---
+    writer = CheckpointWriter(checkpoint_path) if checkpoint_path else None
+
+    def training_state(phase, epoch, **extra):
+        state = {
+            "phase": phase,
+            "epoch": epoch,
+            "model": model.state_dict(),
+            "histories": histories,
+            "loss_weights": balancer.weights if balancer is not None else None,
+            "pool": pool.state_dict() if pool is not None else None,
+            "adaptive": adaptive.state_dict() if adaptive is not None else None,
+            "rng": rng_state(),
+        }
+        state.update(extra)
+        return state
+
+    checkpoint = load_checkpoint(checkpoint_path) if resume and checkpoint_path else None
+    start_epoch = 0
+    if checkpoint is not None:
+        print(f"Resuming from {checkpoint_path} ({checkpoint['phase']} epoch {checkpoint['epoch']})")
+        model.load_state_dict(checkpoint["model"])
+        for history, saved in zip(histories, checkpoint["histories"]):
+            history.extend(saved)
+        if balancer is not None and checkpoint["loss_weights"] is not None:
+            balancer.weights = checkpoint["loss_weights"].to(device)
+            weights = balancer.weights
+        if pool is not None and checkpoint["pool"] is not None:
+            pool.load_state_dict(checkpoint["pool"])
+        if adaptive is not None and checkpoint["adaptive"] is not None:
+            adaptive.load_state_dict(checkpoint["adaptive"])
+        if checkpoint["phase"] == 'adamw':
+            optimizer.load_state_dict(checkpoint["optimizer"])
+            scheduler.load_state_dict(checkpoint["scheduler"])
+            start_epoch = checkpoint["epoch"] + 1
+        else:
+            start_epoch = epochs
+        set_rng_state(checkpoint["rng"])
 
     print("Starting training...")
 
-    for epoch in range(epochs):
-        optimizer.zero_grad()
-
-        x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = data_generation(x_airfoil, y_airfoil, surface, batch_size, device)
-        
-        loss, loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
-        
-        loss.backward()
-        torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=5.0)
-        optimizer.step()
-        scheduler.step()
-        
-        loss_history.append(loss.item())
-        loss_pde_history.append(loss_pde.item())
-        loss_airfoil_history.append(loss_wall_airfoil.item())
-        loss_inlet_history.append(loss_inlet.item())
-        loss_outlet_history.append(loss_outlet.item())
-        loss_top_bottom_history.append(loss_top.item() + loss_bot.item())
+    # Profiling window: profile_epochs AdamW epochs after 2 warm-up epochs
+    profiler = PhaseProfiler(device, use_torch_profiler=(profile == 'torch')) if profile else None
+    profile_start = start_epoch + 2
+
+    def finish_profile():
+        profiler.stop()
+        if rank == 0:
+            profiler.export("pinn_profile.json", "pinn_profile.txt")
+            print(f"Profile of {profiler.stats.get('optimizer', (0,))[0]} AdamW epochs (trace: pinn_profile.json):")
+            print(profiler.summary())
+
+    for epoch in range(start_epoch, epochs):
+        if profiler is not None and epoch == profile_start:
+            profiler.start()
+
+        with profile_phase('zero_grad'):
+            optimizer.zero_grad()
+
+        if balancer is not None:
+            weights = balancer.weights
+        if geometric:
+            # New random cases every step; calc_loss_multi runs the backward pass itself
+            with profile_phase('sampling'):
+                batch = multi_geometry_batch(sample_cases(cases_per_step), batch_size // cases_per_step, device)
+            with profile_phase('loss_and_backward'):
+                loss, loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil = calc_loss_multi(batch, rho, mu, model, chunk_size=chunk_size, weights=weights)
+        else:
+            with profile_phase('sampling'):
+                if adaptive is not None:
+                    if epoch % refine_every == 0:
+                        with profile_phase('adaptive_refine'):
+                            adaptive.refine()
+                    x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sample(batch_size - n_adaptive)
+                    x_adaptive, y_adaptive = adaptive.take(n_adaptive)
+                    x_col = torch.cat([x_col, x_adaptive])
+                    y_col = torch.cat([y_col, y_adaptive])
+                else:
+                    x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sample(batch_size)
+
+            with profile_phase('loss'):
+                loss, loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model, weights)
+            if balancer is not None:
+                with profile_phase('loss_balancer'):
+                    balancer.update(epoch, (loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil))
+            with profile_phase('backward'):
+                loss.backward()
+
+        with profile_phase('all_reduce'):
+            all_reduce_gradients(model)
+        with profile_phase('clip'):
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=5.0)
+        with profile_phase('optimizer'):
+            optimizer.step()
+        with profile_phase('scheduler'):
+            if init_from is None:
+                scheduler.step()
         
-        if epoch % 100 == 0:
-            loss_stop.append(loss.item())
-            print(f"Epoch {epoch}/{epochs} | Loss_Total: {loss.item():.5f} (PDE: {loss_pde:.5f}, Inlet: {loss_inlet:.5f}, Outlet: {loss_outlet:.5f}, Top: {loss_top:.5f}, Bot: {loss_bot:.5f}, Airfoil: {loss_wall_airfoil:.5f})")
-            if len(loss_stop) > 3:
-                if abs(loss_stop[-1] - loss_stop[-2]) < 1e-6 and abs(loss_stop[-2] - loss_stop[-3]) < 1e-6:
-                    print("Loss stabilize, training finished !")
-                    break      
+        with profile_phase('logging'):
+            # Losses stay on the device until the next flush (no per-step host sync)
+            recorder.record(loss, loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil)
+            
+            if epoch % 100 == 0:
+                flush_history()
+                loss_total, loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil = last_losses
+                loss_stop.append(loss_total)
+                print(f"Epoch {epoch}/{epochs} | Loss_Total: {loss_total:.5f} (PDE: {loss_pde:.5f}, Inlet: {loss_inlet:.5f}, Outlet: {loss_outlet:.5f}, Top: {loss_top:.5f}, Bot: {loss_bot:.5f}, Airfoil: {loss_wall_airfoil:.5f})")
+                if model.mixed_precision and epoch > 0:
+                    enabled, error = enable_bf16(model, probe, rho, mu, precision_tol)
+                    if not enabled:
+                        print(f"bf16 relative residual error {error:.4f} > {precision_tol}: continuing in fp32.")
+                if len(loss_stop) > 3:
+                    if abs(loss_stop[-1] - loss_stop[-2]) < 1e-6 and abs(loss_stop[-2] - loss_stop[-3]) < 1e-6:
+                        print("Loss stabilize, training finished !")
+                        break      
+                if init_from is not None and epoch > 0:
+                    scheduler.step(np.mean(loss_history[-100:]))
+                    if optimizer.param_groups[0]['lr'] < 1e-6:
+                        print("Fine-tuning converged (AdamW).")
+                        break
+
+        if writer is not None and (epoch + 1) % checkpoint_every == 0:
+            with profile_phase('checkpoint'):
+                flush_history()
+                writer.save(training_state('adamw', epoch, optimizer=optimizer.state_dict(), scheduler=scheduler.state_dict()))
+
+        if profiler is not None and epoch == profile_start + profile_epochs - 1:
+            finish_profile()
+
+    if profiler is not None and profiler.running:
+        # Training stopped inside the profiling window
+        finish_profile()
+    flush_history()
 
     print("Phase 1 (AdamW) finished.")
+    if balancer is not None:
+        weights = balancer.weights
+        print(f"Final loss weights (PDE, Inlet, Outlet, Top, Bot, Airfoil): {[round(w, 3) for w in weights.tolist()]}")
 
     # --- Phase 2: L-BFGS with FIXED multi-angle batch ---
     # All angles in ONE batch → data never changes → L-BFGS is stable
+    model.mixed_precision = False
     del optimizer
     torch.cuda.empty_cache()
 
-    angles_deg = np.linspace(-10, 15, 20)
+    angles_deg = LBFGS_ANGLES_DEG
     batch_per_angle = 1200  
+    # Geometric mode: fixed Sobol set of (alpha, m, p, t) cases, identical on every rank
+    n_cases = LBFGS_CASES
+    batch_per_case = 600
 
-    # Generate and concatenate data for ALL angles at once
-    all_x_col, all_y_col = [], []
-    all_x_bc, all_y_bc, all_u_bc, all_v_bc, all_p_bc = [], [], [], [], []
-    all_alpha_col, all_alpha_bc = [], []
-    all_mask_side = []
-    bc_offset = 0
-
-    for angle_deg in angles_deg:
-        angle_rad = angle_deg * np.pi / 180
-        x_c, y_c, x_b, y_b, u_b, v_b, p_b, alpha_val, m_side = data_generation(
-            x_airfoil, y_airfoil, surface, batch_per_angle, device, fixed_alpha=angle_rad)
-        
-        all_x_col.append(x_c)
-        all_y_col.append(y_c)
-        all_x_bc.append(x_b)
-        all_y_bc.append(y_b)
-        all_u_bc.append(u_b)
-        all_v_bc.append(v_b)
-        all_p_bc.append(p_b)
-        all_alpha_col.append(torch.full_like(x_c, alpha_val))
-        all_alpha_bc.append(torch.full_like(x_b, alpha_val))
-        all_mask_side.append(m_side)
-
-    # Concatenate everything into fixed tensors
-    fix_x_col = torch.cat(all_x_col).detach().requires_grad_(True)
-    fix_y_col = torch.cat(all_y_col).detach().requires_grad_(True)
-    fix_x_bc = torch.cat(all_x_bc).detach().requires_grad_(True)
-    fix_y_bc = torch.cat(all_y_bc).detach().requires_grad_(True)
-    fix_u_bc = torch.cat(all_u_bc)
-    fix_v_bc = torch.cat(all_v_bc)
-    fix_p_bc = torch.cat(all_p_bc)
-    fix_mask_side = torch.cat(all_mask_side)
-
-    
+    # Generate and concatenate data for ALL angles at once (this rank's share when data-parallel)
     optimizer2 = torch.optim.LBFGS(model.parameters(), max_iter=40, history_size=50, line_search_fn='strong_wolfe')
-    best_state = {k: v.clone() for k, v in model.state_dict().items()}
-    best_loss = float('inf')
+    start_epoch2 = 0
+    if checkpoint is not None and checkpoint["phase"] == 'lbfgs':
+        batch = {k: v.to(device) for k, v in checkpoint["batch"].items()}
+        optimizer2.load_state_dict(checkpoint["optimizer"])
+        best_state = {k: v.to(device) for k, v in checkpoint["best_state"].items()}
+        best_loss = checkpoint["best_loss"]
+        start_epoch2 = checkpoint["epoch"] + 1
+    elif geometric:
+        batch = multi_geometry_batch(shard(sample_cases(n_cases, sobol_seed=0).numpy()), batch_per_case, device, n_total=n_cases)
+        best_state = {k: v.clone() for k, v in model.state_dict().items()}
+        best_loss = float('inf')
+    else:
+        batch = multi_angle_batch(x_airfoil, y_airfoil, surface, shard(angles_deg) * np.pi / 180, batch_per_angle, device, pool=pool,
+                                  n_total=len(angles_deg))
+        if hard_constraints:
+            batch = constrain_batch(model, batch)
+        best_state = {k: v.clone() for k, v in model.state_dict().items()}
+        best_loss = float('inf')
+
+    # Device-side telemetry: (total, PDE, inlet, outlet, top, bot, airfoil) of the first closure
+    # evaluation of a step. LBFGS.step always starts by evaluating the parameters accepted by the
+    # previous step, so this is the objective of the previous iterate at no extra cost: it is
+    # logged one epoch late, and only the final iterate is evaluated once more after the loop.
+    telemetry = torch.zeros(7, device=device)
 
     lbfgs_epochs = 250
-    for epoch2 in range(lbfgs_epochs):
-        def closure():
-            optimizer2.zero_grad()
-            total_loss = 0
-            for i, angle_deg in enumerate(angles_deg):
-                angle_rad = angle_deg * np.pi / 180
-                loss_i, *_ = calc_loss(
-                    all_x_col[i], all_y_col[i],
-                    all_x_bc[i], all_y_bc[i],
-                    x_airfoil, y_airfoil,
-                    all_u_bc[i], all_v_bc[i], all_p_bc[i],
-                    rho, mu, angle_rad, all_mask_side[i], model)
-                total_loss = total_loss + loss_i
-            total_loss = total_loss / len(angles_deg)
-            total_loss.backward()
-            return total_loss
-
-        optimizer2.step(closure)
+    best_trace = []
 
-        # Evaluate and log
-        total_loss = 0
-        total_pde = 0
-        total_inlet = 0
-        total_outlet = 0
-        total_top = 0
-        total_bot = 0
-        total_airfoil = 0
-        for i, angle_deg in enumerate(angles_deg):
-            angle_rad = angle_deg * np.pi / 180
-            l, l_pde, l_inlet, l_outlet, l_top, l_bot, l_wall_airfoil= calc_loss(
-                all_x_col[i], all_y_col[i],
-                all_x_bc[i], all_y_bc[i],
-                x_airfoil, y_airfoil,
-                all_u_bc[i], all_v_bc[i], all_p_bc[i],
-                rho, mu, angle_rad, all_mask_side[i], model)
-            total_loss += l.item()
-            total_pde += l_pde.item()
-            total_inlet += l_inlet.item()
-            total_outlet += l_outlet.item()
-            total_top += l_top.item()
-            total_bot += l_bot.item()
-            total_airfoil += l_wall_airfoil.item()
-
-        
-        avg_loss = total_loss / len(angles_deg)
-        avg_pde = total_pde / len(angles_deg)
-        avg_inlet = total_inlet / len(angles_deg)
-        avg_outlet = total_outlet / len(angles_deg)
-        avg_bot = total_bot / len(angles_deg)
-        avg_top = total_top / len(angles_deg)
-        avg_airfoil = total_airfoil / len(angles_deg)
-
-        # NaN detection
+    def record(epoch, state):
+        """Logs the telemetry of the iterate accepted at epoch (parameters state). Returns False on NaN."""
+        nonlocal best_loss, best_state
+        # Single host sync
+        avg_loss, avg_pde, avg_inlet, avg_outlet, avg_top, avg_bot, avg_airfoil = telemetry.tolist()
         if np.isnan(avg_loss):
-            print(f"  L-BFGS epoch {epoch2}: NaN detected, rolling back.")
-            model.load_state_dict(best_state)
-            break
+            print(f"  L-BFGS epoch {epoch}: NaN detected, rolling back.")
+            return False
 
         # Track best model
         if avg_loss < best_loss:
             best_loss = avg_loss
-            best_state = {k: v.clone() for k, v in model.state_dict().items()}
+            best_state = state
+        best_trace.append(best_loss)
 
         loss_history.append(avg_loss)
         loss_pde_history.append(avg_pde)
@@ -614,18 +2163,192 @@ def train(x_airfoil, y_airfoil, surface, rho, mu, batch_size, device):
         loss_airfoil_history.append(avg_airfoil)
         loss_top_bottom_history.append(avg_bot + avg_top)
 
-        if epoch2 % 10 == 0:
-            print(f"  L-BFGS epoch {epoch2}/{lbfgs_epochs} | Avg Loss: {avg_loss:.6f} (PDE: {avg_pde:.5f}, Inlet: {avg_inlet:.5f}, Outlet: {avg_outlet:.5f}, Top: {avg_top:.5f}, Bot: {avg_bot:.5f}, Airfoil: {avg_airfoil:.5f})")
+        if epoch % 10 == 0:
+            print(f"  L-BFGS epoch {epoch}/{lbfgs_epochs} | Avg Loss: {avg_loss:.6f} (PDE: {avg_pde:.5f}, Inlet: {avg_inlet:.5f}, Outlet: {avg_outlet:.5f}, Top: {avg_top:.5f}, Bot: {avg_bot:.5f}, Airfoil: {avg_airfoil:.5f})")
+        return True
+
+    healthy = True
+    epoch2 = start_epoch2 - 1
+    for epoch2 in range(start_epoch2, lbfgs_epochs):
+        # Parameters accepted by the previous step (the ones the first closure call evaluates)
+        previous_state = {k: v.clone() for k, v in model.state_dict().items()}
+        evaluations = 0
+
+        def closure():
+            nonlocal evaluations
+            optimizer2.zero_grad()
+            losses = torch.stack(calc_loss_multi(batch, rho, mu, model, chunk_size=chunk_size, weights=weights))
+            # Shards of the objective are additive: sum losses and gradients over the ranks
+            all_reduce_(losses)
+            all_reduce_gradients(model, average=False)
+            if evaluations == 0:
+                telemetry.copy_(losses)
+            evaluations += 1
+            return losses[0]
+
+        optimizer2.step(closure)
+
+        # Telemetry of the previous iterate (the initial parameters are not logged in a fresh run)
+        if epoch2 > 0 and not record(epoch2 - 1, previous_state):
+            healthy = False
+            break
+
+        if writer is not None and (epoch2 + 1) % 10 == 0:
+            writer.save(training_state('lbfgs', epoch2, optimizer=optimizer2.state_dict(), batch=batch, best_state=best_state, best_loss=best_loss))
+
+        if init_from is not None and len(best_trace) > 10 and best_trace[-11] - best_loss < fine_tune_tol*best_trace[-11]:
+            print(f"Fine-tuning converged (L-BFGS epoch {epoch2 - 1}).")
+            break
+
+    # The iterate accepted by the last step has not been evaluated yet
+    if healthy and epoch2 >= start_epoch2:
+        telemetry.copy_(torch.stack(calc_loss_multi(batch, rho, mu, model, chunk_size=chunk_size, weights=weights, backward=False)))
+        all_reduce_(telemetry)
+        record(epoch2, {k: v.clone() for k, v in model.state_dict().items()})
 
     # Restore best model from Phase 2
     model.load_state_dict(best_state)
     print(f"Phase 2 (L-BFGS) finished. Best loss: {best_loss:.6f}")
 
-    torch.save(model.state_dict(), "pinn_airfoil_model_V2.pth")
+    if writer is not None:
+        writer.close()
+    if rank != 0:
+        return
+
+    torch.save(model.state_dict(), "pinn_airfoil_model_geometric.pth" if geometric else "pinn_airfoil_model_V2.pth")
     print("Modèle enregistré avec succès !")
 
     visualize_loss(loss_history, loss_pde_history, loss_inlet_history, loss_outlet_history, loss_top_bottom_history, loss_airfoil_history)
 
+def interface_residuals(model, interface, alpha, rho, mu):
+    """
+    Quantities that must agree on both sides of an XPINN interface: the flow (u, v, p),
+    the normal derivatives of u and v (viscous flux) and the Navier-Stokes residuals.
+
+    Args:
+        model (PINN): Network of one subdomain.
+        interface (dict): Interface points (see interface_points).
+        alpha (float): Angle of attack in radians.
+        rho (float): Fluid density.
+        mu (float): Dynamic viscosity.
+
+    Returns:
+        torch.Tensor: [K, 8] columns (u, v, p, du/dn, dv/dn, ns_x, ns_y, continuity).
+    """
+    out, d_dx, d_dy, d2_dx2, d2_dy2 = calc_derivatives(model, interface['x'], interface['y'], alpha)
+    normal = interface['normal']
+    d_dn = d_dx[:,0:2]*normal[:,0:1] + d_dy[:,0:2]*normal[:,1:2]
+    return torch.cat([out, d_dn, *ns_residuals(out, d_dx, d_dy, d2_dx2, d2_dy2, rho, mu)], dim=1)
+
+def train_subdomain(x_airfoil, y_airfoil, surface, rho, mu, batch_size, boxes, hidden, epochs, n_interface, interface_weight, seed, path,
+                    compile_mode=False):
+    """
+    XPINN worker: trains the network of the subdomain whose index is the rank of the process
+    (see train_xpinn). Every step, the interface quantities of all networks are exchanged with
+    one all-gather, and each network is pulled towards the (detached) values of its neighbours.
+    With compile_mode, each rank compiles its own network (compile_model, eager fallback).
+    Rank 0 saves the stitched XPINN.
+    """
+    rank, n_subdomains = get_rank(), get_world_size()
+    torch.manual_seed(seed + rank)
+    np.random.seed(seed + rank)
+    random.seed(seed + rank)
+    device = torch.device('cpu')
+    # Same angle sequence on every rank: the interface terms compare the networks at the same angle
+    angles = random.Random(seed)
+
+    interface = interface_points(boxes, (x_min, x_max, y_min, y_max), n_interface)
+    own = (interface['a'] == rank) | (interface['b'] == rank)
+    neighbour = torch.where(interface['a'] == rank, interface['b'], interface['a'])
+    wall = subdomain_index(x_airfoil, y_airfoil, boxes) == rank
+    x_wall, y_wall = x_airfoil[wall], y_airfoil[wall]
+
+    # Draw enough points over the whole domain for this subdomain to get its share of the batch
+    size = batch_size // n_subdomains
+    x_col, y_col, *_ = data_generation(x_airfoil, y_airfoil, surface, 4*size, device)
+    share = (subdomain_index(x_col, y_col, boxes) == rank).float().mean().item()
+    oversample = int(np.ceil(1.1 / max(share, 1e-3)))
+
+    def sample(alpha):
+        x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = data_generation(x_airfoil, y_airfoil, surface, size*oversample, device, fixed_alpha=alpha)
+        col = subdomain_index(x_col, y_col, boxes) == rank
+        bc = subdomain_index(x_bc, y_bc, boxes) == rank
+        return (x_col[col][:size], y_col[col][:size], x_bc[bc], y_bc[bc], u_bc[bc], v_bc[bc], p_bc[bc], alpha, mask_side[bc])
+
+    x_col, y_col, *_ = sample(0.0)
+    alpha_range = torch.linspace(-10*np.pi/180, 15*np.pi/180, x_col.shape[0]).unsqueeze(1)
+    x_norm = Normalizer(torch.cat([x_col, y_col, alpha_range], dim=1).detach(), device=device)
+    model = PINN(hidden=hidden)
+    with torch.no_grad():
+        model.mu.copy_(x_norm.mean)
+        model.sigma.copy_(x_norm.std)
+    if compile_mode:
+        compile_model(model)
+
+    optimizer = torch.optim.AdamW(parameter_groups(model, 0.002), lr=0.002)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=epochs, eta_min=1e-5)
+    names = SUBDOMAIN_NAMES if len(SUBDOMAIN_NAMES) == n_subdomains else [f"subdomain {i}" for i in range(n_subdomains)]
+    print(f"Starting XPINN training: {', '.join(names)}, {size} points per subdomain, {interface['x'].shape[0]} interface points")
+
+    for epoch in range(epochs):
+        optimizer.zero_grad()
+        alpha = angles.uniform(-10, 15) * np.pi / 180
+        x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sample(alpha)
+        loss, loss_pde, loss_inlet, loss_outlet, loss_top, loss_bot, loss_wall_airfoil = calc_loss(x_col, y_col, x_bc, y_bc, x_wall, y_wall, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+
+        stats = interface_residuals(model, interface, alpha, rho, mu)
+        others = all_gather(stats.detach())[neighbour, torch.arange(stats.shape[0])]
+        loss_interface = ((stats - others)**2)[own].mean()
+        (loss + interface_weight*loss_interface).backward()
+
+        torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=5.0)
+        optimizer.step()
+        scheduler.step()
+
+        if epoch % 100 == 0:
+            losses = all_gather(torch.stack([loss, loss_pde, loss_inlet + loss_outlet + loss_top + loss_bot + loss_wall_airfoil, loss_interface]).detach())
+            for name, (total, pde, bc, interface_loss) in zip(names, losses.tolist()):
+                print(f"Epoch {epoch}/{epochs} | {name:10s} | Loss_Total: {total:.5f} (PDE: {pde:.5f}, BC: {bc:.5f}, Interface: {interface_loss:.5f})")
+
+    states = all_gather_object(model.state_dict())
+    if rank != 0:
+        return
+    networks = []
+    for state in states:
+        network = PINN(hidden=hidden)
+        network.load_state_dict(state)
+        networks.append(network)
+    torch.save(XPINN(boxes, networks).state_dict(), path)
+    print(f"Modèle enregistré avec succès ! ({path})")
+
+def train_xpinn(x_airfoil, y_airfoil, surface, rho, mu, batch_size, boxes=SUBDOMAIN_BOXES, hidden=64, epochs=1500,
+                n_interface=512, interface_weight=10.0, seed=0, path="pinn_airfoil_model_xpinn.pth", compile_mode=False):
+    """
+    Domain-decomposed (XPINN) training: the domain is split into the subdomain boxes plus the
+    far field, and each subdomain gets its own small PINN trained in a separate process
+    (torch.distributed, gloo on localhost). The networks are coupled by interface losses on
+    shared interface points: continuity of the flow, of the normal derivatives of the velocity
+    and of the Navier-Stokes residuals. Training is AdamW only: the L-BFGS line search makes a
+    variable number of evaluations per step, which would desynchronise the interface exchanges.
+
+    Args:
+        x_airfoil, y_airfoil (torch.Tensor): Airfoil geometry.
+        surface (AirfoilMask): Airfoil classifier for point masking.
+        rho (float): Fluid density.
+        mu (float): Fluid viscosity.
+        batch_size (int): Collocation points per step, split evenly between the subdomains.
+        boxes (sequence): Subdomain boxes (x_min, x_max, y_min, y_max); the far field is the rest.
+        hidden (int): Hidden width of the subdomain networks.
+        epochs (int): AdamW epochs.
+        n_interface (int): Approximate number of interface points.
+        interface_weight (float): Weight of the interface loss.
+        seed (int): Base seed of the sampling.
+        path (str): Output file of the stitched model (see XPINN and load_model).
+        compile_mode (bool): Compile every subdomain network with compile_model (eager fallback).
+    """
+    launch(len(boxes) + 1, train_subdomain, x_airfoil.cpu(), y_airfoil.cpu(), surface.to('cpu'), rho, mu, batch_size,
+           boxes, hidden, epochs, n_interface, interface_weight, seed, path, compile_mode)
+
 # --- 5. Results and Visualization ---
 def visualize_loss(loss_history, loss_pde_history, loss_inlet_history, loss_outlet_history, loss_top_bottom_history, loss_airfoil_history):
     """
@@ -664,7 +2387,7 @@ def visualize_loss(loss_history, loss_pde_history, loss_inlet_history, loss_outl
     plt.tight_layout()
     plt.savefig("Residual_PINN_V2.png", dpi=150, bbox_inches='tight')
 
-def visualise_field(model, x_min, x_max, y_min, y_max, x_airfoil, y_airfoil, alpha, grid_size, device):
+def visualise_field(model, x_min, x_max, y_min, y_max, x_airfoil, y_airfoil, alpha, grid_size, device, m=None, p=None, t=None):
     """
     Visualizes flow fields (velocity u, v and pressure p) across the simulation domain.
 
@@ -675,50 +2398,31 @@ def visualise_field(model, x_min, x_max, y_min, y_max, x_airfoil, y_airfoil, alp
         alpha (float): Angle of attack.
         grid_size (int): Resolution of the visualization grid.
         device (torch.device): Computing device.
+        m, p, t (float, optional): NACA parameters as chord fractions, required by a geometric model.
     """
     # Grid for global visualization
     x_grid = np.linspace(x_min, x_max, grid_size)
     y_grid = np.linspace(y_min, y_max, grid_size)
     X, Y = np.meshgrid(x_grid, y_grid)
 
-    # Convert to tensors for prediction
-    x_test = torch.tensor(X.flatten()[:, None], dtype=torch.float32).to(device)
-    y_test = torch.tensor(Y.flatten()[:, None], dtype=torch.float32).to(device)
-
-    x_test_np =  x_test.detach().cpu().numpy()
-    y_test_np =  y_test.detach().cpu().numpy()
-
-    surface = Polygon(np.column_stack((x_airfoil.cpu().numpy(), y_airfoil.cpu().numpy())))
-
-    # Prediction
-    model.eval()
-    with torch.no_grad():
-        out = model(x_test, y_test, torch.full_like(x_test,alpha)).cpu().numpy()
-        u_pred = out[:,0:1].reshape(grid_size,grid_size)
-        v_pred = out[:,1:2].reshape(grid_size,grid_size)
-        p_pred = out[:,2:3].reshape(grid_size,grid_size)
-
-        # Logique de masquage
-        mask_grid = np.array([surface.contains(Point(x, y)) for x, y in zip(x_test_np, y_test_np)])
-        u_pred_masked = u_pred.copy()
-        u_pred_masked[mask_grid.reshape(grid_size, grid_size)] = np.nan
+    surface = AirfoilMask(x_airfoil, y_airfoil, device)
 
-        v_pred_masked = v_pred.copy()
-        v_pred_masked[mask_grid.reshape(grid_size, grid_size)] = np.nan
+    # Prediction tile by tile (bounded memory), points inside the airfoil masked with NaN
+    field = np.empty((3, grid_size, grid_size), dtype=np.float32)
+    for _ in stream_field(model, (x_min, x_max, y_min, y_max), grid_size, alpha, m, p, t, surface=surface, out=field):
+        pass
+    u_pred_masked, v_pred_masked, p_pred_masked = field
 
-        p_pred_masked = p_pred.copy()
-        p_pred_masked[mask_grid.reshape(grid_size, grid_size)] = np.nan
+    u_optimum = u_pred_masked[~np.isnan(u_pred_masked)]
+    v_optimum = v_pred_masked[~np.isnan(v_pred_masked)]
+    p_optimum = p_pred_masked[~np.isnan(p_pred_masked)]
 
-        u_optimum = u_pred_masked[~np.isnan(u_pred_masked)]
-        v_optimum = v_pred_masked[~np.isnan(v_pred_masked)]
-        p_optimum = p_pred_masked[~np.isnan(p_pred_masked)]
-
-        u_min = u_optimum.min()
-        u_max = u_optimum.max()
-        v_min = v_optimum.min()
-        v_max = v_optimum.max()
-        p_min = p_optimum.min()
-        p_max = p_optimum.max()
+    u_min = u_optimum.min()
+    u_max = u_optimum.max()
+    v_min = v_optimum.min()
+    v_max = v_optimum.max()
+    p_min = p_optimum.min()
+    p_max = p_optimum.max()
 
     # --- Plotting ---
 
@@ -759,6 +2463,21 @@ def visualise_field(model, x_min, x_max, y_min, y_max, x_airfoil, y_airfoil, alp
     plt.tight_layout()
     plt.savefig("Field_Global_PINN_V2.png", dpi=150, bbox_inches='tight')
 
+def load_cfd_coefficients(alpha_deg, case_dir="Validation_PINN_OF/airFoil_PINN_Validation"):
+    """
+    Converged OpenFOAM lift and drag coefficients of the validation case (last time step
+    of the forces function object).
+
+    Args:
+        alpha_deg (float): Angle of attack in degrees (-4, 0 or 8).
+        case_dir (str): OpenFOAM case directory.
+
+    Returns:
+        tuple: (cl, cd)
+    """
+    data = np.loadtxt(f"{case_dir}/postProcessing/forces/0/coefficient_{alpha_deg:.0f}.dat", comments='#')
+    return data[-1,4], data[-1,1]
+
 def comparison_cfd(m, p, t, rho, mu, model, alpha, of, device, cfd_file):
     """
     Compares the PINN simulation results with OpenFOAM CFD data for validation.
@@ -774,6 +2493,8 @@ def comparison_cfd(m, p, t, rho, mu, model, alpha, of, device, cfd_file):
         cfd_file (str): Path to OpenFOAM .foam file.
     """
 
+    alpha_deg = alpha*180/np.pi
+
     if not os.path.exists(cfd_file):
         with open(cfd_file, 'w') as f:
             pass
@@ -793,11 +2514,7 @@ def comparison_cfd(m, p, t, rho, mu, model, alpha, of, device, cfd_file):
     v_cfd = velocity_cfd[:,1:2]
     p_cfd = internal_mesh.point_data["p"]
 
-    alpha_deg = alpha*180/np.pi
-
-    data = np.loadtxt(f"Validation_PINN_OF/airFoil_PINN_Validation/postProcessing/forces/0/coefficient_{alpha_deg:.0f}.dat", comments='#')
-    cl_cfd = data[-1,4]
-    cd_cfd = data[-1,1]
+    cl_cfd, cd_cfd = load_cfd_coefficients(alpha_deg)
 
     Cl_pred, Cd_pred = calc_force(m, p, t, mu, rho, alpha, model, device)
 
@@ -806,14 +2523,13 @@ def comparison_cfd(m, p, t, rho, mu, model, alpha, of, device, cfd_file):
     print(f'cd_pred = {Cd_pred:.3f}')
     print(f'cd_cfd = {cd_cfd:.3f}')
 
-    # Prediction
+    # Prediction (the mesh is shared by every angle of the case: spatial latent cached, see predict)
     model.eval()
     with torch.no_grad():
-        out = model(coords[:,0:1], coords[:,1:2], torch.full_like(coords[:,0:1],alpha)).cpu().numpy()
+        out = predict(model, coords[:,0:1], coords[:,1:2], alpha, m, p, t, cache_key=('mesh', cfd_file)).cpu().numpy()
         u_pred = out[:,0:1]
         v_pred = out[:,1:2]
         p_pred = out[:,2:3]
-   
 
     u_min = u_cfd.min()
     u_max = u_cfd.max()
@@ -896,6 +2612,24 @@ if __name__ == "__main__":
     parser.add_argument('-t', action='store_true', help='Launch Training')
     parser.add_argument('-v', type=str, help='Path to the model .pth')
     parser.add_argument('-c', type=str, help='Path to the model .pth')
+    parser.add_argument('--polar', type=str, default=None, help='Path to the model .pth: computes the Cl/Cd polar and writes it as CSV')
+    parser.add_argument('--alphas', type=float, nargs=3, default=[-10.0, 15.0, 0.25], metavar=('START', 'STOP', 'STEP'), help='Angles of attack of the polar in degrees (STOP included)')
+    parser.add_argument('--polar_csv', type=str, default='polar.csv', help='Output CSV of the polar')
+    parser.add_argument('--slope', action='store_true', help='Add the lift slope dCl/dalpha (per radian) to the polar')
+    parser.add_argument('--lbfgs_memory', type=float, default=None, help='Memory budget in MB per pass of the L-BFGS objective (chunks the multi-angle batch)')
+    parser.add_argument('--sampler', choices=['random', 'sobol', 'adaptive'], default='random', help='Collocation sampler: new uniform points each epoch, a device-resident Sobol pool, or Sobol plus residual-based adaptive points')
+    parser.add_argument('--loss_weights', choices=['fixed', 'balanced'], default='fixed', help='Fixed hand-tuned loss weights or self-balancing weights by gradient-norm balancing')
+    parser.add_argument('--batch_size', type=int, default=18000, help='Collocation batch size of the AdamW phase')
+    parser.add_argument('--ranks', type=int, default=1, help='Number of data-parallel training processes (torch.distributed, gloo on localhost)')
+    parser.add_argument('--resume', action='store_true', help='Resume training from the last checkpoint (pinn_checkpoint.pt)')
+    parser.add_argument('--compile', action='store_true', help='Compile the forward and derivative passes with torch.compile (falls back to eager on failure)')
+    parser.add_argument('--hard_constraints', action='store_true', help='Impose the wall and inlet/top/bottom conditions exactly with a distance-function output transform')
+    parser.add_argument('--fine_tune', type=str, default=None, help='Fine-tune from an existing model .pth instead of training from scratch (stops on convergence)')
+    parser.add_argument('--encoder', choices=['fourier', 'hash'], default='fourier', help='Spatial encoder: Fourier features or a trainable multiresolution hash grid')
+    parser.add_argument('--xpinn', action='store_true', help='Domain-decomposed training: one small network per subdomain (near-wall, wake, far field), each in its own process')
+    parser.add_argument('--precision', choices=['fp32', 'bf16'], default='fp32', help='bf16 runs the Linear layers of the AdamW phase under autocast (fp32 derivatives, residual accuracy guard)')
+    parser.add_argument('--profile', choices=['phases', 'torch'], default=None, help='Profile 20 AdamW epochs per phase (wall time, allocations with torch): pinn_profile.json Chrome trace and pinn_profile.txt summary')
+    parser.add_argument('--geometric', action='store_true', help='Train one model over the NACA 4-digit family (alpha, m, p, t) instead of a single airfoil')
     args = parser.parse_args()
 
     # Configuration for reproducibility
@@ -906,14 +2640,11 @@ if __name__ == "__main__":
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     print(f"Training on: {device}")
 
-    x_max = 2.0
-    x_min = -1
-    y_max = 1
-    y_min = -1
-
-    m = 2 
-    p = 4 
-    t = 12
+    # NACA 2412 as chord fractions, the unit of every geometry argument (generate_airfoil,
+    # calc_force, conditioning of a geometric model)
+    m = 0.02
+    p = 0.4
+    t = 0.12
 
     rho = 1.0
     mu = 0.01
@@ -923,8 +2654,17 @@ if __name__ == "__main__":
     # Entrainement 
     if args.t:
         print("Training Mode Starting...")
-        batch_size = 18000
-        train(x_airfoil, y_airfoil, surface, rho, mu, batch_size, device)
+        batch_size = args.batch_size
+        options = dict(lbfgs_memory=args.lbfgs_memory, sampler=args.sampler, seed=42, loss_weights=args.loss_weights,
+                       compile_mode=args.compile, resume=args.resume, geometric=args.geometric,
+                       hard_constraints=args.hard_constraints, init_from=args.fine_tune, encoder=args.encoder,
+                       precision=args.precision, profile=args.profile)
+        if args.xpinn:
+            train_xpinn(x_airfoil, y_airfoil, surface, rho, mu, batch_size, compile_mode=args.compile)
+        elif args.ranks > 1:
+            launch(args.ranks, train, x_airfoil.cpu(), y_airfoil.cpu(), surface.to('cpu'), rho, mu, batch_size, torch.device('cpu'), **options)
+        else:
+            train(x_airfoil, y_airfoil, surface, rho, mu, batch_size, device, **options)
 
 
     # Visulisation 
@@ -934,15 +2674,31 @@ if __name__ == "__main__":
         alpha_rad = alpha*np.pi/180
         x_airfoil = x_airfoil.cpu()
         y_airfoil = y_airfoil.cpu()
-        model = PINN().to(device)
-        model.load_state_dict(torch.load(args.v))
-        visualise_field(model, x_min, x_max, y_min, y_max, x_airfoil, y_airfoil, alpha_rad, grid_size=1024, device=device )
+        model = load_model(args.v, device)
+        if args.compile:
+            compile_model(model)
+        visualise_field(model, x_min, x_max, y_min, y_max, x_airfoil, y_airfoil, alpha_rad, grid_size=1024, device=device,
+                        m=m, p=p, t=t)
+
+    # Polaire
+    elif args.polar:
+        print("Polar Mode launch ")
+        model = load_model(args.polar, device)
+        if args.compile:
+            compile_model(model)
+        start, stop, step = args.alphas
+        alphas_deg = np.arange(start, stop + step/2, step)
+        result = polar(m, p, t, alphas_deg*np.pi/180, mu, rho, model, device, slope=args.slope, csv_path=args.polar_csv)
+        best = np.argmax(result['cl']/result['cd'])
+        print(f"{len(alphas_deg)} angles written to {args.polar_csv} | Cl max {result['cl'].max():.3f}, "
+              f"best Cl/Cd {result['cl'][best]/result['cd'][best]:.2f} at {alphas_deg[best]:.2f} deg")
 
     # Comparaison 
     elif args.c:
         print("Comparison Mode launch ")
-        model = PINN().to(device)
-        model.load_state_dict(torch.load(args.c))
+        model = load_model(args.c, device)
+        if args.compile:
+            compile_model(model)
 
         # AOA = 0
         alpha = 0.0
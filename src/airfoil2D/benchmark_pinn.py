@@ -0,0 +1,1400 @@
+import torch
+import numpy as np
+import time
+import argparse
+import resource
+import os
+import tempfile
+import multiprocessing as mp
+import torch.distributed as dist
+from shapely.geometry import Point, Polygon
+from src.airfoil2D.pinn_sampling import CollocationPool, ResidualSampler
+from src.airfoil2D.pinn_distributed import launch, get_rank, get_world_size, shard, broadcast_model, all_reduce_, all_reduce_gradients
+from src.airfoil2D.pinn_geometry import naca4_batch, airfoil_polygon, panel_geometry
+from src.airfoil2D.generate_naca import generate_naca4
+from src.airfoil2D.PINN_Airfoil import x_min, x_max, y_min, y_max, Normalizer, PINN, generate_airfoil, data_generation, calc_derivatives, calc_loss, calc_loss_multi, calc_residual, multi_angle_batch, chunk_size_from_memory, LossBalancer, compile_model, taylor_derivatives, sample_cases, multi_geometry_batch, HardBoundary, constrain_batch, warm_start, calc_force, polar, predict, stream_field, conditioning, load_cfd_coefficients, parameter_groups, load_model, train_xpinn, interface_residuals, enable_bf16, bf16_residual_error
+from src.airfoil2D.pinn_subdomains import SUBDOMAIN_BOXES, SUBDOMAIN_NAMES, subdomain_index, interface_points
+from src.airfoil2D.pinn_profiler import PhaseProfiler, profile_phase
+from src.airfoil2D.pinn_derived import derived_fields
+from src.airfoil2D.pinn_streamlines import trace_streamlines
+
+# Run from the repository root: python -m src.airfoil2D.benchmark_pinn --sampling --derivatives --lbfgs --adaptive --weights --compile --distributed --geometry --constraints --fine_tune --encoding --xpinn --precision --profile --forces --polar --sweep --streaming --derived --streamlines
+
+def timeit(fn, iterations, device):
+    """
+    Returns the average wall time of fn() in seconds after one warm-up call.
+    """
+    fn()
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start_time) / iterations
+
+def peak_memory(fn, device):
+    """
+    Runs fn() once and returns its peak memory in MB.
+    On CPU the call runs in a fresh process so the resident set size is not shared between variants.
+    """
+    if device.type == 'cuda':
+        torch.cuda.reset_peak_memory_stats()
+        fn()
+        return torch.cuda.max_memory_allocated() / 1024**2
+
+    def child(queue):
+        base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        fn()
+        queue.put((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024)
+
+    ctx = mp.get_context('fork')
+    queue = ctx.Queue()
+    process = ctx.Process(target=child, args=(queue,))
+    process.start()
+    process.join()
+    return queue.get() if process.exitcode == 0 else float('nan')
+
+def trained_model(source_path, device):
+    """
+    The trained model at source_path, or a randomly initialized PINN when it is missing
+    (the timings hold, the accuracy figures do not).
+    """
+    return load_model(source_path, device) if os.path.exists(source_path) else PINN().to(device)
+
+def legacy_derivatives(model, x, y, alpha):
+    """
+    Reference derivative block of calc_loss: ten separate reverse-mode autograd.grad calls.
+    """
+    x = x.detach().requires_grad_(True)
+    y = y.detach().requires_grad_(True)
+    out = model(x, y, torch.full_like(x, alpha))
+    u, v, p = out[:,0:1], out[:,1:2], out[:,2:3]
+
+    def grad(f, z):
+        return torch.autograd.grad(f, z, torch.ones_like(f), create_graph=True, retain_graph=True)[0]
+
+    du_dx, du_dy = grad(u, x), grad(u, y)
+    dv_dx, dv_dy = grad(v, x), grad(v, y)
+    dp_dx, dp_dy = grad(p, x), grad(p, y)
+    d_dx = torch.cat([du_dx, dv_dx, dp_dx], dim=1)
+    d_dy = torch.cat([du_dy, dv_dy, dp_dy], dim=1)
+    d2_dx2 = torch.cat([grad(du_dx, x), grad(dv_dx, x)], dim=1)
+    d2_dy2 = torch.cat([grad(du_dy, y), grad(dv_dy, y)], dim=1)
+    return out, d_dx, d_dy, d2_dx2, d2_dy2
+
+def benchmark_derivatives(m, p, t, batch_size, iterations, device, rho=1.0, mu=0.01):
+    """
+    Per-epoch cost of the Navier-Stokes residual (derivatives, loss and backward):
+    ten autograd.grad calls vs the single-pass calc_derivatives engine.
+    """
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    x_col, y_col, *_, alpha, _ = data_generation(x_airfoil, y_airfoil, surface, batch_size, device, fixed_alpha=0.1)
+    model = PINN().to(device)
+
+    def step(engine):
+        def run():
+            model.zero_grad()
+            out, d_dx, d_dy, d2_dx2, d2_dy2 = engine(model, x_col, y_col, alpha)
+            u, v = out[:,0:1], out[:,1:2]
+            ns_x = rho*(u*d_dx[:,0:1] + v*d_dy[:,0:1]) + d_dx[:,2:3] - mu*(d2_dx2[:,0:1] + d2_dy2[:,0:1])
+            ns_y = rho*(u*d_dx[:,1:2] + v*d_dy[:,1:2]) + d_dy[:,2:3] - mu*(d2_dx2[:,1:2] + d2_dy2[:,1:2])
+            loss = torch.mean(ns_x**2) + torch.mean(ns_y**2) + torch.mean((d_dx[:,0:1] + d_dy[:,1:2])**2)
+            loss.backward()
+            return loss
+        return run
+
+    # Memory first, before the timing runs grow the parent process
+    mem_legacy = peak_memory(step(legacy_derivatives), device)
+    mem_engine = peak_memory(step(calc_derivatives), device)
+
+    legacy_loss = step(legacy_derivatives)().item()
+    engine_loss = step(calc_derivatives)().item()
+
+    t_legacy = timeit(step(legacy_derivatives), iterations, device)
+    t_engine = timeit(step(calc_derivatives), iterations, device)
+
+    print("-" * 30)
+    print(f"Derivative benchmark ({x_col.shape[0]} collocation points from batch_size={batch_size})")
+    print(f"autograd.grad x10   : {t_legacy*1000:.1f} ms/epoch | peak {mem_legacy:.0f} MB")
+    print(f"calc_derivatives    : {t_engine*1000:.1f} ms/epoch | peak {mem_engine:.0f} MB (x{t_legacy/t_engine:.2f})")
+    print(f"PDE loss legacy/engine : {legacy_loss:.6e} / {engine_loss:.6e}")
+    print("-" * 30)
+
+def benchmark_lbfgs(m, p, t, batch_per_angle, iterations, device, memory_mb=None, rho=1.0, mu=0.01):
+    """
+    Cost of one L-BFGS objective evaluation on the fixed 20-angle batch:
+    Python loop of calc_loss per angle vs the fused calc_loss_multi.
+    """
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    angles_rad = np.linspace(-10, 15, 20) * np.pi / 180
+    batch = multi_angle_batch(x_airfoil, y_airfoil, surface, angles_rad, batch_per_angle, device)
+    model = PINN().to(device)
+
+    # Per-angle views of the same batch for the legacy closure
+    per_angle = []
+    for angle_rad in angles_rad:
+        col = batch['alpha_col'].view(-1) == torch.tensor(angle_rad, dtype=torch.float32)
+        bc = batch['alpha_bc'].view(-1) == torch.tensor(angle_rad, dtype=torch.float32)
+        per_angle.append((batch['x_col'][col], batch['y_col'][col], batch['x_bc'][bc], batch['y_bc'][bc],
+                          batch['u_bc'][bc], batch['v_bc'][bc], batch['p_bc'][bc], batch['side_bc'][bc].view(-1,1)))
+
+    def legacy_closure():
+        model.zero_grad()
+        total_loss = 0
+        for angle_rad, (x_c, y_c, x_b, y_b, u_b, v_b, p_b, side) in zip(angles_rad, per_angle):
+            loss_i, *_ = calc_loss(x_c, y_c, x_b, y_b, x_airfoil, y_airfoil, u_b, v_b, p_b, rho, mu, angle_rad, side, model)
+            total_loss = total_loss + loss_i
+        total_loss = total_loss / len(angles_rad)
+        total_loss.backward()
+        return total_loss
+
+    chunk_size = chunk_size_from_memory(memory_mb, model.hidden) if memory_mb else None
+
+    def fused_closure():
+        model.zero_grad()
+        return calc_loss_multi(batch, rho, mu, model, chunk_size=chunk_size)[0]
+
+    t_legacy = timeit(legacy_closure, iterations, device)
+    t_fused = timeit(fused_closure, iterations, device)
+
+    print("-" * 30)
+    print(f"L-BFGS objective benchmark (20 angles x {batch_per_angle} points, {batch['x_col'].shape[0]} collocation points, chunk_size={chunk_size})")
+    print(f"Loss legacy/fused : {legacy_closure().item():.6e} / {fused_closure().item():.6e}")
+    print(f"calc_loss x20     : {t_legacy*1000:.1f} ms/evaluation")
+    print(f"calc_loss_multi   : {t_fused*1000:.1f} ms/evaluation (x{t_legacy/t_fused:.2f})")
+    print(f"L-BFGS epoch (max_iter=40) : {t_legacy*40:.1f} s -> {t_fused*40:.1f} s")
+    print("-" * 30)
+
+def benchmark_adaptive(m, p, t, batch_size, epochs, device, rho=1.0, mu=0.01, eval_every=10):
+    """
+    Time-to-target loss of a short AdamW run: uniform random sampler at batch_size vs
+    residual-based adaptive sampler at half the points per step. The target is the loss
+    the uniform sampler reaches after the given number of epochs, measured with calc_loss
+    on a fixed Sobol validation batch at -4, 0 and 8 degrees.
+    """
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=1)
+    validation = [pool.sample(2000, fixed_alpha=a*np.pi/180) for a in (-4.0, 0.0, 8.0)]
+
+    def validation_loss(model):
+        total = 0.0
+        for x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side in validation:
+            loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+            total += loss.item() / len(validation)
+        return total
+
+    # Same input normalization for both runs, computed as in train()
+    x_col, y_col, *_ = data_generation(x_airfoil, y_airfoil, surface, batch_size, device)
+    alpha_range = torch.linspace(-10*np.pi/180, 15*np.pi/180, x_col.shape[0]).unsqueeze(1).to(device)
+    x_norm = Normalizer(torch.cat([x_col, y_col, alpha_range], dim=1), device=device)
+
+    def run(mode, size):
+        torch.manual_seed(0)
+        model = PINN().to(device)
+        with torch.no_grad():
+            model.mu.copy_(x_norm.mean)
+            model.sigma.copy_(x_norm.std)
+        optimizer = torch.optim.AdamW(model.parameters(), lr=0.002)
+        sampler_pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=0)
+        adaptive = None
+        if mode == 'adaptive':
+            n_adaptive = int(0.5*size)
+            adaptive = ResidualSampler(sampler_pool, lambda x, y, a: calc_residual(model, x, y, a, rho, mu), n_adaptive, n_candidates=8*size)
+
+        curve = []
+        elapsed = 0.0
+        for epoch in range(epochs):
+            start_time = time.perf_counter()
+            optimizer.zero_grad()
+            if adaptive is not None:
+                if epoch % 50 == 0:
+                    adaptive.refine()
+                x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sampler_pool.sample(size - n_adaptive)
+                x_adaptive, y_adaptive = adaptive.take(n_adaptive)
+                x_col = torch.cat([x_col, x_adaptive])
+                y_col = torch.cat([y_col, y_adaptive])
+            else:
+                x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = data_generation(x_airfoil, y_airfoil, surface, size, device)
+            loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=5.0)
+            optimizer.step()
+            elapsed += time.perf_counter() - start_time
+            if (epoch + 1) % eval_every == 0:
+                curve.append((epoch + 1, elapsed, validation_loss(model)))
+        return curve
+
+    uniform = run('random', batch_size)
+    adaptive = run('adaptive', batch_size // 2)
+    target = uniform[-1][2]
+
+    def time_to_target(curve):
+        for epoch, elapsed, loss in curve:
+            if loss <= target:
+                return f"{epoch} epochs, {elapsed:.1f} s"
+        return f"not reached (final loss {curve[-1][2]:.3e})"
+
+    print("-" * 30)
+    print(f"Adaptive collocation benchmark ({epochs} AdamW epochs, target validation loss {target:.3e})")
+    print(f"Uniform  (batch_size={batch_size})      : {time_to_target(uniform)}")
+    print(f"Adaptive (batch_size={batch_size // 2}) : {time_to_target(adaptive)} | final loss {adaptive[-1][2]:.3e}")
+    print("-" * 30)
+
+def benchmark_weights(m, p, t, batch_size, epochs, device, rho=1.0, mu=0.01, eval_every=10, iterations=10):
+    """
+    Time-to-target loss of a short AdamW run: fixed LOSS_WEIGHTS vs self-balancing weights.
+    Both runs see the same Sobol batches. The targets are the validation losses (-4, 0 and
+    8 degrees) the fixed schedule reaches after the given number of epochs, measured with
+    the fixed weights and with unit weights. Also reports the cost of one weight update.
+    """
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=1)
+    validation = [pool.sample(2000, fixed_alpha=a*np.pi/180) for a in (-4.0, 0.0, 8.0)]
+
+    def validation_loss(model):
+        weighted, unweighted = 0.0, 0.0
+        for x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side in validation:
+            loss, *components = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+            weighted += loss.item() / len(validation)
+            unweighted += sum(c.item() for c in components) / len(validation)
+        return weighted, unweighted
+
+    x_col, y_col, *_ = data_generation(x_airfoil, y_airfoil, surface, batch_size, device)
+    alpha_range = torch.linspace(-10*np.pi/180, 15*np.pi/180, x_col.shape[0]).unsqueeze(1).to(device)
+    x_norm = Normalizer(torch.cat([x_col, y_col, alpha_range], dim=1), device=device)
+
+    def new_model():
+        torch.manual_seed(0)
+        model = PINN().to(device)
+        with torch.no_grad():
+            model.mu.copy_(x_norm.mean)
+            model.sigma.copy_(x_norm.std)
+        return model
+
+    def run(mode):
+        model = new_model()
+        optimizer = torch.optim.AdamW(model.parameters(), lr=0.002)
+        sampler_pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=0)
+        balancer = LossBalancer(model, device=device) if mode == 'balanced' else None
+
+        curve = []
+        elapsed = 0.0
+        for epoch in range(epochs):
+            start_time = time.perf_counter()
+            optimizer.zero_grad()
+            x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sampler_pool.sample(batch_size)
+            weights = balancer.weights if balancer is not None else None
+            loss, *components = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model, weights)
+            if balancer is not None:
+                balancer.update(epoch, components)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=5.0)
+            optimizer.step()
+            elapsed += time.perf_counter() - start_time
+            if (epoch + 1) % eval_every == 0:
+                curve.append((epoch + 1, elapsed, *validation_loss(model)))
+        return curve, balancer
+
+    fixed, _ = run('fixed')
+    balanced, balancer = run('balanced')
+
+    def time_to_target(curve, column):
+        target = fixed[-1][column]
+        for row in curve:
+            if row[column] <= target:
+                return f"{row[0]} epochs, {row[1]:.1f} s"
+        return f"not reached (final {curve[-1][column]:.3e})"
+
+    # Cost of one weight update, amortized over `every` steps, against one training step
+    model = new_model()
+    x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = pool.sample(batch_size)
+    probe = LossBalancer(model, device=device)
+    def step():
+        model.zero_grad()
+        loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+        loss.backward()
+    def step_update():
+        model.zero_grad()
+        loss, *components = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model, probe.weights)
+        probe.update(0, components)
+        loss.backward()
+    t_step = timeit(step, iterations, device)
+    t_update = timeit(step_update, iterations, device) - t_step
+
+    print("-" * 30)
+    print(f"Loss weighting benchmark ({epochs} AdamW epochs, batch_size={batch_size})")
+    print(f"Target validation loss (fixed weights / unit weights): {fixed[-1][2]:.3e} / {fixed[-1][3]:.3e}")
+    print(f"Balanced weights, fixed-weight loss : {time_to_target(balanced, 2)}")
+    print(f"Balanced weights, unit-weight loss  : {time_to_target(balanced, 3)}")
+    print(f"Weight update : {t_update*1000:.1f} ms every {probe.every} steps -> {t_update/probe.every/t_step*100:.1f}% of a {t_step*1000:.0f} ms step")
+    print(f"Final weights (PDE, Inlet, Outlet, Top, Bot, Airfoil): {[round(w, 3) for w in balancer.weights.tolist()]}")
+    print("-" * 30)
+
+def benchmark_compile(m, p, t, batch_size, grid_size, iterations, device, rho=1.0, mu=0.01):
+    """
+    Per-step time of eager vs compiled mode (compile_model): one AdamW training step on a
+    collocation batch, and a no-grad forward on a predict_field-sized grid.
+    """
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = data_generation(x_airfoil, y_airfoil, surface, batch_size, device)
+    X, Y = np.meshgrid(np.linspace(x_min, x_max, grid_size), np.linspace(y_min, y_max, grid_size))
+    x_grid = torch.tensor(X.flatten()[:, None], dtype=torch.float32, device=device)
+    y_grid = torch.tensor(Y.flatten()[:, None], dtype=torch.float32, device=device)
+    alpha_grid = torch.full_like(x_grid, 5*np.pi/180)
+
+    def make_step(model):
+        optimizer = torch.optim.AdamW(model.parameters(), lr=0.002)
+        def step():
+            optimizer.zero_grad()
+            loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+            loss.backward()
+            optimizer.step()
+        return step
+
+    def make_inference(model):
+        def inference():
+            with torch.no_grad():
+                model(x_grid, y_grid, alpha_grid)
+        return inference
+
+    torch.manual_seed(0)
+    eager = PINN().to(device)
+    taylor = PINN().to(device)
+    taylor.load_state_dict(eager.state_dict())
+    taylor.compiled_derivatives = taylor_derivatives
+    compiled = PINN().to(device)
+    compiled.load_state_dict(eager.state_dict())
+
+    start_time = time.perf_counter()
+    active = compile_model(compiled)
+    # Warm-up at the benchmark shapes so that recompilation is not timed
+    make_step(compiled)()
+    make_inference(compiled)()
+    t_compile = time.perf_counter() - start_time
+
+    t_eager = timeit(make_step(eager), iterations, device)
+    t_taylor = timeit(make_step(taylor), iterations, device)
+    t_compiled = timeit(make_step(compiled), iterations, device)
+    t_inf_eager = timeit(make_inference(eager), iterations, device)
+    t_inf_compiled = timeit(make_inference(compiled), iterations, device)
+
+    print("-" * 30)
+    print(f"Compiled mode benchmark (training batch_size={batch_size}, inference grid {grid_size}x{grid_size})")
+    print(f"Compiled mode active : {active} (compilation and warm-up {t_compile:.1f} s)")
+    print(f"Training step, eager (jvp derivatives)    : {t_eager*1000:.1f} ms")
+    print(f"Training step, eager (taylor_derivatives) : {t_taylor*1000:.1f} ms")
+    print(f"Training step, compiled                   : {t_compiled*1000:.1f} ms (x{t_eager/t_compiled:.2f})")
+    print(f"Inference, eager    : {t_inf_eager*1000:.1f} ms")
+    print(f"Inference, compiled : {t_inf_compiled*1000:.1f} ms (x{t_inf_eager/t_inf_compiled:.2f})")
+    print("-" * 30)
+
+def _distributed_worker(m, p, t, batch_size, batch_per_angle, iterations, results, rho=1.0, mu=0.01):
+    """
+    Rank body of benchmark_distributed: times one data-parallel AdamW step (global batch
+    batch_size) and one evaluation of the sharded L-BFGS objective (20 angles).
+    """
+    rank, world_size = get_rank(), get_world_size()
+    device = torch.device("cpu")
+    torch.manual_seed(rank)
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, pool_size=2**17, seed=rank)
+    model = PINN().to(device)
+    broadcast_model(model)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=0.002)
+
+    def step():
+        optimizer.zero_grad()
+        x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = pool.sample(batch_size // world_size)
+        loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+        loss.backward()
+        all_reduce_gradients(model)
+        optimizer.step()
+
+    angles = np.linspace(-10, 15, 20) * np.pi / 180
+    batch = multi_angle_batch(x_airfoil, y_airfoil, surface, shard(angles), batch_per_angle, device, pool=pool, n_total=len(angles))
+
+    def closure():
+        model.zero_grad()
+        loss = torch.stack(calc_loss_multi(batch, rho, mu, model))
+        all_reduce_(loss)
+        all_reduce_gradients(model, average=False)
+
+    timings = []
+    for fn in (step, closure):
+        fn()
+        dist.barrier()
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        dist.barrier()
+        timings.append((time.perf_counter() - start_time) / iterations)
+    if rank == 0:
+        results.put(timings)
+
+def benchmark_distributed(m, p, t, batch_size, batch_per_angle, iterations, ranks=(1, 2, 4, 8)):
+    """
+    Strong scaling of data-parallel training (torch.distributed, gloo on localhost, CPU):
+    per-step time of AdamW at a fixed global batch and of one L-BFGS objective evaluation
+    at 1, 2, 4 and 8 ranks.
+    """
+    results = mp.get_context("spawn").SimpleQueue()
+
+    print("-" * 30)
+    print(f"Data-parallel benchmark (global batch_size={batch_size}, L-BFGS 20 angles x {batch_per_angle} points, {os.cpu_count()} CPU cores)")
+    base = None
+    for world_size in ranks:
+        try:
+            launch(world_size, _distributed_worker, m, p, t, batch_size, batch_per_angle, iterations, results)
+        except Exception as e:
+            print(f"{world_size} rank(s) | failed ({type(e).__name__}: {e})")
+            continue
+        t_step, t_closure = results.get()
+        base = base or (t_step, t_closure)
+        print(f"{world_size} rank(s) | AdamW step: {t_step*1000:.1f} ms (x{base[0]/t_step:.2f}) | "
+              f"L-BFGS objective: {t_closure*1000:.1f} ms (x{base[1]/t_closure:.2f})")
+    print("-" * 30)
+
+def benchmark_sampling(m, p, t, batch_size, iterations, device):
+    """
+    Per-epoch sampling cost of data_generation: shapely point loop vs AirfoilMask.
+    """
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    polygon = Polygon(np.column_stack((x_airfoil.cpu().numpy(), y_airfoil.cpu().numpy())))
+
+    # Collocation cloud of the same size as one AdamW epoch (global + local box)
+    n_points = batch_size + int(batch_size/3)
+    x_col = (3.0*torch.rand(n_points, 1) - 1.0).to(device)
+    y_col = (2.0*torch.rand(n_points, 1) - 1.0).to(device)
+
+    def legacy_mask():
+        x_np = x_col.cpu().numpy()
+        y_np = y_col.cpu().numpy()
+        return [not polygon.contains(Point(x, y)) for x, y in zip(x_np, y_np)]
+
+    def vectorized_mask():
+        return ~surface.contains(x_col, y_col)
+
+    mismatch = int((torch.tensor(legacy_mask()).view(-1) != vectorized_mask().cpu().view(-1)).sum())
+
+    t_legacy = timeit(legacy_mask, iterations, device)
+    t_vectorized = timeit(vectorized_mask, iterations, device)
+    t_epoch = timeit(lambda: data_generation(x_airfoil, y_airfoil, surface, batch_size, device), iterations, device)
+
+    start_time = time.perf_counter()
+    pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device)
+    t_pool_build = time.perf_counter() - start_time
+    t_pool = timeit(lambda: pool.sample(batch_size), iterations, device)
+
+    print("-" * 30)
+    print(f"Sampling benchmark ({n_points} collocation points, NACA m={m} p={p} t={t})")
+    print(f"Shapely masking       : {t_legacy*1000:.2f} ms")
+    print(f"AirfoilMask masking   : {t_vectorized*1000:.2f} ms (x{t_legacy/t_vectorized:.0f})")
+    print(f"data_generation total : {t_epoch*1000:.2f} ms")
+    print(f"CollocationPool.sample : {t_pool*1e6:.0f} us (pool built once in {t_pool_build:.2f} s)")
+    print(f"Classification mismatches : {mismatch}")
+    print("-" * 30)
+
+def benchmark_geometry(m, p, t, batch_size, iterations, device, n_cases=8, rho=1.0, mu=0.01):
+    """
+    Per-step cost of geometric training: batched NACA contours vs a generate_naca4 loop,
+    multi-geometry batch construction, and one AdamW step of a geometric model against
+    one step of a single-airfoil model at the same batch size.
+    """
+    cases = sample_cases(n_cases)
+
+    def contour_loop():
+        return [generate_naca4(mc, pc, tc, 200) for _, mc, pc, tc in cases.tolist()]
+
+    def contour_batch():
+        return naca4_batch(cases[:,1], cases[:,2], cases[:,3], n_points=200, device=device)
+
+    x_loop = torch.tensor(np.stack([x for x, _ in contour_loop()]), dtype=torch.float32)
+    error = (x_loop - contour_batch()[0].cpu()).abs().max().item()
+
+    t_loop = timeit(contour_loop, iterations, device)
+    t_batch = timeit(contour_batch, iterations, device)
+    t_build = timeit(lambda: multi_geometry_batch(cases, batch_size // n_cases, device), iterations, device)
+
+    # Training steps at the same number of points
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = data_generation(x_airfoil, y_airfoil, surface, batch_size, device)
+    batch = multi_geometry_batch(cases, batch_size // n_cases, device)
+    single, geometric = PINN().to(device), PINN(geometric=True).to(device)
+
+    def single_step():
+        single.zero_grad()
+        loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, single)
+        loss.backward()
+
+    def geometric_step():
+        geometric.zero_grad()
+        calc_loss_multi(batch, rho, mu, geometric)
+
+    t_single = timeit(single_step, iterations, device)
+    t_geometric = timeit(geometric_step, iterations, device)
+
+    print("-" * 30)
+    print(f"Geometric training benchmark ({n_cases} cases per step, batch_size={batch_size})")
+    print(f"generate_naca4 loop : {t_loop*1000:.2f} ms")
+    print(f"naca4_batch         : {t_batch*1000:.2f} ms (x{t_loop/t_batch:.1f}, max |dx| {error:.1e})")
+    print(f"multi_geometry_batch : {t_build*1000:.1f} ms")
+    print(f"AdamW step, single airfoil : {t_single*1000:.0f} ms")
+    print(f"AdamW step, geometric      : {t_geometric*1000:.0f} ms (+ {t_build*1000:.0f} ms sampling)")
+    print("-" * 30)
+
+def benchmark_constraints(m, p, t, batch_size, batch_per_angle, epochs, iterations, device, rho=1.0, mu=0.01, eval_every=10):
+    """
+    Soft boundary losses vs the HardBoundary output transform: cost of one AdamW step and
+    of one fused L-BFGS objective evaluation, and time-to-target of a short AdamW run.
+    Both models are scored with the same unweighted validation error (PDE residual plus every
+    boundary condition violation, at -4, 0 and 8 degrees); the target is the final error of the
+    soft-constrained run.
+    """
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    vertices = airfoil_polygon(x_airfoil, y_airfoil)
+    pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=1)
+    validation = [pool.sample(2000, fixed_alpha=a*np.pi/180) for a in (-4.0, 0.0, 8.0)]
+
+    def validation_error(model):
+        pde, bc = 0.0, 0.0
+        for x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side in validation:
+            pde += (calc_residual(model, x_col, y_col, alpha, rho, mu)**2).mean().item() / len(validation)
+            out, d_dx, _ = calc_derivatives(model, x_bc, y_bc, alpha, order=1)
+            outlet = (mask_side == 1).view(-1)
+            dirichlet = ((out[:,0:1] - u_bc)**2 + (out[:,1:2] - v_bc)**2)[~outlet].mean()
+            traction = ((-out[:,2:3] + mu/rho*d_dx[:,0:1])**2 + (mu/rho*d_dx[:,1:2])**2)[outlet].mean()
+            wall = model(x_airfoil, y_airfoil, torch.full_like(x_airfoil, alpha))[:,0:2].square().sum(dim=1).mean()
+            bc += (dirichlet + traction + wall).item() / len(validation)
+        return pde, bc
+
+    x_col, y_col, *_ = data_generation(x_airfoil, y_airfoil, surface, batch_size, device)
+    alpha_range = torch.linspace(-10*np.pi/180, 15*np.pi/180, x_col.shape[0]).unsqueeze(1).to(device)
+    x_norm = Normalizer(torch.cat([x_col, y_col, alpha_range], dim=1), device=device)
+
+    def new_model(hard):
+        torch.manual_seed(0)
+        model = PINN(constraint=HardBoundary(vertices) if hard else None).to(device)
+        with torch.no_grad():
+            model.mu.copy_(x_norm.mean)
+            model.sigma.copy_(x_norm.std)
+        return model
+
+    def run(hard):
+        model = new_model(hard)
+        optimizer = torch.optim.AdamW(model.parameters(), lr=0.002)
+        sampler_pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=0)
+        curve = []
+        elapsed = 0.0
+        for epoch in range(epochs):
+            start_time = time.perf_counter()
+            optimizer.zero_grad()
+            x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sampler_pool.sample(batch_size)
+            loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=5.0)
+            optimizer.step()
+            elapsed += time.perf_counter() - start_time
+            if (epoch + 1) % eval_every == 0:
+                pde, bc = validation_error(model)
+                curve.append((epoch + 1, elapsed, pde, bc, pde + bc))
+        return curve
+
+    soft = run(False)
+    hard = run(True)
+    target = soft[-1][4]
+    reached = next((row for row in hard if row[4] <= target), None)
+
+    # Per-step and per-evaluation costs on identical points
+    sample = pool.sample(batch_size)
+    angles_rad = np.linspace(-10, 15, 20) * np.pi / 180
+    batch = multi_angle_batch(x_airfoil, y_airfoil, surface, angles_rad, batch_per_angle, device)
+    timings = {}
+    for name in ('soft', 'hard'):
+        model = new_model(name == 'hard')
+        fixed = constrain_batch(model, batch) if name == 'hard' else batch
+        def step():
+            model.zero_grad()
+            x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sample
+            loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+            loss.backward()
+        def objective():
+            model.zero_grad()
+            calc_loss_multi(fixed, rho, mu, model)
+        timings[name] = (timeit(step, iterations, device), timeit(objective, iterations, device))
+    start_time = time.perf_counter()
+    constrain_batch(new_model(True), batch)
+    t_precompute = time.perf_counter() - start_time
+
+    print("-" * 30)
+    print(f"Hard constraint benchmark ({epochs} AdamW epochs, batch_size={batch_size}, {vertices.shape[0] - 1} polygon edges)")
+    print(f"AdamW step      soft/hard : {timings['soft'][0]*1000:.0f} / {timings['hard'][0]*1000:.0f} ms (x{timings['soft'][0]/timings['hard'][0]:.2f})")
+    print(f"L-BFGS objective soft/hard : {timings['soft'][1]*1000:.0f} / {timings['hard'][1]*1000:.0f} ms (x{timings['soft'][1]/timings['hard'][1]:.2f}, fields precomputed once in {t_precompute*1000:.0f} ms)")
+    print(f"Final validation error soft : {soft[-1][4]:.3e} (PDE {soft[-1][2]:.3e}, BC {soft[-1][3]:.3e})")
+    print(f"Final validation error hard : {hard[-1][4]:.3e} (PDE {hard[-1][2]:.3e}, BC {hard[-1][3]:.3e})")
+    if reached is not None:
+        print(f"Hard constraints reach the soft final error after {reached[0]} epochs, {reached[1]:.1f} s (soft: {soft[-1][0]} epochs, {soft[-1][1]:.1f} s)")
+    else:
+        print("Hard constraints do not reach the soft final error")
+    print("-" * 30)
+
+def benchmark_fine_tune(m, p, t, batch_size, epochs, device, source_path="pinn_airfoil_model_V2.pth", rho=1.0, mu=0.01,
+                        eval_every=25, tol=0.02):
+    """
+    Time-to-accuracy against the OpenFOAM reference (Cl and Cd of NACA 2412 at -4, 0 and 8 degrees)
+    of the AdamW phase: fine-tuning from a checkpoint (warm_start, plateau schedule, convergence
+    stop as in train) vs training from scratch (cosine schedule).
+
+    source_path is itself trained on the reference case, so it is first moved to NACA 0012 by
+    epochs // 2 untimed fine-tuning epochs: the timed fine-tune then starts from a different
+    geometry. The target error is 1.25 x the error of source_path.
+    """
+    def error(model):
+        total = 0.0
+        for alpha_deg in (-4.0, 0.0, 8.0):
+            cl, cd = calc_force(m, p, t, mu, rho, alpha_deg*np.pi/180, model, device)
+            cl_cfd, cd_cfd = load_cfd_coefficients(alpha_deg)
+            total += (abs(cl.item() - cl_cfd) + abs(cd.item() - cd_cfd)) / 3
+        return total
+
+    def new_model(x_airfoil, y_airfoil, surface, init_from=None):
+        x_col, y_col, *_ = data_generation(x_airfoil, y_airfoil, surface, batch_size, device)
+        alpha_range = torch.linspace(-10*np.pi/180, 15*np.pi/180, x_col.shape[0]).unsqueeze(1).to(device)
+        x_norm = Normalizer(torch.cat([x_col, y_col, alpha_range], dim=1), device=device)
+        torch.manual_seed(0)
+        model = PINN().to(device)
+        with torch.no_grad():
+            model.mu.copy_(x_norm.mean)
+            model.sigma.copy_(x_norm.std)
+        if init_from is not None:
+            warm_start(model, init_from)
+        return model
+
+    def run(model, fine_tune, x_airfoil, y_airfoil, surface, n_epochs, record=True):
+        pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=0)
+        if fine_tune:
+            optimizer = torch.optim.AdamW(model.parameters(), lr=1e-5)
+            scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, factor=0.3, patience=0, threshold=tol)
+        else:
+            optimizer = torch.optim.AdamW(model.parameters(), lr=0.002)
+            scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=1500, eta_min=1e-5)
+        curve = [(0, 0.0, error(model))] if record else []
+        losses = []
+        elapsed = 0.0
+        for epoch in range(n_epochs):
+            start_time = time.perf_counter()
+            optimizer.zero_grad()
+            x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = pool.sample(batch_size)
+            loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=5.0)
+            optimizer.step()
+            losses.append(loss.item())
+            converged = False
+            if not fine_tune:
+                scheduler.step()
+            elif (epoch + 1) % 100 == 0:
+                scheduler.step(np.mean(losses[-100:]))
+                converged = optimizer.param_groups[0]['lr'] < 1e-6
+            elapsed += time.perf_counter() - start_time
+            if record and ((epoch + 1) % eval_every == 0 or converged):
+                curve.append((epoch + 1, elapsed, error(model)))
+            if converged:
+                break
+        return curve
+
+    target = 1.25 * error(new_model(*generate_airfoil(m, p, t, device), init_from=source_path))
+
+    # Source checkpoint on another geometry
+    other = generate_airfoil(0.0, 0.4, 0.12, device)
+    source = new_model(*other, init_from=source_path)
+    run(source, True, *other, epochs // 2, record=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        moved_path = os.path.join(tmp, "source.pth")
+        torch.save(source.state_dict(), moved_path)
+        target_airfoil = generate_airfoil(m, p, t, device)
+        fine = run(new_model(*target_airfoil, init_from=moved_path), True, *target_airfoil, epochs)
+    scratch = run(new_model(*target_airfoil), False, *target_airfoil, epochs)
+
+    def time_to_target(curve, target=target):
+        for epochs_done, elapsed, err in curve:
+            if err <= target:
+                return f"{epochs_done} epochs, {elapsed:.1f} s"
+        return f"not reached (best {min(row[2] for row in curve):.3f})"
+
+    print("-" * 30)
+    print(f"Fine-tuning benchmark (batch_size={batch_size}, up to {epochs} AdamW epochs, source moved to NACA 0012)")
+    print(f"Target error vs OpenFOAM (mean |dCl| + |dCd|): {target:.3f} (1.25 x {source_path})")
+    print(f"Fine-tune : start {fine[0][2]:.3f}, final {fine[-1][2]:.3f} after {fine[-1][0]} epochs / {fine[-1][1]:.1f} s, target: {time_to_target(fine)}")
+    print(f"Scratch   : start {scratch[0][2]:.3f}, final {scratch[-1][2]:.3f} after {scratch[-1][0]} epochs / {scratch[-1][1]:.1f} s, target: {time_to_target(scratch)}")
+    print(f"Scratch to the fine-tune starting error ({fine[0][2]:.3f}): {time_to_target(scratch, fine[0][2])}")
+    print("-" * 30)
+
+def benchmark_encoding(m, p, t, batch_size, epochs, iterations, device, target=None, rho=1.0, mu=0.01, eval_every=10):
+    """
+    Fourier embedding vs hash-grid encoding of the spatial branch: epochs and wall time of a
+    plain AdamW run to reach a target validation error, and the cost of one training step.
+    The validation error is the unweighted PDE residual plus the boundary condition violation
+    at -4, 0 and 8 degrees (the PDE residual alone is minimized by any uniform flow).
+    The default target is the final error of the Fourier run.
+    """
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=1)
+    validation = [pool.sample(2000, fixed_alpha=a*np.pi/180) for a in (-4.0, 0.0, 8.0)]
+
+    def validation_error(model):
+        pde, bc = 0.0, 0.0
+        for x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side in validation:
+            pde += (calc_residual(model, x_col, y_col, alpha, rho, mu)**2).mean().item() / len(validation)
+            out, d_dx, _ = calc_derivatives(model, x_bc, y_bc, alpha, order=1)
+            outlet = (mask_side == 1).view(-1)
+            dirichlet = ((out[:,0:1] - u_bc)**2 + (out[:,1:2] - v_bc)**2)[~outlet].mean()
+            traction = ((-out[:,2:3] + mu/rho*d_dx[:,0:1])**2 + (mu/rho*d_dx[:,1:2])**2)[outlet].mean()
+            wall = model(x_airfoil, y_airfoil, torch.full_like(x_airfoil, alpha))[:,0:2].square().sum(dim=1).mean()
+            bc += (dirichlet + traction + wall).item() / len(validation)
+        return pde, bc
+
+    x_col, y_col, *_ = data_generation(x_airfoil, y_airfoil, surface, batch_size, device)
+    alpha_range = torch.linspace(-10*np.pi/180, 15*np.pi/180, x_col.shape[0]).unsqueeze(1).to(device)
+    x_norm = Normalizer(torch.cat([x_col, y_col, alpha_range], dim=1), device=device)
+
+    def new_model(encoder):
+        torch.manual_seed(0)
+        model = PINN(encoder=encoder).to(device)
+        with torch.no_grad():
+            model.mu.copy_(x_norm.mean)
+            model.sigma.copy_(x_norm.std)
+        return model
+
+    def run(encoder):
+        model = new_model(encoder)
+        optimizer = torch.optim.AdamW(parameter_groups(model, 0.002), lr=0.002)
+        sampler_pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=0)
+        curve = []
+        elapsed = 0.0
+        for epoch in range(epochs):
+            start_time = time.perf_counter()
+            optimizer.zero_grad()
+            x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sampler_pool.sample(batch_size)
+            loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=5.0)
+            optimizer.step()
+            elapsed += time.perf_counter() - start_time
+            if (epoch + 1) % eval_every == 0:
+                pde, bc = validation_error(model)
+                curve.append((epoch + 1, elapsed, pde, bc, pde + bc))
+        return curve
+
+    curves = {encoder: run(encoder) for encoder in ('fourier', 'hash')}
+    target = curves['fourier'][-1][4] if target is None else target
+
+    sample = pool.sample(batch_size)
+    timings = {}
+    for encoder in ('fourier', 'hash'):
+        model = new_model(encoder)
+        def step():
+            model.zero_grad()
+            x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sample
+            loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+            loss.backward()
+        timings[encoder] = timeit(step, iterations, device)
+
+    print("-" * 30)
+    print(f"Spatial encoding benchmark ({epochs} AdamW epochs, batch_size={batch_size}, target validation error {target:.3e})")
+    for encoder, curve in curves.items():
+        reached = next((row for row in curve if row[4] <= target), None)
+        n_params = sum(param.numel() for param in new_model(encoder).parameters())
+        print(f"{encoder:8s}: {n_params} parameters, step {timings[encoder]*1000:.0f} ms, "
+              f"final error {curve[-1][4]:.3e} (PDE {curve[-1][2]:.3e}, BC {curve[-1][3]:.3e}), "
+              + (f"target after {reached[0]} epochs, {reached[1]:.1f} s" if reached is not None else f"target not reached (best {min(row[4] for row in curve):.3e})"))
+    print("-" * 30)
+
+def benchmark_xpinn(m, p, t, batch_size, epochs, iterations, device, rho=1.0, mu=0.01):
+    """
+    Single network vs domain decomposition (train_xpinn, one process per subdomain): cost of one
+    training step and validation error (PDE residual plus BC violation at -4, 0 and 8 degrees)
+    after the same number of AdamW epochs. The step of every subdomain network (its share of the
+    batch plus the interface terms) is also timed alone: with a core per subdomain, an XPINN
+    step costs the slowest of them.
+    """
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=1)
+    validation = [pool.sample(2000, fixed_alpha=a*np.pi/180) for a in (-4.0, 0.0, 8.0)]
+
+    def validation_error(model):
+        pde, bc = 0.0, 0.0
+        for x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side in validation:
+            pde += (calc_residual(model, x_col, y_col, alpha, rho, mu)**2).mean().item() / len(validation)
+            out, d_dx, _ = calc_derivatives(model, x_bc, y_bc, alpha, order=1)
+            outlet = (mask_side == 1).view(-1)
+            dirichlet = ((out[:,0:1] - u_bc)**2 + (out[:,1:2] - v_bc)**2)[~outlet].mean()
+            traction = ((-out[:,2:3] + mu/rho*d_dx[:,0:1])**2 + (mu/rho*d_dx[:,1:2])**2)[outlet].mean()
+            wall = model(x_airfoil, y_airfoil, torch.full_like(x_airfoil, alpha))[:,0:2].square().sum(dim=1).mean()
+            bc += (dirichlet + traction + wall).item() / len(validation)
+        return pde, bc
+
+    x_col, y_col, *_ = data_generation(x_airfoil, y_airfoil, surface, batch_size, device)
+    alpha_range = torch.linspace(-10*np.pi/180, 15*np.pi/180, x_col.shape[0]).unsqueeze(1).to(device)
+    x_norm = Normalizer(torch.cat([x_col, y_col, alpha_range], dim=1), device=device)
+
+    def new_model(hidden=128):
+        torch.manual_seed(0)
+        model = PINN(hidden=hidden).to(device)
+        with torch.no_grad():
+            model.mu.copy_(x_norm.mean)
+            model.sigma.copy_(x_norm.std)
+        return model
+
+    # Per-step costs on points of each subdomain
+    n_subdomains = len(SUBDOMAIN_BOXES) + 1
+    interface = interface_points(SUBDOMAIN_BOXES, (x_min, x_max, y_min, y_max))
+    sample = pool.sample(n_subdomains*batch_size)
+    single = new_model()
+    def single_step():
+        single.zero_grad()
+        x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sample
+        loss, *_ = calc_loss(x_col[:batch_size], y_col[:batch_size], x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, single)
+        loss.backward()
+    t_single = timeit(single_step, iterations, device)
+    t_subdomains = []
+    for i in range(n_subdomains):
+        model = new_model(hidden=64)
+        x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sample
+        col = (subdomain_index(x_col, y_col, SUBDOMAIN_BOXES) == i).nonzero().view(-1)[:batch_size // n_subdomains]
+        bc = subdomain_index(x_bc, y_bc, SUBDOMAIN_BOXES) == i
+        wall = subdomain_index(x_airfoil, y_airfoil, SUBDOMAIN_BOXES) == i
+        def step():
+            model.zero_grad()
+            loss, *_ = calc_loss(x_col[col], y_col[col], x_bc[bc], y_bc[bc], x_airfoil[wall], y_airfoil[wall], u_bc[bc], v_bc[bc], p_bc[bc], rho, mu, alpha, mask_side[bc], model)
+            loss = loss + interface_residuals(model, interface, alpha, rho, mu).square().mean()
+            loss.backward()
+        t_subdomains.append(timeit(step, iterations, device))
+
+    # Same number of AdamW epochs end to end
+    model = new_model()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=0.002)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=epochs, eta_min=1e-5)
+    sampler_pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=0)
+    start_time = time.perf_counter()
+    for epoch in range(epochs):
+        optimizer.zero_grad()
+        x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sampler_pool.sample(batch_size)
+        loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+        loss.backward()
+        torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=5.0)
+        optimizer.step()
+        scheduler.step()
+    t_single_run = time.perf_counter() - start_time
+    single_error = validation_error(model)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "xpinn.pth")
+        start_time = time.perf_counter()
+        train_xpinn(x_airfoil, y_airfoil, surface, rho, mu, batch_size, epochs=epochs, path=path)
+        t_xpinn_run = time.perf_counter() - start_time
+        xpinn = load_model(path, device)
+    xpinn_error = validation_error(xpinn)
+
+    print("-" * 30)
+    print(f"XPINN benchmark (batch_size={batch_size}, {n_subdomains} subdomains, {interface['x'].shape[0]} interface points, {os.cpu_count()} cores)")
+    print(f"Single network step     : {t_single*1000:.0f} ms")
+    print(f"Subdomain steps         : {' / '.join(f'{t*1000:.0f}' for t in t_subdomains)} ms ({', '.join(SUBDOMAIN_NAMES)})")
+    print(f"XPINN step, 1 core each : {max(t_subdomains)*1000:.0f} ms (x{t_single/max(t_subdomains):.2f})")
+    print(f"{epochs} epochs single : {t_single_run:.1f} s, validation error {sum(single_error):.3e} (PDE {single_error[0]:.3e}, BC {single_error[1]:.3e})")
+    print(f"{epochs} epochs XPINN  : {t_xpinn_run:.1f} s, validation error {sum(xpinn_error):.3e} (PDE {xpinn_error[0]:.3e}, BC {xpinn_error[1]:.3e})")
+    print("-" * 30)
+
+def benchmark_precision(m, p, t, batch_size, epochs, iterations, device, source_path="pinn_airfoil_model_V2.pth", rho=1.0, mu=0.01, tol=0.05):
+    """
+    bf16 mode (enable_bf16) vs fp32: throughput of one training step (calc_loss and backward),
+    relative residual error of the accuracy guard on a fresh and on a trained model, and a short
+    AdamW run in each precision with the guard re-checked every 100 epochs, as in train().
+    The fp32 step is timed both on the default jvp derivatives and on the explicit
+    taylor_derivatives pass, which the bf16 mode builds on.
+    """
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=1)
+    validation = [pool.sample(2000, fixed_alpha=a*np.pi/180) for a in (-4.0, 0.0, 8.0)]
+    probe = tuple(torch.cat(parts) for parts in zip(*[(x_col.detach(), y_col.detach(), torch.full_like(x_col, alpha))
+                                                      for x_col, y_col, *_, alpha, _ in validation]))
+
+    def validation_loss(model):
+        total = 0.0
+        for x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side in validation:
+            loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+            total += loss.item() / len(validation)
+        return total
+
+    x_col, y_col, *_ = data_generation(x_airfoil, y_airfoil, surface, batch_size, device)
+    alpha_range = torch.linspace(-10*np.pi/180, 15*np.pi/180, x_col.shape[0]).unsqueeze(1).to(device)
+    x_norm = Normalizer(torch.cat([x_col, y_col, alpha_range], dim=1), device=device)
+
+    def new_model():
+        torch.manual_seed(0)
+        model = PINN().to(device)
+        with torch.no_grad():
+            model.mu.copy_(x_norm.mean)
+            model.sigma.copy_(x_norm.std)
+        return model
+
+    # Throughput on identical points
+    sample = pool.sample(batch_size)
+    n_points = sample[0].shape[0] + sample[2].shape[0] + x_airfoil.shape[0]
+    timings = {}
+    for name in ('fp32 (jvp)', 'fp32 (explicit)', 'bf16'):
+        model = new_model()
+        if name == 'fp32 (explicit)':
+            model.compiled_derivatives = taylor_derivatives
+        if name == 'bf16':
+            model.mixed_precision = True
+        def step():
+            model.zero_grad()
+            x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sample
+            loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+            loss.backward()
+        timings[name] = timeit(step, iterations, device)
+
+    guard_fresh = bf16_residual_error(new_model(), probe, rho, mu)
+    # bf16 must pass the guard at initialisation, otherwise the bf16 mode never engages
+    assert guard_fresh <= tol, f"bf16 residual error of a fresh model {guard_fresh:.4f} exceeds the tolerance {tol}"
+    guard_trained = None
+    if os.path.exists(source_path):
+        trained = load_model(source_path, device)
+        enabled, guard_trained = enable_bf16(trained, probe, rho, mu, tol)
+        assert enabled == (guard_trained <= tol) and trained.mixed_precision == enabled
+
+    def run(precision):
+        model = new_model()
+        optimizer = torch.optim.AdamW(model.parameters(), lr=0.002)
+        scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=1500, eta_min=1e-5)
+        sampler_pool = CollocationPool(x_airfoil, y_airfoil, surface, (x_min, x_max, y_min, y_max), device, seed=0)
+        switched = None
+        if precision == 'bf16':
+            enable_bf16(model, probe, rho, mu, tol)
+        start_time = time.perf_counter()
+        for epoch in range(epochs):
+            optimizer.zero_grad()
+            x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = sampler_pool.sample(batch_size)
+            loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=5.0)
+            optimizer.step()
+            scheduler.step()
+            if model.mixed_precision and epoch % 100 == 0 and epoch > 0 and not enable_bf16(model, probe, rho, mu, tol)[0]:
+                switched = epoch
+        elapsed = time.perf_counter() - start_time
+        model.mixed_precision = False
+        return elapsed, validation_loss(model), switched
+
+    runs = {precision: run(precision) for precision in ('fp32', 'bf16')}
+
+    print("-" * 30)
+    print(f"bf16 benchmark (batch_size={batch_size}, {n_points} points per step, guard tolerance {tol})")
+    for name, elapsed in timings.items():
+        print(f"Step {name:16s}: {elapsed*1000:.0f} ms, {n_points/elapsed:.0f} points/s (x{timings['fp32 (jvp)']/elapsed:.2f})")
+    print(f"Guard residual error    : fresh model {guard_fresh:.4f}" + (f", {source_path} {guard_trained:.4f} "
+          f"({'bf16' if guard_trained <= tol else 'fp32'})" if guard_trained is not None else ""))
+    for precision, (elapsed, loss, switched) in runs.items():
+        print(f"{epochs} AdamW epochs {precision}: {elapsed:.1f} s, validation loss {loss:.3e}"
+              + (f" (guard switched to fp32 at epoch {switched})" if switched is not None else ""))
+    print("-" * 30)
+
+def benchmark_profiler(m, p, t, batch_size, iterations, device, rho=1.0, mu=0.01):
+    """
+    Overhead of the phase profiler (PhaseProfiler) on an AdamW training step marked with
+    profile_phase as in train(): profiling off, phase timers, and torch.profiler. The cost of a
+    disabled profile_phase call is measured on its own, and the summary of the phase timers is printed.
+    """
+    x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
+    torch.manual_seed(0)
+    model = PINN().to(device)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=0.002)
+
+    def step():
+        with profile_phase('zero_grad'):
+            optimizer.zero_grad()
+        with profile_phase('sampling'):
+            x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha, mask_side = data_generation(x_airfoil, y_airfoil, surface, batch_size, device)
+        with profile_phase('loss'):
+            loss, *_ = calc_loss(x_col, y_col, x_bc, y_bc, x_airfoil, y_airfoil, u_bc, v_bc, p_bc, rho, mu, alpha, mask_side, model)
+        with profile_phase('backward'):
+            loss.backward()
+        with profile_phase('clip'):
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=5.0)
+        with profile_phase('optimizer'):
+            optimizer.step()
+
+    timings = {'off': timeit(step, iterations, device)}
+    summaries = {}
+    for mode in ('phases', 'torch'):
+        profiler = PhaseProfiler(device, use_torch_profiler=(mode == 'torch'))
+        profiler.start()
+        timings[mode] = timeit(step, iterations, device)
+        profiler.stop()
+        summaries[mode] = profiler.summary()
+
+    n_calls = 100000
+    start_time = time.perf_counter()
+    for _ in range(n_calls):
+        with profile_phase('noop'):
+            pass
+    disabled_call = (time.perf_counter() - start_time) / n_calls
+    # Phases per step in train(): 12 in the loop, 4 in calc_loss and data_generation
+    phases_per_step = 16
+
+    print("-" * 30)
+    print(f"Profiler benchmark (batch_size={batch_size})")
+    for mode, elapsed in timings.items():
+        print(f"Step, profiling {mode:6s}: {elapsed*1000:.1f} ms ({100*(elapsed/timings['off'] - 1):+.1f}%)")
+    print(f"Disabled profile_phase  : {disabled_call*1e9:.0f} ns per call, "
+          f"{100*phases_per_step*disabled_call/timings['off']:.5f}% of a step")
+    print("Phase timers:")
+    print(summaries['phases'])
+    print("torch.profiler:")
+    print(summaries['torch'])
+    print("-" * 30)
+
+def legacy_panel_geometry(m, p, t, n_points, device):
+    """
+    Reference panel block of calc_force: a Python loop over the panels and one tensor per list.
+    """
+    x_s, y_s = generate_naca4(m, p, t, n_points)
+    dl, vec_n, x_mid, y_mid = [], [], [], []
+    for i in range(len(x_s)-1):
+        dx, dy = x_s[i+1] - x_s[i], y_s[i+1] - y_s[i]
+        dl.append(np.sqrt(dx**2 + dy**2))
+        vec_n.append((dy/dl[i], -dx/dl[i]))
+        x_mid.append((x_s[i] + x_s[i+1])/2)
+        y_mid.append((y_s[i] + y_s[i+1])/2)
+    return (torch.tensor(vec_n).to(device), torch.tensor(dl).to(device).view(-1,1),
+            torch.tensor(x_mid, dtype=torch.float32).to(device).view(-1,1),
+            torch.tensor(y_mid, dtype=torch.float32).to(device).view(-1,1))
+
+def benchmark_forces(m, p, t, iterations, device, source_path="pinn_airfoil_model_V2.pth", rho=1.0, mu=0.01):
+    """
+    Cost of calc_force: panel geometry built with the Python loop, vectorized, and from the
+    panel_geometry cache, against the full call (model evaluation included).
+    """
+    model = trained_model(source_path, device)
+    alpha = 4*np.pi/180
+
+    reference = legacy_panel_geometry(m, p, t, 1000, device)
+    cached = panel_geometry(m, p, t, 1000, device)
+    mismatch = max((a.double() - b.double()).abs().max().item() for a, b in zip(reference, cached))
+
+    t_legacy = timeit(lambda: legacy_panel_geometry(m, p, t, 1000, device), iterations, device)
+    t_vectorized = timeit(lambda: panel_geometry.__wrapped__(m, p, t, 1000, device), iterations, device)
+    t_cached = timeit(lambda: panel_geometry(m, p, t, 1000, device), iterations, device)
+    t_force = timeit(lambda: calc_force(m, p, t, mu, rho, alpha, model, device), iterations, device)
+
+    print("-" * 30)
+    print("Force benchmark (999 panels, alpha = 4 deg)")
+    print(f"Panels, Python loop : {t_legacy*1000:.2f} ms")
+    print(f"Panels, vectorized  : {t_vectorized*1000:.2f} ms")
+    print(f"Panels, cached      : {t_cached*1000:.4f} ms")
+    print(f"calc_force (cached) : {t_force*1000:.1f} ms, of which the loop would have been {100*t_legacy/(t_force + t_legacy):.0f}%")
+    print(f"Max geometry difference loop/vectorized: {mismatch:.1e}")
+    print("-" * 30)
+
+def benchmark_polar(m, p, t, n_angles, device, source_path="pinn_airfoil_model_V2.pth", rho=1.0, mu=0.01):
+    """
+    Cl/Cd polar over n_angles angles of attack: the full network Jacobian per angle (calc_force
+    before the cached spatial Jacobian), calc_force per angle, and the batched polar with and
+    without the lift slope, at several pass sizes.
+    """
+    model = trained_model(source_path, device)
+    alphas = np.linspace(-10, 15, n_angles)*np.pi/180
+    polar(m, p, t, alphas[:2], mu, rho, model, device)
+    vec_n, dl, x_mid, y_mid = panel_geometry(m, p, t, 1000, device)
+
+    def full_force(alpha):
+        out, d_dx, d_dy = calc_derivatives(model, x_mid, y_mid, conditioning(model, x_mid, alpha, m, p, t), order=1)
+        F_v = torch.stack([torch.sum(mu*(d_dx[:,k:k+1]*vec_n[:,0:1] + d_dy[:,k:k+1]*vec_n[:,1:2])*dl) for k in (0, 1)])
+        F_tot = torch.sum(-out[:,2:3]*vec_n*dl, dim=0) + F_v
+        scale = 0.5*rho*0.3**2
+        return [(F_tot[1]*np.cos(alpha) - F_tot[0]*np.sin(alpha)).item()/scale, (F_tot[0]*np.cos(alpha) + F_tot[1]*np.sin(alpha)).item()/scale]
+
+    start_time = time.perf_counter()
+    reference = np.array([full_force(alpha) for alpha in alphas])
+    t_full = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    for alpha in alphas:
+        calc_force(m, p, t, mu, rho, alpha, model, device)
+    t_loop = time.perf_counter() - start_time
+
+    timings = {}
+    for chunk_size in (2000, 5000, 20000, None):
+        start_time = time.perf_counter()
+        result = polar(m, p, t, alphas, mu, rho, model, device, chunk_size=chunk_size)
+        timings[chunk_size] = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    sloped = polar(m, p, t, alphas, mu, rho, model, device, slope=True)
+    t_slope = time.perf_counter() - start_time
+    finite_difference = np.gradient(sloped['cl'], alphas)
+
+    print("-" * 30)
+    print(f"Polar benchmark ({n_angles} angles, 999 panels)")
+    print(f"Full Jacobian per angle : {t_full:.2f} s ({t_full/n_angles*1000:.0f} ms per angle)")
+    print(f"calc_force per angle    : {t_loop:.2f} s ({t_loop/n_angles*1000:.1f} ms per angle, x{t_full/t_loop:.2f})")
+    for chunk_size, elapsed in timings.items():
+        print(f"polar, {str(chunk_size):>5s} points/pass: {elapsed:.2f} s (x{t_full/elapsed:.2f})")
+    print(f"polar with dCl/dalpha   : {t_slope:.2f} s")
+    print(f"Max |Cl| / |Cd| difference with the full Jacobian: {np.abs(result['cl'] - reference[:,0]).max():.1e} / {np.abs(result['cd'] - reference[:,1]).max():.1e}")
+    print(f"Max dCl/dalpha difference with finite differences: {np.abs(sloped['dcl_dalpha'] - finite_difference)[1:-1].max():.1e}")
+    print("-" * 30)
+
+def benchmark_sweep(m, p, t, grid_size, iterations, device, source_path="pinn_airfoil_model_V2.pth"):
+    """
+    Angle change on a fixed inference grid (predict_field in the app): full forward pass vs
+    predict with the cached spatial latent, and the airfoil masking that follows the prediction.
+    """
+    model = trained_model(source_path, device)
+    model.eval()
+    X, Y = np.meshgrid(np.linspace(x_min, x_max, grid_size), np.linspace(y_min, y_max, grid_size))
+    x_test = torch.tensor(X.flatten()[:, None], dtype=torch.float32).to(device)
+    y_test = torch.tensor(Y.flatten()[:, None], dtype=torch.float32).to(device)
+    alphas = iter(np.linspace(-10, 15, 4*iterations + 4)*np.pi/180)
+    key = ('grid', x_min, x_max, y_min, y_max, grid_size)
+
+    def full():
+        with torch.no_grad():
+            return model(x_test, y_test, conditioning(model, x_test, next(alphas), m, p, t))
+
+    def cached():
+        return predict(model, x_test, y_test, next(alphas), m, p, t, cache_key=key)
+
+    def masking():
+        _, _, surface = generate_airfoil(m, p, t, device)
+        return surface.contains(x_test, y_test)
+
+    start_time = time.perf_counter()
+    predict(model, x_test, y_test, 0.0, m, p, t, cache_key=key)
+    t_first = time.perf_counter() - start_time
+    t_full = timeit(full, iterations, device)
+    t_cached = timeit(cached, iterations, device)
+    t_mask = timeit(masking, iterations, device)
+    alpha = 5*np.pi/180
+    with torch.no_grad():
+        reference = model(x_test, y_test, conditioning(model, x_test, alpha, m, p, t))
+    error = (predict(model, x_test, y_test, alpha, m, p, t, cache_key=key) - reference).abs().max().item()
+
+    print("-" * 30)
+    print(f"Alpha sweep benchmark ({grid_size}x{grid_size} grid, cache {model.feature_cache.bytes/2**20:.0f} MB)")
+    print(f"Full forward pass       : {t_full*1000:.0f} ms per angle")
+    print(f"Cached latent, 1st angle: {t_first*1000:.0f} ms")
+    print(f"Cached latent, new angle: {t_cached*1000:.0f} ms per angle (x{t_full/t_cached:.2f})")
+    print(f"Airfoil masking         : {t_mask*1000:.0f} ms per call")
+    print(f"Max difference with the full pass: {error:.1e}")
+    print("-" * 30)
+
+def benchmark_streaming(m, p, t, grid_sizes, device, tile_size=256, source_path="pinn_airfoil_model_V2.pth"):
+    """
+    Field inference on growing grids: one whole-grid forward pass vs stream_field tiles written
+    into a memory-mapped array. Reports the peak memory (fresh process), the total time and the
+    time to the first tile. The spatial cache is disabled to measure the inference itself.
+    """
+    model = trained_model(source_path, device)
+    model.eval()
+    _, _, surface = generate_airfoil(m, p, t, device)
+    bounds = (x_min, x_max, y_min, y_max)
+    alpha = 4*np.pi/180
+    tmpdir = tempfile.mkdtemp()
+
+    def whole(grid_size):
+        def run():
+            X, Y = np.meshgrid(np.linspace(x_min, x_max, grid_size), np.linspace(y_min, y_max, grid_size))
+            x_test = torch.tensor(X.flatten()[:, None], dtype=torch.float32).to(device)
+            y_test = torch.tensor(Y.flatten()[:, None], dtype=torch.float32).to(device)
+            with torch.no_grad():
+                out = model(x_test, y_test, conditioning(model, x_test, alpha, m, p, t))
+            out[surface.contains(x_test, y_test).view(-1)] = float('nan')
+            return out.T.reshape(3, grid_size, grid_size).cpu().numpy()
+        return run
+
+    def streamed(grid_size, first=None):
+        def run():
+            out = np.lib.format.open_memmap(os.path.join(tmpdir, f"field_{grid_size}.npy"), mode='w+',
+                                            dtype=np.float32, shape=(3, grid_size, grid_size))
+            start_time = time.perf_counter()
+            for k, _ in enumerate(stream_field(model, bounds, grid_size, alpha, m, p, t, surface=surface,
+                                               tile_size=tile_size, out=out, cache=False)):
+                if k == 0 and first is not None:
+                    first.append(time.perf_counter() - start_time)
+            out.flush()
+            return out
+        return run
+
+    print("-" * 30)
+    print(f"Streaming inference benchmark (tiles of {tile_size}x{tile_size}, output memory-mapped)")
+    for grid_size in grid_sizes:
+        mem_whole = peak_memory(whole(grid_size), device)
+        mem_streamed = peak_memory(streamed(grid_size), device)
+        first = []
+        start_time = time.perf_counter()
+        field = streamed(grid_size, first)()
+        t_streamed = time.perf_counter() - start_time
+        streamed_text = f"streamed {t_streamed:6.1f} s, first tile {first[0]*1000:5.0f} ms, peak {mem_streamed:5.0f} MB"
+        if np.isnan(mem_whole):
+            # The whole-grid pass ran out of memory in its process: not repeated here
+            print(f"{grid_size:5d}^2 | whole grid out of memory | {streamed_text}")
+            continue
+        start_time = time.perf_counter()
+        reference = whole(grid_size)()
+        t_whole = time.perf_counter() - start_time
+        error = np.nanmax(np.abs(field - reference))
+        print(f"{grid_size:5d}^2 | whole grid {t_whole:6.1f} s, peak {mem_whole:6.0f} MB | {streamed_text} | max diff {error:.1e}")
+    print("-" * 30)
+
+def benchmark_derived(m, p, t, grid_size, device, source_path="pinn_airfoil_model_V2.pth"):
+    """
+    Derived fields (vorticity, Cp, stream function...) from the exact network derivatives:
+    time of the first angle (spatial Jacobian computed) and of another angle (cached), and
+    consistency with central finite differences of the predicted velocity.
+    """
+    model = trained_model(source_path, device)
+    model.eval()
+    _, _, surface = generate_airfoil(m, p, t, device)
+    bounds = (x_min, x_max, y_min, y_max)
+    dx = (x_max - x_min)/(grid_size - 1)
+    dy = (y_max - y_min)/(grid_size - 1)
+
+    start_time = time.perf_counter()
+    derived_fields(model, bounds, grid_size, 2*np.pi/180, m, p, t, surface=surface)
+    t_cold = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    fields = derived_fields(model, bounds, grid_size, 4*np.pi/180, m, p, t, surface=surface)
+    t_warm = time.perf_counter() - start_time
+
+    u, v, psi = (fields[name].astype(np.float64) for name in ('u', 'v', 'stream_function'))
+    vorticity_fd = np.gradient(v, dx, axis=1) - np.gradient(u, dy, axis=0)
+    vorticity_error = np.nanpercentile(np.abs(fields['vorticity'] - vorticity_fd), 99)
+    # dpsi/dy = u and dpsi/dx = -v, checked with finite differences of psi
+    psi_error = max(np.nanpercentile(np.abs(np.gradient(psi, dy, axis=0) - u), 99),
+                    np.nanpercentile(np.abs(np.gradient(psi, dx, axis=1) + v), 99))
+
+    print("-" * 30)
+    print(f"Derived fields benchmark ({grid_size}x{grid_size})")
+    print(f"First angle (spatial Jacobian): {t_cold:.2f} s")
+    print(f"Another angle (cached):         {t_warm:.2f} s")
+    print(f"Vorticity vs finite differences, p99 abs diff:       {vorticity_error:.2e}")
+    print(f"Stream function vs velocity, p99 abs diff:           {psi_error:.2e}")
+    print("-" * 30)
+
+def benchmark_streamlines(m, p, t, n_seeds, device, n_looped=20, source_path="pinn_airfoil_model_V2.pth"):
+    """
+    Streamlines seeded along the inlet: all the seeds integrated as one batch (RK4 and RK45)
+    vs one seed at a time (measured on n_looped seeds, extrapolated).
+    """
+    model = trained_model(source_path, device)
+    model.eval()
+    _, _, surface = generate_airfoil(m, p, t, device)
+    alpha = 4*np.pi/180
+    seeds = np.stack([np.full(n_seeds, x_min), np.linspace(y_min, y_max, n_seeds + 2)[1:-1]], axis=1)
+
+    print("-" * 30)
+    print(f"Streamline benchmark ({n_seeds} seeds, step 0.01)")
+    results = {}
+    for method in ('rk4', 'rk45'):
+        start_time = time.perf_counter()
+        results[method] = trace_streamlines(model, seeds, alpha, m, p, t, surface=surface, method=method)
+        elapsed = time.perf_counter() - start_time
+        points, offsets = results[method]
+        print(f"Batched {method:4s}: {elapsed:6.2f} s, {len(points)} points, {np.diff(offsets).mean():.0f} per streamline")
+
+    looped = seeds[np.linspace(0, n_seeds - 1, n_looped).astype(int)]
+    start_time = time.perf_counter()
+    for seed in looped:
+        trace_streamlines(model, seed[None], alpha, m, p, t, surface=surface)
+    elapsed = (time.perf_counter() - start_time)*n_seeds/n_looped
+    print(f"One seed at a time (rk4, extrapolated): {elapsed:6.1f} s")
+
+    # Same streamlines with both integrators: distance between the end points
+    ends = [points[offsets[1:] - 1] for points, offsets in results.values()]
+    print(f"RK4 vs RK45 end points, max distance: {np.abs(ends[0] - ends[1]).max():.1e}")
+    print("-" * 30)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="PINN Airfoil Benchmarks")
+    parser.add_argument('--sampling', action='store_true', help='Benchmark collocation sampling and airfoil masking')
+    parser.add_argument('--derivatives', action='store_true', help='Benchmark the Navier-Stokes residual derivative engine')
+    parser.add_argument('--lbfgs', action='store_true', help='Benchmark the fused multi-angle L-BFGS objective')
+    parser.add_argument('--batch_per_angle', type=int, default=1200, help='Points per angle of the L-BFGS batch')
+    parser.add_argument('--lbfgs_memory', type=float, default=None, help='Memory budget in MB per pass of the fused objective')
+    parser.add_argument('--adaptive', action='store_true', help='Benchmark time-to-target loss of the adaptive collocation sampler')
+    parser.add_argument('--weights', action='store_true', help='Benchmark time-to-target loss of the self-balancing loss weights')
+    parser.add_argument('--compile', action='store_true', help='Benchmark eager vs torch.compile training and inference')
+    parser.add_argument('--grid_size', type=int, default=512, help='Inference grid resolution (predict_field)')
+    parser.add_argument('--distributed', action='store_true', help='Benchmark data-parallel training scaling at 1, 2, 4 and 8 ranks')
+    parser.add_argument('--geometry', action='store_true', help='Benchmark the per-step cost of geometry-parametric training')
+    parser.add_argument('--constraints', action='store_true', help='Benchmark soft boundary losses vs hard-constrained outputs')
+    parser.add_argument('--fine_tune', action='store_true', help='Benchmark time-to-accuracy vs OpenFOAM of fine-tuning against training from scratch')
+    parser.add_argument('--encoding', action='store_true', help='Benchmark time-to-target of the Fourier vs hash-grid spatial encoders')
+    parser.add_argument('--target', type=float, default=None, help='Target validation error of the encoding benchmark (default: final error of the Fourier run)')
+    parser.add_argument('--xpinn', action='store_true', help='Benchmark domain-decomposed training against a single network')
+    parser.add_argument('--precision', action='store_true', help='Benchmark bf16 autocast training throughput and its residual accuracy guard')
+    parser.add_argument('--profile', action='store_true', help='Benchmark the overhead of the training phase profiler')
+    parser.add_argument('--forces', action='store_true', help='Benchmark the panel geometry of the lift/drag integration (calc_force)')
+    parser.add_argument('--polar', action='store_true', help='Benchmark the batched polar sweep against one calc_force call per angle')
+    parser.add_argument('--n_angles', type=int, default=100, help='Number of angles of the polar benchmark')
+    parser.add_argument('--sweep', action='store_true', help='Benchmark an angle change on a fixed inference grid with the cached spatial latent')
+    parser.add_argument('--streaming', action='store_true', help='Benchmark the peak memory of tiled field inference against a whole-grid forward pass')
+    parser.add_argument('--derived', action='store_true', help='Benchmark the derived fields (vorticity, Cp, stream function) from exact derivatives')
+    parser.add_argument('--streamlines', action='store_true', help='Benchmark the batched streamline tracer against one seed at a time')
+    parser.add_argument('--n_seeds', type=int, default=1000, help='Number of seeds of the streamline benchmark')
+    parser.add_argument('--epochs', type=int, default=300, help='AdamW epochs of the training benchmarks')
+    parser.add_argument('--iterations', type=int, default=10, help='Timed iterations per measurement')
+    parser.add_argument('--batch_size', type=int, default=18000, help='Collocation batch size')
+    args = parser.parse_args()
+
+    torch.manual_seed(42)
+    np.random.seed(42)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print(f"Benchmark on: {device}")
+
+    # NACA 2412, the geometry of pinn_airfoil_model_V2.pth
+    m, p, t = 0.02, 0.4, 0.12
+
+    if args.sampling:
+        benchmark_sampling(m, p, t, args.batch_size, args.iterations, device)
+    if args.derivatives:
+        benchmark_derivatives(m, p, t, args.batch_size, args.iterations, device)
+    if args.adaptive:
+        benchmark_adaptive(m, p, t, args.batch_size, args.epochs, device)
+    if args.weights:
+        benchmark_weights(m, p, t, args.batch_size, args.epochs, device, iterations=args.iterations)
+    if args.compile:
+        benchmark_compile(m, p, t, args.batch_size, args.grid_size, args.iterations, device)
+    if args.distributed:
+        benchmark_distributed(m, p, t, args.batch_size, args.batch_per_angle, args.iterations)
+    if args.geometry:
+        benchmark_geometry(m, p, t, args.batch_size, args.iterations, device)
+    if args.constraints:
+        benchmark_constraints(m, p, t, args.batch_size, args.batch_per_angle, args.epochs, args.iterations, device)
+    if args.fine_tune:
+        benchmark_fine_tune(m, p, t, args.batch_size, args.epochs, device)
+    if args.encoding:
+        benchmark_encoding(m, p, t, args.batch_size, args.epochs, args.iterations, device, target=args.target)
+    if args.xpinn:
+        benchmark_xpinn(m, p, t, args.batch_size, args.epochs, args.iterations, device)
+    if args.precision:
+        benchmark_precision(m, p, t, args.batch_size, args.epochs, args.iterations, device)
+    if args.profile:
+        benchmark_profiler(m, p, t, args.batch_size, args.iterations, device)
+    if args.forces:
+        benchmark_forces(m, p, t, args.iterations, device)
+    if args.polar:
+        benchmark_polar(m, p, t, args.n_angles, device)
+    if args.sweep:
+        for grid_size in (256, 512, 1024):
+            benchmark_sweep(m, p, t, grid_size, args.iterations, device)
+    if args.streaming:
+        benchmark_streaming(m, p, t, (256, 512, 1024, 2048), device)
+    if args.derived:
+        benchmark_derived(m, p, t, args.grid_size, device)
+    if args.streamlines:
+        benchmark_streamlines(m, p, t, args.n_seeds, device)
+    if args.lbfgs:
+        benchmark_lbfgs(m, p, t, args.batch_per_angle, args.iterations, device, args.lbfgs_memory)
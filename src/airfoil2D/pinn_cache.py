@@ -0,0 +1,91 @@
+import torch
+from collections import OrderedDict
+
+
+def tensor_bytes(value):
+    """
+    Memory held by a tensor or a (nested) tuple/list/dict of tensors, in bytes.
+    """
+    if torch.is_tensor(value):
+        return value.element_size() * value.nelement()
+    if isinstance(value, dict):
+        return sum(tensor_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(tensor_bytes(v) for v in value)
+    return 0
+
+class TensorCache:
+    """
+    Least-recently-used cache of tensors bounded by the memory they hold.
+
+    Used for inference results that only depend on the point set, e.g. the spatial latent of
+    the PINN, which is reused for every angle of attack. Entries larger than the bound are
+    not stored (counted as bypasses); callers check admit first to skip the cached path.
+    """
+    def __init__(self, max_bytes):
+        """
+        Args:
+            max_bytes (int): Memory bound of the cached tensors in bytes (0 disables the cache).
+        """
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def admit(self, nbytes):
+        """
+        Whether an entry of nbytes can be stored. A refusal is counted as a bypass.
+        """
+        if nbytes > self.max_bytes:
+            self.bypasses += 1
+            return False
+        return True
+
+    def get(self, key):
+        """
+        Cached value of key, or None.
+        """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value[0]
+
+    def put(self, key, value):
+        """
+        Stores value under key, evicting the least recently used entries to stay within the bound.
+
+        Returns:
+            The value, so a computation can be cached inline.
+        """
+        size = tensor_bytes(value)
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[1]
+        if size > self.max_bytes:
+            self.bypasses += 1
+            return value
+        while self.entries and self.bytes + size > self.max_bytes:
+            self.bytes -= self.entries.popitem(last=False)[1][1]
+        self.entries[key] = (value, size)
+        self.bytes += size
+        return value
+
+    def get_or_compute(self, key, fn):
+        """
+        Cached value of key, computing and storing fn() on a miss.
+        """
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, fn())
+        return value
+
+    def clear(self):
+        """
+        Drops every entry.
+        """
+        self.entries.clear()
+        self.bytes = 0
@@ -0,0 +1,122 @@
+import torch
+import numpy as np
+import random
+import os
+import queue
+import threading
+
+
+def snapshot(state):
+    """
+    Detached CPU copy of a (nested) training state, safe to hand over to another thread
+    while the training loop keeps updating the original tensors.
+
+    Args:
+        state: Tensor, dict, list, tuple or plain Python value.
+
+    Returns:
+        The same structure with every tensor cloned to the CPU.
+    """
+    if torch.is_tensor(state):
+        return state.detach().to('cpu', copy=True)
+    if isinstance(state, dict):
+        return {k: snapshot(v) for k, v in state.items()}
+    if isinstance(state, (list, tuple)):
+        return type(state)(snapshot(v) for v in state)
+    return state
+
+def rng_state():
+    """
+    Returns the states of every random number generator used during training.
+    """
+    state = {
+        "torch": torch.get_rng_state(),
+        "numpy": np.random.get_state(),
+        "random": random.getstate(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+def set_rng_state(state):
+    """
+    Restores the generator states returned by rng_state.
+    """
+    torch.set_rng_state(state["torch"])
+    np.random.set_state(state["numpy"])
+    random.setstate(state["random"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+def load_checkpoint(path):
+    """
+    Loads a training checkpoint written by CheckpointWriter.
+
+    Args:
+        path (str): Checkpoint file.
+
+    Returns:
+        dict: The checkpoint, or None if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    # The checkpoint holds Python and numpy RNG states, not only tensors
+    return torch.load(path, map_location='cpu', weights_only=False)
+
+
+class CheckpointWriter:
+    """
+    Writes training checkpoints from a background thread.
+
+    save() only takes a CPU snapshot of the state and queues it; the worker thread serializes
+    it to a temporary file and atomically renames it over the checkpoint, so a kill at any time
+    leaves either the previous or the new checkpoint on disk, never a truncated one.
+    If the worker is still busy, a pending snapshot is replaced by the newer one.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Checkpoint file.
+        """
+        self.path = path
+        self.queue = queue.Queue(maxsize=1)
+        self.error = None
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def _worker(self):
+        while True:
+            state = self.queue.get()
+            if state is None:
+                break
+            try:
+                tmp_path = self.path + ".tmp"
+                torch.save(state, tmp_path)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                self.error = e
+
+    def save(self, state):
+        """
+        Queues a checkpoint of the given training state.
+
+        Args:
+            state (dict): Training state (tensors may live on any device).
+        """
+        if self.error is not None:
+            raise RuntimeError(f"Checkpoint writing failed: {self.error}")
+        state = snapshot(state)
+        try:
+            self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.queue.put(state)
+
+    def close(self):
+        """
+        Waits for the last queued checkpoint to be written and stops the worker.
+        """
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise RuntimeError(f"Checkpoint writing failed: {self.error}")
@@ -0,0 +1,139 @@
+import torch
+import numpy as np
+from src.airfoil2D.PINN_Airfoil import surface_derivatives, fits_feature_cache
+
+
+# Quantities computed by derived_fields, besides the primary (u, v, p) fields
+DERIVED_FIELDS = ('velocity_magnitude', 'vorticity', 'cp', 'total_pressure_loss', 'stream_function')
+DERIVED_LABELS = {
+    'velocity_magnitude': '|V| (m/s)',
+    'vorticity': 'Vorticity (1/s)',
+    'cp': 'Cp',
+    'total_pressure_loss': 'Total pressure loss coefficient',
+    'stream_function': 'Stream function (m²/s)',
+}
+# Derived quantities that need the spatial derivatives of the network (the others follow from u, v, p)
+GRADIENT_FIELDS = ('vorticity', 'stream_function')
+
+def _cumulative_integral(f, df, h):
+    """
+    Running integral of f along axis 0 from the first sample, using the values and the exact
+    derivatives at the samples (corrected trapezoid rule, fourth order).
+    """
+    steps = h/2*(f[1:] + f[:-1]) + h**2/12*(df[:-1] - df[1:])
+    return np.concatenate([np.zeros_like(f[:1]), np.cumsum(steps, axis=0)])
+
+def stream_function(u, v, du_dy, dv_dx, dx, dy, inside=None):
+    """
+    Stream function on a regular grid (dpsi/dy = u, dpsi/dx = -v), zero at the lower left corner.
+
+    It is integrated along the bottom row and up every column. Inside the airfoil the network
+    field has no physical meaning and is not divergence-free, so with the inside mask the points
+    above the airfoil are integrated down from the top row instead, which is reached through
+    the left column.
+
+    Args:
+        u, v (np.ndarray): Velocity components [Ny, Nx], ordered as np.meshgrid(x, y).
+        du_dy, dv_dx (np.ndarray): Their exact derivatives along the integration paths.
+        dx, dy (float): Grid spacings.
+        inside (np.ndarray, optional): Boolean mask of the points inside the airfoil.
+
+    Returns:
+        np.ndarray: psi [Ny, Nx] (float64).
+    """
+    u, v, du_dy, dv_dx = (np.asarray(a, dtype=np.float64) for a in (u, v, du_dy, dv_dx))
+    bottom = -_cumulative_integral(v[0], dv_dx[0], dx)
+    psi = bottom + _cumulative_integral(u, du_dy, dy)
+    if inside is None or not inside.any():
+        return psi
+
+    top = psi[-1, 0] - _cumulative_integral(v[-1], dv_dx[-1], dx)
+    # Integral from y_max down to each row (negative spacing)
+    down = top + _cumulative_integral(u[::-1], du_dy[::-1], -dy)[::-1]
+    above = np.maximum.accumulate(inside, axis=0) & ~inside
+    return np.where(above, down, psi)
+
+def pointwise_fields(u, v, pressure, rho=1.0, V_inf=0.3):
+    """
+    Derived quantities computed point by point from the primary fields, without the network
+    (see derived_fields). NaN points (inside the airfoil) stay NaN.
+
+    Returns:
+        dict: 'velocity_magnitude', 'cp' and 'total_pressure_loss', arrays of the shape of u.
+    """
+    q_inf = 0.5*rho*V_inf**2
+    speed2 = u**2 + v**2
+    return {'velocity_magnitude': np.sqrt(speed2),
+            'cp': pressure/q_inf,
+            'total_pressure_loss': (q_inf - pressure - 0.5*rho*speed2)/q_inf}
+
+def derived_fields(model, bounds, grid_size, alpha, m=None, p=None, t=None, surface=None, tile_size=128,
+                   rho=1.0, V_inf=0.3, cache=True):
+    """
+    Primary and derived flow fields on a regular grid, from the exact spatial derivatives of
+    the network (surface_derivatives) evaluated tile by tile.
+
+    - velocity_magnitude: |V| = sqrt(u² + v²)
+    - vorticity: dv/dx - du/dy
+    - cp: p / (0.5 rho V_inf²), the outlet pressure being the reference
+    - total_pressure_loss: (p0_inf - p0) / (0.5 rho V_inf²) with p0 = p + 0.5 rho |V|²
+    - stream_function: see stream_function, from the exact derivatives (no finite difference)
+
+    The primary fields come out of the same pass, so a caller needing both runs the network once.
+    A caller that already has u, v, p only needs this pass for the GRADIENT_FIELDS (see
+    pointwise_fields for the others).
+    With cache, the spatial Jacobian of each tile is kept on the model (see surface_derivatives)
+    when the tiles of the whole grid fit in the cache: another angle on the same grid only runs
+    the output layers. Otherwise the grid is evaluated without the cache (see stream_field).
+
+    Args:
+        model (PINN or XPINN): The neural network model.
+        bounds (tuple): Grid extents (x_min, x_max, y_min, y_max).
+        grid_size (int): Number of points per direction.
+        alpha (float): Angle of attack in radians.
+        m, p, t (float, optional): NACA 4-digit parameters, required by a geometric model.
+        surface (AirfoilMask, optional): Points inside the airfoil are set to NaN.
+        tile_size (int): Tile edge in grid points.
+        rho (float): Fluid density.
+        V_inf (float): Freestream velocity.
+        cache (bool): Cache the spatial Jacobian of the tiles.
+
+    Returns:
+        dict: 'u', 'v', 'p' and the DERIVED_FIELDS, float32 arrays [grid_size, grid_size]
+              ordered as np.meshgrid(x, y).
+    """
+    names = ('u', 'v', 'p', 'du_dy', 'dv_dx')
+    raw = {name: np.empty((grid_size, grid_size), dtype=np.float32) for name in names}
+    inside = np.zeros((grid_size, grid_size), dtype=bool)
+    x_grid = np.linspace(bounds[0], bounds[1], grid_size)
+    y_grid = np.linspace(bounds[2], bounds[3], grid_size)
+    device = next(model.parameters()).device
+    angle = torch.tensor([float(alpha)], device=device)
+    cache = cache and fits_feature_cache(model, grid_size**2, order=1)
+
+    model.eval()
+    for i in range(0, grid_size, tile_size):
+        for j in range(0, grid_size, tile_size):
+            rows, cols = slice(i, min(i + tile_size, grid_size)), slice(j, min(j + tile_size, grid_size))
+            X, Y = np.meshgrid(x_grid[cols], y_grid[rows])
+            x_tile = torch.tensor(X.reshape(-1, 1), dtype=torch.float32, device=device)
+            y_tile = torch.tensor(Y.reshape(-1, 1), dtype=torch.float32, device=device)
+
+            with torch.no_grad():
+                key = ('tile', tuple(bounds), grid_size, i, j, tile_size) if cache else None
+                out, d_dx, d_dy = (d[0].cpu().numpy().reshape(X.shape + (3,))
+                                   for d in surface_derivatives(model, x_tile, y_tile, angle, m, p, t, cache_key=key))
+            tile = (out[..., 0], out[..., 1], out[..., 2], d_dy[..., 0], d_dx[..., 1])
+            for name, values in zip(names, tile):
+                raw[name][rows, cols] = values
+            if surface is not None:
+                inside[rows, cols] = surface.contains(x_tile, y_tile).cpu().numpy().reshape(X.shape)
+
+    u, v, pressure = raw['u'], raw['v'], raw['p']
+    fields = {'u': u, 'v': v, 'p': pressure, **pointwise_fields(u, v, pressure, rho, V_inf),
+              'vorticity': raw['dv_dx'] - raw['du_dy'],
+              'stream_function': stream_function(u, v, raw['du_dy'], raw['dv_dx'], x_grid[1] - x_grid[0],
+                                                 y_grid[1] - y_grid[0], inside).astype(np.float32)}
+    for values in fields.values():
+        values[inside] = np.nan
+    return fields
@@ -0,0 +1,131 @@
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+import numpy as np
+import os
+import sys
+import socket
+
+
+def get_rank():
+    """
+    Rank of the current process (0 when not running distributed).
+    """
+    return dist.get_rank() if dist.is_initialized() else 0
+
+def get_world_size():
+    """
+    Number of training processes (1 when not running distributed).
+    """
+    return dist.get_world_size() if dist.is_initialized() else 1
+
+def shard(items, rank=None, world_size=None):
+    """
+    Contiguous share of a list (e.g. the L-BFGS angles) owned by a rank.
+    Every rank must own at least one item: an empty share would give NaN local means, which
+    the gradient all-reduce would then average in.
+
+    Returns:
+        np.ndarray: The items of the rank.
+    """
+    rank = get_rank() if rank is None else rank
+    world_size = get_world_size() if world_size is None else world_size
+    items = np.asarray(items)
+    if world_size > len(items):
+        raise ValueError(f"Cannot shard {len(items)} items over {world_size} ranks (at most one rank per item)")
+    return np.array_split(items, world_size)[rank]
+
+def broadcast_model(model, src=0):
+    """
+    Copies the parameters and buffers (input normalization included) of rank src to all ranks.
+    """
+    if get_world_size() == 1:
+        return
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        dist.broadcast(tensor.data, src)
+
+def all_reduce_(tensor, average=False):
+    """
+    In-place sum (or mean) of a tensor over all ranks. No-op when not running distributed.
+
+    Returns:
+        torch.Tensor: The reduced tensor.
+    """
+    if get_world_size() == 1:
+        return tensor
+    dist.all_reduce(tensor)
+    if average:
+        tensor /= get_world_size()
+    return tensor
+
+def all_gather(tensor):
+    """
+    Tensors of the same shape from all ranks, stacked in rank order.
+
+    Returns:
+        torch.Tensor: [world_size, *tensor.shape] (the tensor alone when not running distributed).
+    """
+    if get_world_size() == 1:
+        return tensor.unsqueeze(0)
+    gathered = [torch.empty_like(tensor) for _ in range(get_world_size())]
+    dist.all_gather(gathered, tensor.contiguous())
+    return torch.stack(gathered)
+
+def all_gather_object(obj):
+    """
+    Picklable objects (e.g. state dicts) from all ranks, in rank order.
+
+    Returns:
+        list: One object per rank.
+    """
+    if get_world_size() == 1:
+        return [obj]
+    gathered = [None] * get_world_size()
+    dist.all_gather_object(gathered, obj)
+    return gathered
+
+def all_reduce_gradients(model, average=True):
+    """
+    Sums (or averages) the parameter gradients over all ranks with a single flattened all-reduce.
+    """
+    if get_world_size() == 1:
+        return
+    params = [param for param in model.parameters() if param.requires_grad]
+    grads = [param.grad if param.grad is not None else torch.zeros_like(param) for param in params]
+    flat = torch.cat([grad.reshape(-1) for grad in grads])
+    all_reduce_(flat, average=average)
+    offset = 0
+    for param in params:
+        n = param.numel()
+        param.grad = flat[offset:offset + n].view_as(param)
+        offset += n
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _worker(rank, world_size, port, threads, fn, args, kwargs):
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(port)
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+    torch.set_num_threads(threads)
+    if rank != 0:
+        # Only rank 0 reports progress
+        sys.stdout = open(os.devnull, "w")
+    try:
+        fn(*args, **kwargs)
+    finally:
+        dist.destroy_process_group()
+
+def launch(world_size, fn, *args, **kwargs):
+    """
+    Runs fn(*args, **kwargs) in world_size processes on localhost, joined in a gloo process group.
+    The intra-op threads of the machine are split between the ranks.
+
+    Args:
+        world_size (int): Number of processes.
+        fn (callable): Module-level function run by every rank (e.g. train).
+    """
+    threads = max(1, (os.cpu_count() or 1) // world_size)
+    mp.spawn(_worker, args=(world_size, _free_port(), threads, fn, args, kwargs), nprocs=world_size, join=True)
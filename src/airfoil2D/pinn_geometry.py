@@ -0,0 +1,234 @@
+import torch
+import numpy as np
+import functools
+from src.airfoil2D.generate_naca import generate_naca4
+
+
+class AirfoilMask:
+    """
+    Vectorized point-in-airfoil classifier working directly on tensors.
+
+    The closed airfoil contour is split once into x-monotone chains. The even-odd
+    test with a vertical ray then reduces to one batched searchsorted per chain,
+    so a whole batch of points is classified without any per-point shapely call.
+    """
+    def __init__(self, x_airfoil, y_airfoil, device='cpu'):
+        """
+        Builds the chain tables from the airfoil contour.
+
+        Args:
+            x_airfoil, y_airfoil (torch.Tensor or np.ndarray): Airfoil contour points.
+            device (torch.device): Computing device for the tables.
+        """
+        x_s = torch.as_tensor(x_airfoil).detach().cpu().numpy().astype(np.float64).ravel()
+        y_s = torch.as_tensor(y_airfoil).detach().cpu().numpy().astype(np.float64).ravel()
+
+        # Close the contour and split it into runs where x is strictly monotone
+        x_s = np.append(x_s, x_s[0])
+        y_s = np.append(y_s, y_s[0])
+        sign = np.sign(np.diff(x_s))
+        breaks = np.flatnonzero(sign[1:] != sign[:-1]) + 1
+
+        chains = []
+        for run in np.split(np.arange(len(sign)), breaks):
+            if sign[run[0]] == 0:
+                # Vertical edges never cross a vertical ray
+                continue
+            cx = x_s[run[0]:run[-1] + 2]
+            cy = y_s[run[0]:run[-1] + 2]
+            if sign[run[0]] < 0:
+                cx, cy = cx[::-1], cy[::-1]
+            chains.append((cx, cy))
+
+        n_knots = max(len(cx) for cx, _ in chains)
+        knots_x = np.full((len(chains), n_knots), np.inf)
+        knots_y = np.zeros((len(chains), n_knots))
+        slope = np.zeros((len(chains), n_knots))
+        length = np.zeros(len(chains), dtype=np.int64)
+        for i, (cx, cy) in enumerate(chains):
+            knots_x[i, :len(cx)] = cx
+            knots_y[i, :len(cy)] = cy
+            slope[i, :len(cx) - 1] = np.diff(cy) / np.diff(cx)
+            length[i] = len(cx)
+
+        self.knots_x = torch.tensor(knots_x, dtype=torch.float32, device=device)
+        self.knots_y = torch.tensor(knots_y, dtype=torch.float32, device=device)
+        self.slope = torch.tensor(slope, dtype=torch.float32, device=device)
+        self.length = torch.tensor(length, device=device).view(-1, 1)
+
+    def contains(self, x, y):
+        """
+        Classifies points as inside (True) or outside (False) the airfoil.
+
+        Args:
+            x, y (torch.Tensor): Point coordinates, any matching shape.
+
+        Returns:
+            torch.Tensor: Boolean tensor with the shape of x.
+        """
+        shape = x.shape
+        px = x.detach().reshape(1, -1).to(self.knots_x.dtype)
+        py = y.detach().reshape(1, -1).to(self.knots_x.dtype)
+        px = px.expand(self.knots_x.shape[0], -1).contiguous()
+
+        # Segment [x_i, x_i+1) of every chain that spans each query abscissa
+        idx = torch.searchsorted(self.knots_x, px, right=True) - 1
+        valid = (idx >= 0) & (idx < self.length - 1)
+        idx = idx.clamp(0, self.knots_x.shape[1] - 1)
+
+        y_chain = torch.gather(self.knots_y, 1, idx) + (px - torch.gather(self.knots_x, 1, idx)) * torch.gather(self.slope, 1, idx)
+        crossings = (valid & (y_chain > py)).sum(dim=0)
+
+        return (crossings % 2 == 1).reshape(shape)
+
+    def to(self, device):
+        """
+        Moves the chain tables to the given device.
+
+        Returns:
+            AirfoilMask: The classifier instance on the device.
+        """
+        self.knots_x = self.knots_x.to(device)
+        self.knots_y = self.knots_y.to(device)
+        self.slope = self.slope.to(device)
+        self.length = self.length.to(device)
+        return self
+
+
+def naca4_batch(m, p, t, n_points=100, device='cpu'):
+    """
+    Batched NACA 4-digit generator, the tensor counterpart of generate_naca4.
+
+    Args:
+        m, p, t (array-like or torch.Tensor): Max camber, camber position and thickness,
+                                              as chord fractions, one value per geometry [G].
+        n_points (int): Number of chordwise stations per surface.
+        device (torch.device): Computing device.
+
+    Returns:
+        tuple: (x, y) contours [G, 2*n_points - 1], ordered as generate_naca4
+               (upper surface from the trailing edge, then lower surface).
+    """
+    m, p, t = (torch.as_tensor(v, dtype=torch.float32, device=device).view(-1, 1) for v in (m, p, t))
+    x = torch.linspace(0, 1, n_points, device=device).view(1, -1)
+
+    yt = 5 * t * (0.2969 * torch.sqrt(x) - 0.1260 * x - 0.3516 * x**2 + 0.2843 * x**3 - 0.1015 * x**4)
+
+    # Camber line in front of and behind the max camber position (zero for symmetric profiles)
+    front = x < p
+    p_front = p.clamp(min=1e-6)
+    p_back = (1 - p).clamp(min=1e-6)
+    yc = torch.where(front, m / p_front**2 * (2 * p * x - x**2), m / p_back**2 * ((1 - 2 * p) + 2 * p * x - x**2))
+    dyc_dx = torch.where(front, 2 * m / p_front**2 * (p - x), 2 * m / p_back**2 * (p - x))
+
+    theta = torch.atan(dyc_dx)
+    xu = x - yt * torch.sin(theta)
+    yu = yc + yt * torch.cos(theta)
+    xl = x + yt * torch.sin(theta)
+    yl = yc - yt * torch.cos(theta)
+
+    x_coords = torch.cat([xu.flip(1), xl[:, 1:]], dim=1)
+    y_coords = torch.cat([yu.flip(1), yl[:, 1:]], dim=1)
+    return x_coords, y_coords
+
+def check_fractions(m, p, t):
+    """
+    Rejects NACA 4-digit parameters given as digits (2, 4, 12) instead of chord fractions
+    (0.02, 0.4, 0.12): the contour would silently be a different, huge airfoil.
+    """
+    if not (0 <= m < 0.1 and 0 <= p < 1 and 0 < t < 0.5):
+        raise ValueError(f"NACA parameters must be chord fractions, e.g. (0.02, 0.4, 0.12) for a 2412; got ({m}, {p}, {t})")
+
+@functools.lru_cache(maxsize=32)
+def panel_geometry(m, p, t, n_points=1000, device='cpu'):
+    """
+    Panels of a NACA 4-digit contour for the surface force integration (calc_force): the
+    segments between consecutive points of generate_naca4. Results are cached per
+    (m, p, t, n_points, device), so repeated force evaluations only run the model.
+    The returned tensors are shared by every caller and must not be modified in place.
+
+    Args:
+        m, p, t (float): NACA 4-digit airfoil parameters.
+        n_points (int): Number of chordwise stations per surface (generate_naca4).
+        device (torch.device): Computing device.
+
+    Returns:
+        tuple: (vec_n [P, 2], dl [P, 1], x_mid [P, 1], y_mid [P, 1]): unit normals and lengths
+               of the panels (float64), and their midpoints (float32).
+    """
+    check_fractions(m, p, t)
+    x_s, y_s = generate_naca4(m, p, t, n_points)
+    vec_dx = np.diff(x_s)
+    vec_dy = np.diff(y_s)
+    dl = np.sqrt(vec_dx**2 + vec_dy**2)
+    vec_n = np.stack([vec_dy/dl, -vec_dx/dl], axis=1)
+    x_mid = (x_s[:-1] + x_s[1:])/2
+    y_mid = (y_s[:-1] + y_s[1:])/2
+
+    return (torch.tensor(vec_n, dtype=torch.float64, device=device),
+            torch.tensor(dl, dtype=torch.float64, device=device).view(-1, 1),
+            torch.tensor(x_mid, dtype=torch.float32, device=device).view(-1, 1),
+            torch.tensor(y_mid, dtype=torch.float32, device=device).view(-1, 1))
+
+def airfoil_polygon(x_airfoil, y_airfoil, n_segments=128):
+    """
+    Coarse closed polygon of an airfoil contour ordered as generate_naca4, with vertices
+    cosine-spaced along each surface so the leading and trailing edges stay resolved.
+
+    Args:
+        x_airfoil, y_airfoil (torch.Tensor or np.ndarray): Airfoil contour points.
+        n_segments (int): Number of edges along the contour (even). The edge closing the
+                          trailing edge gap is added.
+
+    Returns:
+        torch.Tensor: Vertices [n_segments + 2, 2], the first vertex repeated at the end.
+    """
+    x_s = torch.as_tensor(x_airfoil).detach().cpu().double().view(-1)
+    y_s = torch.as_tensor(y_airfoil).detach().cpu().double().view(-1)
+    half = (x_s.shape[0] - 1) // 2
+
+    theta = torch.linspace(0, np.pi, n_segments // 2 + 1, dtype=torch.float64)
+    upper = torch.round(half * (1 - torch.cos(theta)) / 2).long()
+    idx = torch.cat([upper, half + upper[1:]])
+    vertices = torch.stack([x_s[idx], y_s[idx]], dim=1).float()
+    return torch.cat([vertices, vertices[:1]])
+
+def polygon_distance(x, y, vertices, order=2):
+    """
+    Unsigned distance from points to a polygon and its spatial derivatives, in closed form.
+
+    The nearest edge is found with one batched projection over all edges. Within the
+    perpendicular band of an edge the distance is linear (zero curvature); in the wedge of a
+    vertex it is the distance to that vertex.
+
+    Args:
+        x, y (torch.Tensor): Point coordinates [N, 1].
+        vertices (torch.Tensor): Polygon vertices [S + 1, 2], closed (first vertex repeated).
+        order (int): 0 for the distance only, 2 to add the derivatives.
+
+    Returns:
+        torch.Tensor: [1, N, 1] distance for order 0, or [5, N, 1] stacked
+                      (d, d/dx, d/dy, d2/dx2, d2/dy2) for order 2.
+    """
+    start = vertices[:-1]
+    edge = vertices[1:] - start
+    length2 = (edge**2).sum(dim=1)
+
+    # Projection of every point on every edge, clamped to the edge
+    rx = x - start[:,0]
+    ry = y - start[:,1]
+    s = ((rx*edge[:,0] + ry*edge[:,1]) / length2).clamp(0, 1)
+    dx = rx - s*edge[:,0]
+    dy = ry - s*edge[:,1]
+    dist2, nearest = (dx**2 + dy**2).min(dim=1, keepdim=True)
+    d = torch.sqrt(dist2)
+    if order == 0:
+        return d.unsqueeze(0)
+
+    dx = torch.gather(dx, 1, nearest)
+    dy = torch.gather(dy, 1, nearest)
+    s = torch.gather(s, 1, nearest)
+    inv = 1 / d.clamp(min=1e-12)
+    # Curvature only in the vertex wedges, where the projection is clamped
+    vertex = ((s <= 0) | (s >= 1)).to(d.dtype)
+    return torch.stack([d, dx*inv, dy*inv, vertex*dy**2*inv**3, vertex*dx**2*inv**3])
@@ -0,0 +1,154 @@
+import torch
+import contextlib
+import json
+import time
+
+
+# Profiler receiving the phases of profile_phase (None when profiling is off)
+_active = None
+_NO_PHASE = contextlib.nullcontext()
+
+def profile_phase(name):
+    """
+    Context manager timing a phase of the training loop with the active PhaseProfiler.
+    When profiling is off it returns a shared no-op context: no timer, no allocation.
+
+    Args:
+        name (str): Phase name. Phases opened inside another one are recorded as 'outer/inner'.
+    """
+    if _active is None:
+        return _NO_PHASE
+    return _active.phase(name)
+
+class PhaseProfiler:
+    """
+    Per-phase wall time and allocations of the training loop.
+
+    Phases are marked in the code with profile_phase. Wall times come from perf_counter
+    (the device is synchronized at phase boundaries on CUDA). Allocations come from
+    torch.profiler (memory profiling) when use_torch_profiler is set, otherwise from the
+    CUDA allocator on a CUDA device; they are not tracked for a plain CPU run.
+    """
+    def __init__(self, device, use_torch_profiler=False):
+        """
+        Args:
+            device (torch.device): Computing device.
+            use_torch_profiler (bool): Also record the phases (and every operator) with torch.profiler.
+        """
+        self.device = torch.device(device)
+        self.stats = {}
+        self.events = []
+        self.stack = []
+        self.elapsed = 0.0
+        self.torch_profiler = None
+        if use_torch_profiler:
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if self.device.type == 'cuda':
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self.torch_profiler = torch.profiler.profile(activities=activities, profile_memory=True)
+
+    def _sync(self):
+        if self.device.type == 'cuda':
+            torch.cuda.synchronize()
+
+    def start(self):
+        """
+        Makes this profiler the target of profile_phase.
+        """
+        global _active
+        _active = self
+        if self.torch_profiler is not None:
+            self.torch_profiler.start()
+        self._sync()
+        self.origin = time.perf_counter()
+
+    def stop(self):
+        """
+        Stops recording (profile_phase becomes a no-op again).
+        """
+        global _active
+        self._sync()
+        self.elapsed += time.perf_counter() - self.origin
+        _active = None
+        if self.torch_profiler is not None:
+            self.torch_profiler.stop()
+
+    @property
+    def running(self):
+        """
+        True between start() and stop().
+        """
+        return _active is self
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Records one occurrence of a phase (see profile_phase).
+        """
+        self.stack.append(name)
+        full_name = "/".join(self.stack)
+        self._sync()
+        memory = torch.cuda.memory_allocated(self.device) if self.device.type == 'cuda' else 0
+        start = time.perf_counter()
+        try:
+            if self.torch_profiler is not None:
+                with torch.profiler.record_function(full_name):
+                    yield
+            else:
+                yield
+        finally:
+            self._sync()
+            end = time.perf_counter()
+            self.stack.pop()
+            allocated = torch.cuda.memory_allocated(self.device) - memory if self.device.type == 'cuda' else 0
+            count, total, total_allocated = self.stats.get(full_name, (0, 0.0, 0))
+            self.stats[full_name] = (count + 1, total + end - start, total_allocated + allocated)
+            self.events.append({"name": full_name, "ph": "X", "pid": 0, "tid": 0,
+                                "ts": (start - self.origin)*1e6, "dur": (end - start)*1e6})
+
+    def allocations(self):
+        """
+        Memory allocated per phase in bytes (torch.profiler, or CUDA allocator deltas), None if not tracked.
+        """
+        if self.torch_profiler is not None:
+            averages = {event.key: event for event in self.torch_profiler.key_averages()}
+            return {name: (averages[name].device_memory_usage if self.device.type == 'cuda' else averages[name].cpu_memory_usage)
+                    if name in averages else 0 for name in self.stats}
+        if self.device.type == 'cuda':
+            return {name: stats[2] for name, stats in self.stats.items()}
+        return None
+
+    def summary(self):
+        """
+        Summary table of the phases: calls, total and mean wall time, share of the profiled time
+        and allocated memory.
+
+        Returns:
+            str: The table.
+        """
+        allocations = self.allocations()
+        lines = [f"{'Phase':40s} {'Calls':>7s} {'Total s':>9s} {'Mean ms':>9s} {'% time':>7s} {'Alloc MB':>9s}"]
+        for name, (count, total, _) in sorted(self.stats.items()):
+            alloc = f"{allocations[name] / 1024**2:9.1f}" if allocations is not None else f"{'-':>9s}"
+            indent = "  " * name.count("/")
+            lines.append(f"{indent + name.split('/')[-1]:40s} {count:7d} {total:9.3f} {total / count * 1000:9.2f} "
+                         f"{100 * total / max(self.elapsed, 1e-12):6.1f}% {alloc}")
+        lines.append(f"{'Profiled wall time':40s} {'':7s} {self.elapsed:9.3f}")
+        return "\n".join(lines)
+
+    def export(self, trace_path, summary_path=None):
+        """
+        Writes the Chrome trace (chrome://tracing or https://ui.perfetto.dev) and the summary table.
+
+        Args:
+            trace_path (str): Trace file (.json). With torch.profiler it also holds every operator.
+            summary_path (str, optional): Text file of the summary table.
+        """
+        if self.torch_profiler is not None:
+            self.torch_profiler.export_chrome_trace(trace_path)
+        else:
+            with open(trace_path, "w") as f:
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        if summary_path is not None:
+            with open(summary_path, "w") as f:
+                f.write(self.summary() + "\n")
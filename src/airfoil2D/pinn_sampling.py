@@ -0,0 +1,209 @@
+import torch
+import numpy as np
+import random
+
+
+class CollocationPool:
+    """
+    Device-resident pool of low-discrepancy (scrambled Sobol) training points.
+
+    The exterior-only collocation points of the far field and of the near-airfoil box, and the
+    points of the four domain sides, are generated and classified once on the target device.
+    Each epoch then reads consecutive windows of the pools, so sampling needs no host round-trip,
+    no masking and no boolean-mask writes, and every seed gives a reproducible stream.
+    """
+    def __init__(self, x_airfoil, y_airfoil, surface, domain, device, pool_size=2**20, seed=0):
+        """
+        Generates the point pools.
+
+        Args:
+            x_airfoil, y_airfoil (torch.Tensor): Airfoil surface points.
+            surface (AirfoilMask): Vectorized classifier of the airfoil interior.
+            domain (tuple): (x_min, x_max, y_min, y_max) of the computational domain.
+            device (torch.device): Computing device holding the pools.
+            pool_size (int): Number of Sobol points drawn per region (rounded to a power of 2).
+            seed (int): Seed of the Sobol scrambling, the window offsets and the random angles.
+        """
+        self.x_min, self.x_max, self.y_min, self.y_max = domain
+        self.device = device
+        self.rng = random.Random(seed)
+        pool_size = 2**int(np.ceil(np.log2(pool_size)))
+
+        x_max_local = x_airfoil.max().item() + 0.1
+        x_min_local = x_airfoil.min().item() - 0.1
+        y_max_local = y_airfoil.max().item() + 0.1
+        y_min_local = y_airfoil.min().item() - 0.1
+
+        # 1. Collocation pools: far field and near-airfoil box, interior points removed once
+        self.far, self.accept_far = self._exterior_pool(surface, (self.x_min, self.x_max, self.y_min, self.y_max), pool_size, seed)
+        self.local, self.accept_local = self._exterior_pool(surface, (x_min_local, x_max_local, y_min_local, y_max_local), pool_size, seed + 1)
+
+        # 2. Boundary pools: one 1D Sobol stream along each side (0 inlet, 1 outlet, 2 bottom, 3 top)
+        self.sides = []
+        for side in range(4):
+            s = torch.quasirandom.SobolEngine(dimension=1, scramble=True, seed=seed + 2 + side).draw(pool_size).to(device)
+            if side < 2:
+                x = torch.full_like(s, self.x_min if side == 0 else self.x_max)
+                y = (self.y_max - self.y_min)*s + self.y_min
+            else:
+                x = (self.x_max - self.x_min)*s + self.x_min
+                y = torch.full_like(s, self.y_min if side == 2 else self.y_max)
+            self.sides.append(torch.cat([x, y], dim=1))
+
+        # Random start of every window so different seeds do not share their first points
+        self.cursor = {name: self.rng.randrange(pool_size) for name in ['far', 'local', 0, 1, 2, 3]}
+
+    def _exterior_pool(self, surface, box, pool_size, seed):
+        """
+        Draws pool_size Sobol points in a box and keeps the ones outside the airfoil.
+
+        Returns:
+            tuple: (points [M, 2], accepted fraction M / pool_size)
+        """
+        x_lo, x_hi, y_lo, y_hi = box
+        s = torch.quasirandom.SobolEngine(dimension=2, scramble=True, seed=seed).draw(pool_size).to(self.device)
+        points = s * torch.tensor([x_hi - x_lo, y_hi - y_lo], device=self.device) + torch.tensor([x_lo, y_lo], device=self.device)
+        exterior = ~surface.contains(points[:,0], points[:,1])
+        points = points[exterior]
+        return points, points.shape[0] / pool_size
+
+    def _take(self, name, pool, n):
+        """
+        Reads the next n points of a pool (consecutive window, wrapping around).
+        """
+        start = self.cursor[name]
+        self.cursor[name] = (start + n) % pool.shape[0]
+        if start + n <= pool.shape[0]:
+            return pool[start:start + n]
+        idx = torch.arange(start, start + n, device=self.device) % pool.shape[0]
+        return pool[idx]
+
+    def state_dict(self):
+        """
+        Returns the stream position (window cursors and angle generator) for checkpointing.
+        The pools themselves are rebuilt from the seed.
+        """
+        return {"cursor": dict(self.cursor), "rng": self.rng.getstate()}
+
+    def load_state_dict(self, state):
+        """
+        Restores a stream position returned by state_dict.
+        """
+        self.cursor = dict(state["cursor"])
+        self.rng.setstate(state["rng"])
+
+    def sample(self, batch_size, fixed_alpha=None):
+        """
+        Draws collocation points and boundary condition points for one step.
+        Point counts match the expected counts of data_generation after masking.
+
+        Args:
+            batch_size (int): Number of points to sample.
+            fixed_alpha (float, optional): Fixed AOA in radians. If None, samples randomly.
+
+        Returns:
+            tuple: Sampled coordinates and BC target values, as returned by data_generation.
+        """
+        if fixed_alpha is not None:
+            alpha_rad = fixed_alpha
+        else:
+            alpha = round(self.rng.uniform(-10, 15), 2)
+            alpha_rad = alpha * np.pi / 180
+
+        # 1. Collocation Points (Physics Loss)
+        col = torch.cat([
+            self._take('far', self.far, int(round(batch_size*self.accept_far))),
+            self._take('local', self.local, int(round(int(batch_size/3)*self.accept_local))),
+        ])
+        x_col = col[:,0:1]
+        y_col = col[:,1:2]
+
+        # 2. Boundary Points (Boundary Condition Loss): same number of points on each side
+        n_side = int(batch_size/4) // 4
+        bc = torch.cat([self._take(side, self.sides[side], n_side) for side in range(4)])
+        x_bc = bc[:,0:1]
+        y_bc = bc[:,1:2]
+        mask_side = torch.arange(4, device=self.device).repeat_interleave(n_side).view(-1,1)
+
+        u_max = 0.3
+        dirichlet = mask_side != 1
+        u_bc = torch.where(dirichlet, u_max*np.cos(alpha_rad), 1.0)
+        v_bc = torch.where(dirichlet, u_max*np.sin(alpha_rad), 0.0)
+        p_bc = torch.zeros_like(x_bc)
+
+        return x_col, y_col, x_bc, y_bc, u_bc, v_bc, p_bc, alpha_rad, mask_side
+
+
+class ResidualSampler:
+    """
+    Residual-based adaptive collocation refinement (RAD).
+
+    Every refinement, a large candidate cloud drawn from a CollocationPool is scored with a cheap
+    no-grad residual estimate, each candidate at its own random angle of attack. The adaptive
+    points are then drawn with probability proportional to residual**k / mean(residual**k) + c,
+    which concentrates them at the leading edge and in the wake where the PDE is hardest to fit.
+    """
+    def __init__(self, pool, residual_fn, n_points, n_candidates=2**15, k=1.0, c=1.0, seed=0):
+        """
+        Args:
+            pool (CollocationPool): Source of exterior candidate points.
+            residual_fn (callable): (x, y, alpha) -> residual magnitude per point [N].
+            n_points (int): Number of adaptive points kept after each refinement.
+            n_candidates (int): Size of the scored candidate cloud.
+            k (float): Exponent sharpening the residual distribution.
+            c (float): Uniform floor of the sampling density.
+            seed (int): Seed of the candidate angles and of the resampling.
+        """
+        self.pool = pool
+        self.residual_fn = residual_fn
+        self.n_points = n_points
+        self.n_candidates = n_candidates
+        self.k = k
+        self.c = c
+        self.generator = torch.Generator(device=pool.device).manual_seed(seed)
+        self.points = None
+        self.cursor = 0
+
+    def refine(self):
+        """
+        Scores a new candidate cloud and resamples the adaptive points.
+        """
+        # Candidates split between far field and near-airfoil box like the uniform batch (3:1)
+        n_local = self.n_candidates // 4
+        candidates = torch.cat([
+            self.pool._take('far', self.pool.far, self.n_candidates - n_local),
+            self.pool._take('local', self.pool.local, n_local),
+        ])
+        alpha = (torch.rand(candidates.shape[0], 1, generator=self.generator, device=self.pool.device)*25 - 10) * np.pi / 180
+
+        residual = self.residual_fn(candidates[:,0:1], candidates[:,1:2], alpha) ** self.k
+        density = residual / residual.mean() + self.c
+        idx = torch.multinomial(density, self.n_points, replacement=False, generator=self.generator)
+        self.points = candidates[idx]
+        self.cursor = 0
+
+    def state_dict(self):
+        """
+        Returns the adaptive points, their cursor and the generator state for checkpointing.
+        """
+        return {"points": self.points, "cursor": self.cursor, "generator": self.generator.get_state()}
+
+    def load_state_dict(self, state):
+        """
+        Restores a state returned by state_dict.
+        """
+        self.points = state["points"].to(self.pool.device) if state["points"] is not None else None
+        self.cursor = state["cursor"]
+        self.generator.set_state(state["generator"])
+
+    def take(self, n):
+        """
+        Reads the next n adaptive points (consecutive window, wrapping around).
+
+        Returns:
+            tuple: (x, y), each [n, 1]
+        """
+        idx = torch.arange(self.cursor, self.cursor + n, device=self.pool.device) % self.points.shape[0]
+        self.cursor = (self.cursor + n) % self.points.shape[0]
+        points = self.points[idx]
+        return points[:,0:1], points[:,1:2]
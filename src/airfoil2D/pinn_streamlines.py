@@ -0,0 +1,140 @@
+import torch
+import numpy as np
+from src.airfoil2D.PINN_Airfoil import predict, x_min, x_max, y_min, y_max
+
+
+# Butcher tableaux of the autonomous field: stage coefficients a, weights b (and the embedded
+# 4th order weights)
+RK4 = dict(a=((), (1/2,), (0, 1/2), (0, 0, 1)),
+           b=(1/6, 1/3, 1/3, 1/6))
+# Dormand-Prince 5(4)
+RK45 = dict(a=((), (1/5,), (3/40, 9/40), (44/45, -56/15, 32/9),
+               (19372/6561, -25360/2187, 64448/6561, -212/729),
+               (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+               (35/384, 0, 500/1113, 125/192, -2187/6784, 11/84)),
+            b=(35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0),
+            b_low=(5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40))
+
+def _rk_step(f, pos, h, tableau):
+    """
+    One explicit Runge-Kutta step of every row of pos with its own step h [n, 1].
+
+    Returns:
+        tuple: (new positions, error estimate or None, velocity at pos).
+    """
+    k = []
+    for a in tableau['a']:
+        stage = pos + h*sum(a_j*k_j for a_j, k_j in zip(a, k) if a_j != 0) if k else pos
+        k.append(f(stage))
+    new = pos + h*sum(b*k_i for b, k_i in zip(tableau['b'], k) if b != 0)
+    error = None
+    if 'b_low' in tableau:
+        error = h*sum((b - b_low)*k_i for b, b_low, k_i in zip(tableau['b'], tableau['b_low'], k))
+    return new, error, k[0]
+
+def pack_polylines(seed_index, points, n_seeds):
+    """
+    Packs points recorded step by step into one array of polylines.
+
+    Args:
+        seed_index (list of np.ndarray): Seed of every recorded point, one array per step.
+        points (list of np.ndarray): Recorded points [n, 2], one array per step.
+        n_seeds (int): Number of seeds.
+
+    Returns:
+        tuple: (points [K, 2] float32 grouped by seed in integration order,
+                offsets [n_seeds + 1] int64, the polyline of seed i being points[offsets[i]:offsets[i+1]]).
+    """
+    seed_index = np.concatenate(seed_index)
+    points = np.concatenate(points).astype(np.float32)
+    # Stable sort: the points of a seed stay in step order
+    order = np.argsort(seed_index, kind='stable')
+    offsets = np.zeros(n_seeds + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(seed_index, minlength=n_seeds))
+    return points[order], offsets
+
+def trace_streamlines(model, seeds, alpha, m=None, p=None, t=None, surface=None, bounds=None, step=0.01,
+                      max_steps=1000, method='rk4', tol=1e-4, normalize=True, backward=False, min_speed=1e-6):
+    """
+    Traces streamlines (or particle paths) of the PINN velocity field from a batch of seeds.
+
+    All the seeds are integrated together: every Runge-Kutta stage is one forward pass of the
+    network on the seeds still running. A seed stops when its next point leaves the domain or
+    enters the airfoil (AirfoilMask), when the velocity vanishes, or after max_steps.
+
+    Args:
+        model (PINN or XPINN): The neural network model.
+        seeds (np.ndarray or torch.Tensor): Seed points [S, 2].
+        alpha (float): Angle of attack in radians.
+        m, p, t (float, optional): NACA 4-digit parameters, required by a geometric model.
+        surface (AirfoilMask, optional): Seeds stop before entering the airfoil.
+        bounds (tuple, optional): Domain (x_min, x_max, y_min, y_max), default the training domain.
+        step (float): Step length (normalize) or time step; initial and maximal step of 'rk45'.
+        max_steps (int): Maximal number of steps (attempted steps with 'rk45').
+        method (str): 'rk4' (fixed step) or 'rk45' (Dormand-Prince, adaptive step per seed).
+        tol (float): Local error tolerance on the position of 'rk45'.
+        normalize (bool): Integrate along the unit velocity (streamlines parametrized by length,
+                          uniform point spacing) instead of the velocity (particle paths).
+        backward (bool): Integrate upstream.
+        min_speed (float): Seeds stop below this velocity magnitude.
+
+    Returns:
+        tuple: (points [K, 2] float32, offsets [S + 1] int64), see pack_polylines.
+               e.g. LineCollection(np.split(points, offsets[1:-1])) plots every streamline.
+    """
+    if method not in ('rk4', 'rk45'):
+        raise ValueError(f"Unknown integration method '{method}' (expected 'rk4' or 'rk45')")
+    tableau = RK4 if method == 'rk4' else RK45
+    if bounds is None:
+        bounds = (x_min, x_max, y_min, y_max)
+    device = next(model.parameters()).device
+    model.eval()
+    sign = -1.0 if backward else 1.0
+
+    def velocity(pos):
+        uv = predict(model, pos[:, :1], pos[:, 1:], alpha, m, p, t)[:, :2]
+        if normalize:
+            uv = uv/uv.norm(dim=1, keepdim=True).clamp_min(min_speed)
+        return sign*uv
+
+    def valid(pos):
+        ok = (pos[:, 0] >= bounds[0]) & (pos[:, 0] <= bounds[1]) & (pos[:, 1] >= bounds[2]) & (pos[:, 1] <= bounds[3])
+        if surface is not None:
+            ok &= ~surface.contains(pos[:, 0], pos[:, 1])
+        return ok
+
+    pos = torch.as_tensor(seeds, dtype=torch.float32, device=device).reshape(-1, 2)
+    n_seeds = pos.shape[0]
+    index = torch.arange(n_seeds, device=device)
+    h = torch.full((n_seeds, 1), float(step), device=device)
+
+    keep = valid(pos)
+    pos, index, h = pos[keep], index[keep], h[keep]
+    seed_index, points = [index.cpu().numpy()], [pos.cpu().numpy()]
+
+    with torch.no_grad():
+        for _ in range(max_steps):
+            if pos.shape[0] == 0:
+                break
+            new, error, k1 = _rk_step(velocity, pos, h, tableau)
+            # The first stage is the velocity at the current points (unit norm when normalized,
+            # unless the speed is below min_speed)
+            running = k1.norm(dim=1) > (0.5 if normalize else min_speed)
+
+            if error is not None:
+                ratio = error.abs().amax(dim=1, keepdim=True)/tol
+                accepted = (ratio <= 1).view(-1)
+                factor = (0.9*ratio.clamp_min(1e-10)**-0.2).clamp(0.2, 5.0)
+                h_next = (h*factor).clamp(max=float(step))
+                new = torch.where(accepted.view(-1, 1), new, pos)
+            else:
+                accepted = torch.ones_like(running)
+                h_next = h
+
+            running &= ~accepted | valid(new)
+            moved = accepted & running
+            seed_index.append(index[moved].cpu().numpy())
+            points.append(new[moved].cpu().numpy())
+            pos, index, h = new[running], index[running], h_next[running]
+
+    return pack_polylines(seed_index, points, n_seeds)
@@ -0,0 +1,74 @@
+import torch
+import numpy as np
+
+
+# Default decomposition of the [-1, 2] x [-1, 1] domain for XPINN training:
+# a near-wall band around the airfoil and the wake behind it, as (x_min, x_max, y_min, y_max)
+# boxes. The far field is everything outside the boxes.
+SUBDOMAIN_BOXES = (
+    (-0.25, 1.25, -0.25, 0.25),
+    (1.25, 2.0, -0.25, 0.25),
+)
+SUBDOMAIN_NAMES = ('near-wall', 'wake', 'far field')
+
+def subdomain_index(x, y, boxes):
+    """
+    Subdomain of each point: the first box containing it (edges included), or len(boxes)
+    for the far field.
+
+    Args:
+        x, y (torch.Tensor): Point coordinates [N, 1].
+        boxes (torch.Tensor or sequence): Subdomain boxes [B, 4] as (x_min, x_max, y_min, y_max).
+
+    Returns:
+        torch.Tensor: Subdomain index per point [N] (int64).
+    """
+    boxes = torch.as_tensor(boxes, dtype=x.dtype, device=x.device)
+    x, y = x.reshape(-1, 1).detach(), y.reshape(-1, 1).detach()
+    inside = (x >= boxes[:, 0]) & (x <= boxes[:, 1]) & (y >= boxes[:, 2]) & (y <= boxes[:, 3])
+    # Index of the first True column, B when there is none
+    inside = torch.cat([inside, torch.ones_like(inside[:, :1])], dim=1)
+    return inside.to(torch.int8).argmax(dim=1)
+
+def interface_points(boxes, bounds, n_points=512, eps=1e-4):
+    """
+    Points on the interfaces between subdomains, spread along the box edges in proportion
+    to their length. Edges on the outer boundary of the domain are not interfaces.
+    The result is deterministic, so every training process builds the same set.
+
+    Args:
+        boxes (sequence): Subdomain boxes [B, 4] as (x_min, x_max, y_min, y_max).
+        bounds (tuple): Domain (x_min, x_max, y_min, y_max).
+        n_points (int): Approximate total number of interface points.
+        eps (float): Offset used to find the subdomains on both sides of an edge.
+
+    Returns:
+        dict: 'x', 'y' [K, 1] coordinates, 'normal' [K, 2] unit normal pointing from side 'a'
+              to side 'b', and 'a', 'b' [K] the subdomain indices on both sides.
+    """
+    edges = []
+    for x0, x1, y0, y1 in boxes:
+        # (start, end, outward normal) of the 4 edges
+        edges += [((x0, y0), (x1, y0), (0.0, -1.0)), ((x1, y0), (x1, y1), (1.0, 0.0)),
+                  ((x1, y1), (x0, y1), (0.0, 1.0)), ((x0, y1), (x0, y0), (-1.0, 0.0))]
+    total = sum(np.hypot(end[0] - start[0], end[1] - start[1]) for start, end, _ in edges)
+
+    points, normals = [], []
+    for start, end, normal in edges:
+        length = np.hypot(end[0] - start[0], end[1] - start[1])
+        n = max(2, int(round(n_points * length / total)))
+        # Cell-centered spacing: no point on the box corners
+        s = (np.arange(n) + 0.5) / n
+        points.append(np.stack([start[0] + s*(end[0] - start[0]), start[1] + s*(end[1] - start[1])], axis=1))
+        normals.append(np.tile(normal, (n, 1)))
+    points = torch.tensor(np.concatenate(points), dtype=torch.float32)
+    normals = torch.tensor(np.concatenate(normals), dtype=torch.float32)
+
+    x, y = points[:, 0:1], points[:, 1:2]
+    a = subdomain_index(x - eps*normals[:, 0:1], y - eps*normals[:, 1:2], boxes)
+    b = subdomain_index(x + eps*normals[:, 0:1], y + eps*normals[:, 1:2], boxes)
+    outside = ((x + eps*normals[:, 0:1] < bounds[0]) | (x + eps*normals[:, 0:1] > bounds[1])
+               | (y + eps*normals[:, 1:2] < bounds[2]) | (y + eps*normals[:, 1:2] > bounds[3])).view(-1)
+    # An edge shared by two boxes is generated by both: keep it once
+    keep = (a < b) & ~outside
+    return {'x': x[keep], 'y': y[keep], 'normal': normals[keep], 'a': a[keep], 'b': b[keep]}
@@ -14,16 +14,19 @@ if str(AIRFOIL_DIR) not in sys.path:
 # --- CONSTANTS ---
 MODEL_PATH = ROOT_DIR / "pinn_airfoil_model_V2.pth"
 
+# Opt-in torch.compile of the PINN (PINN_COMPILE=1), eager fallback on failure
+COMPILE_MODEL = os.environ.get("PINN_COMPILE", "0") == "1"
+
 # Physics/Domain
 X_MIN, X_MAX = -1.0, 2.0
 Y_MIN, Y_MAX = -1.0, 1.0
 RHO = 1.0
 MU = 0.01
 
-# Default Airfoil (NACA 2412)
-DEFAULT_M = 2
-DEFAULT_P = 4
-DEFAULT_T = 12
+# Default Airfoil (NACA 2412), as chord fractions: max camber, its position, max thickness
+DEFAULT_M = 0.02
+DEFAULT_P = 0.4
+DEFAULT_T = 0.12
 
 if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
\ No newline at end of file
@@ -1,17 +1,31 @@
 import streamlit as st 
 import numpy as np
-from core.pinn_model import predict_field
+from core.pinn_model import predict_field, predict_derived, predict_streamlines
 from src.airfoil2D.PINN_Airfoil import calc_force
 from config import MU, RHO
 
 @st.cache_data(ttl=3600)
-def compute_field_cached(_model, alpha_deg: float, m: int, p: int, t: int, grid_size: int, device: str):
+def compute_field_cached(_model, alpha_deg: float, m: float, p: float, t: float, grid_size: int, device: str):
     """
     Cached function to compute flow fields. 
     """
     return predict_field(_model, alpha_deg, m, p, t, grid_size, device)
 
-def compute_aerodynamics_coeffs(model, alpha_deg: float, m: int, p: int, t: int, device: str): 
+@st.cache_data(ttl=3600)
+def compute_derived_cached(_model, alpha_deg: float, m: float, p: float, t: float, grid_size: int, device: str):
+    """
+    Cached function to compute the derived flow quantities (see predict_derived).
+    """
+    return predict_derived(_model, alpha_deg, m, p, t, grid_size, device)
+
+@st.cache_data(ttl=3600)
+def compute_streamlines_cached(_model, alpha_deg: float, m: float, p: float, t: float, device: str):
+    """
+    Cached function to trace the streamlines (see predict_streamlines).
+    """
+    return predict_streamlines(_model, alpha_deg, m, p, t, device)
+
+def compute_aerodynamics_coeffs(model, alpha_deg: float, m: float, p: float, t: float, device: str): 
     """
     Computes Lift (Cl) and Drag (Cd) coefficients using the PINN's physics-informed force calculation.
     """
@@ -1,7 +1,6 @@
 import streamlit as st
 import torch 
 import numpy as np
-from shapely.geometry import Point
 import sys
 import os
 
@@ -9,23 +8,32 @@ import os
 from config import X_MIN, X_MAX, Y_MIN, Y_MAX
 
 # Import Model architecture and utils from airfoil2D
-from src.airfoil2D.PINN_Airfoil import PINN, generate_airfoil
+from src.airfoil2D.PINN_Airfoil import load_model, stream_field, generate_airfoil, compile_model
+from src.airfoil2D.pinn_derived import derived_fields, GRADIENT_FIELDS
+from src.airfoil2D.pinn_streamlines import trace_streamlines
 
 @st.cache_resource
-def load_pinn_model(model_path: str, device: str):
+def load_pinn_model(model_path: str, device: str, compile: bool = False):
     """
     Loads the PINN model weights and sets to eval mode.
     Cached by streamlit to avoid reloading on every interaction.
+    With compile=True the forward and derivative passes are compiled once (eager fallback).
+    Single-airfoil, geometric (NACA-parametric) and domain-decomposed (XPINN) checkpoints are recognised.
     """
-    model = PINN().to(device)
-    model.load_state_dict(torch.load(model_path, map_location=device))
+    model = load_model(model_path, device)
     model.eval()
+    if compile:
+        compile_model(model)
     return model
 
 def predict_field(model, alpha_deg, m, p, t, grid_size, device): 
     """
     Inference function for the PINN model.
     Returns the predicted fields (u, v, p) on a grid, masked by the airfoil.
+    With an XPINN each grid point is predicted by the network of its subdomain (stitched field).
+    The grid is evaluated tile by tile (bounded memory) and the spatial latent of each tile
+    is cached on the model, so changing the angle only runs the parametric branch and the
+    output layers.
     """
     # Grid for global visualization
     x_grid = np.linspace(X_MIN, X_MAX, grid_size)
@@ -34,49 +42,49 @@ def predict_field(model, alpha_deg, m, p, t, grid_size, device):
 
     alpha_rad = alpha_deg * np.pi / 180
 
-    # Convert to tensors for prediction
-    x_test = torch.tensor(X.flatten()[:, None], dtype=torch.float32).to(device)
-    y_test = torch.tensor(Y.flatten()[:, None], dtype=torch.float32).to(device)
-
-    x_test_np = x_test.detach().cpu().numpy()
-    y_test_np = y_test.detach().cpu().numpy()
-
     # Generate airfoil geometry for masking
     x_airfoil, y_airfoil, surface = generate_airfoil(m, p, t, device)
 
-    # Prediction
-    model.eval()
-    with torch.no_grad():
-        # Predict fields
-        out = model(x_test, y_test, torch.full_like(x_test, alpha_rad)).cpu().numpy()
-        u_pred = out[:, 0:1].reshape(grid_size, grid_size)
-        v_pred = out[:, 1:2].reshape(grid_size, grid_size)
-        p_pred = out[:, 2:3].reshape(grid_size, grid_size)
-
-        # Masking logic
-        # Optimize masking: only check points near the airfoil
-        mask_grid = np.array([surface.contains(Point(val_x, val_y)) for val_x, val_y in zip(x_test_np.flatten(), y_test_np.flatten())])
-        mask_2d = mask_grid.reshape(grid_size, grid_size)
-        
-        u_pred_masked = u_pred.copy()
-        u_pred_masked[mask_2d] = np.nan
-
-        v_pred_masked = v_pred.copy()
-        v_pred_masked[mask_2d] = np.nan
-
-        p_pred_masked = p_pred.copy()
-        p_pred_masked[mask_2d] = np.nan
+    # Prediction, points inside the airfoil set to NaN
+    field = np.empty((3, grid_size, grid_size), dtype=np.float32)
+    for _ in stream_field(model, (X_MIN, X_MAX, Y_MIN, Y_MAX), grid_size, alpha_rad, m, p, t,
+                          surface=surface, out=field):
+        pass
 
     # Convert tensors back to numpy for visualization
     x_airfoil_np = x_airfoil.cpu().detach().numpy()
     y_airfoil_np = y_airfoil.cpu().detach().numpy()
 
     return {
-        "u": u_pred_masked,
-        "v": v_pred_masked,
-        "p": p_pred_masked,
+        "u": field[0],
+        "v": field[1],
+        "p": field[2],
         "X": X,
         "Y": Y,
         "x_airfoil": x_airfoil_np,
         "y_airfoil": y_airfoil_np
-    }
\ No newline at end of file
+    }
+
+def predict_derived(model, alpha_deg, m, p, t, grid_size, device):
+    """
+    Derived quantities that need the network derivatives (GRADIENT_FIELDS: vorticity, stream
+    function) on the grid of predict_field, masked by the airfoil. Only called when one of them
+    is displayed: |V|, Cp and the total pressure loss come from u, v, p (pointwise_fields).
+    """
+    alpha_rad = alpha_deg * np.pi / 180
+    _, _, surface = generate_airfoil(m, p, t, device)
+    fields = derived_fields(model, (X_MIN, X_MAX, Y_MIN, Y_MAX), grid_size, alpha_rad, m, p, t,
+                            surface=surface)
+    return {name: fields[name] for name in GRADIENT_FIELDS}
+
+def predict_streamlines(model, alpha_deg, m, p, t, device, n_seeds=60):
+    """
+    Streamlines of the PINN velocity field seeded along the inlet, stopped at the airfoil.
+    Returns the packed polylines (points [K, 2], offsets [n_seeds + 1]) of trace_streamlines.
+    """
+    alpha_rad = alpha_deg * np.pi / 180
+    _, _, surface = generate_airfoil(m, p, t, device)
+    y_seeds = np.linspace(Y_MIN, Y_MAX, n_seeds + 2)[1:-1]
+    seeds = np.stack([np.full(n_seeds, X_MIN), y_seeds], axis=1)
+    return trace_streamlines(model, seeds, alpha_rad, m, p, t, surface=surface,
+                             bounds=(X_MIN, X_MAX, Y_MIN, Y_MAX), step=0.01, max_steps=1000)
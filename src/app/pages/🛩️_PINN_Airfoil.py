@@ -1,10 +1,12 @@
 import streamlit as st 
-from core.field_viz import compute_field_cached, compute_aerodynamics_coeffs
+from core.field_viz import compute_field_cached, compute_derived_cached, compute_streamlines_cached, compute_aerodynamics_coeffs
+from src.airfoil2D.pinn_derived import DERIVED_FIELDS, DERIVED_LABELS, GRADIENT_FIELDS, pointwise_fields
 from core.pinn_model import load_pinn_model
-from config import DEFAULT_M, DEFAULT_P, DEFAULT_T, MODEL_PATH, X_MIN, X_MAX, Y_MIN, Y_MAX 
+from config import DEFAULT_M, DEFAULT_P, DEFAULT_T, MODEL_PATH, X_MIN, X_MAX, Y_MIN, Y_MAX, COMPILE_MODEL
 import torch
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 import time
 
 st.set_page_config(
@@ -18,7 +20,7 @@ tab1,tab2 = st.tabs(
 )
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
-model = load_pinn_model(MODEL_PATH, device)
+model = load_pinn_model(MODEL_PATH, device, COMPILE_MODEL)
 
 with tab1 :
     input_alpha = st.slider("Choose the angle of attack", -10.0, 15.0, 0.1)
@@ -33,6 +35,8 @@ with tab1 :
         st.session_state.y = field["Y"]
         st.session_state.x_a = field["x_airfoil"]
         st.session_state.y_a = field["y_airfoil"]
+        st.session_state.alpha = input_alpha
+        st.session_state.grid_size = input_grid_size
         end_time = time.time()
         elapsed_time = end_time - start_time
         st.markdown(f"PINN Simulation Time : {elapsed_time} secondes")
@@ -105,5 +109,33 @@ with tab2:
         end_visu_time = time.time()
         elapsed_visu_time = end_visu_time - start_visu_time
         st.markdown(f"Plot Display Time : {elapsed_visu_time} secondes")
+
+        # --- Derived quantities (same angle and grid, the primary inference is not re-run) ---
+        st.markdown("### Derived Quantities")
+        derived_name = st.selectbox("Choose a derived quantity", DERIVED_FIELDS, format_func=DERIVED_LABELS.get)
+        show_streamlines = st.checkbox("Show streamlines")
+        if derived_name in GRADIENT_FIELDS:
+            derived = compute_derived_cached(model, st.session_state.alpha, DEFAULT_M, DEFAULT_P, DEFAULT_T,
+                                             st.session_state.grid_size, device)
+            d = derived[derived_name]
+        else:
+            d = pointwise_fields(u, v, p)[derived_name]
+        d_optimum = d[~np.isnan(d)]
+
+        fig_d, ax_d = plt.subplots(1, 1, figsize=(10, 3))
+        d_plot = ax_d.scatter(x, y, c=d, alpha=0.5, edgecolors='none', cmap="jet", marker='o', s=2,
+                              vmin=d_optimum.min(), vmax=d_optimum.max())
+        ax_d.plot(x_airfoil, y_airfoil, color='black', linewidth=2 )
+        if show_streamlines:
+            points, offsets = compute_streamlines_cached(model, st.session_state.alpha, DEFAULT_M, DEFAULT_P, DEFAULT_T, device)
+            ax_d.add_collection(LineCollection(np.split(points, offsets[1:-1]), colors='white', linewidths=0.6))
+        ax_d.set_xticks([])
+        ax_d.set_yticks([])
+        ax_d.set_xlim([X_MIN, X_MAX])
+        ax_d.set_ylim([Y_MIN, Y_MAX])
+        ax_d.set_title(f"PINN {DERIVED_LABELS[derived_name]}")
+        fig_d.colorbar(d_plot, ax=ax_d, fraction=0.046, pad=0.04)
+        plt.tight_layout()
+        st.pyplot(fig_d)
     else : 
         st.markdown("#### Press the button Run Simulation in the first tab ")    
\ No newline at end of file
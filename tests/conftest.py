@@ -0,0 +1,30 @@
+import pytest
+import torch
+import numpy as np
+from src.airfoil2D.PINN_Airfoil import PINN, generate_airfoil
+
+
+# NACA 2412 as chord fractions, the geometry of pinn_airfoil_model_V2.pth
+M, P, T = 0.02, 0.4, 0.12
+
+@pytest.fixture(autouse=True)
+def seed():
+    torch.manual_seed(0)
+    np.random.seed(0)
+
+@pytest.fixture(scope="session")
+def airfoil():
+    return generate_airfoil(M, P, T, torch.device('cpu'))
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return PINN()
+
+def points(n, x_range=(-1.0, 2.0), y_range=(-1.0, 1.0)):
+    """
+    Uniform random points [n, 1], [n, 1] in the domain.
+    """
+    x = torch.empty(n, 1).uniform_(*x_range)
+    y = torch.empty(n, 1).uniform_(*y_range)
+    return x, y
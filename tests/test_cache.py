@@ -0,0 +1,88 @@
+import torch
+import numpy as np
+from src.airfoil2D.PINN_Airfoil import predict, conditioning, stream_field
+from src.airfoil2D.pinn_cache import TensorCache, tensor_bytes
+from conftest import points
+
+
+def test_tensor_cache_evicts_least_recently_used():
+    block = torch.zeros(256)  # 1 KiB
+    cache = TensorCache(3 * tensor_bytes(block))
+    for key in 'abc':
+        cache.put(key, block.clone())
+    assert cache.get('a') is not None  # 'b' is now the least recently used
+    cache.put('d', block.clone())
+    assert cache.get('b') is None
+    assert all(cache.get(key) is not None for key in 'acd')
+    assert cache.bytes == 3 * tensor_bytes(block)
+    assert (cache.hits, cache.misses) == (4, 1)
+
+def test_tensor_cache_get_or_compute_runs_once():
+    cache = TensorCache(2**20)
+    calls = []
+    compute = lambda: calls.append(1) or torch.ones(3)
+    for _ in range(3):
+        assert torch.equal(cache.get_or_compute('key', compute), torch.ones(3))
+    assert len(calls) == 1 and cache.hits == 2
+
+def test_predict_sweep_hits_the_cache_and_matches_the_model(model):
+    x, y = points(500)
+    key = ('grid', 'test')
+    for alpha in (-0.1, 0.0, 0.1, 0.2):
+        cached = predict(model, x, y, alpha, cache_key=key)
+        with torch.no_grad():
+            reference = model(x, y, conditioning(model, x, alpha))
+        assert torch.allclose(cached, reference, atol=1e-6)
+    assert (model.feature_cache.misses, model.feature_cache.hits) == (1, 3)
+
+def test_predict_cache_is_invalidated_by_a_weight_update(model):
+    x, y = points(100)
+    before = predict(model, x, y, 0.1, cache_key=('grid', 'test'))
+    with torch.no_grad():
+        model.local_net[0].bias.add_(0.5)
+    after = predict(model, x, y, 0.1, cache_key=('grid', 'test'))
+    with torch.no_grad():
+        reference = model(x, y, conditioning(model, x, 0.1))
+    assert not torch.allclose(before, after)
+    assert torch.allclose(after, reference, atol=1e-6)
+
+def test_tensor_cache_bypasses_oversized_entries():
+    cache = TensorCache(100)
+    assert not cache.admit(101) and cache.admit(100)
+    cache.put('big', torch.zeros(100))
+    assert cache.get('big') is None
+    assert cache.bypasses == 2 and cache.bytes == 0
+
+def test_predict_bypasses_a_latent_larger_than_the_cache(model):
+    x, y = points(500)
+    model.feature_cache = TensorCache(model.latent_bytes(499))
+    for alpha in (0.0, 0.1, 0.2):
+        cached = predict(model, x, y, alpha, cache_key=('grid', 'large'))
+        with torch.no_grad():
+            assert torch.allclose(cached, model(x, y, conditioning(model, x, alpha)), atol=1e-6)
+    cache = model.feature_cache
+    assert (cache.bypasses, cache.hits, cache.misses, cache.bytes) == (3, 0, 0, 0)
+
+def test_predict_latent_size_estimate_matches_the_stored_entry(model):
+    x, y = points(300)
+    predict(model, x, y, 0.0, cache_key=('grid', 'size'))
+    assert model.feature_cache.bytes == model.latent_bytes(300)
+
+def test_stream_field_sweep_hits_every_tile(model):
+    out = [np.empty((3, 64, 64), dtype=np.float32) for _ in range(2)]
+    for alpha, field in zip((0.0, 0.1), out):
+        for _ in stream_field(model, (-1.0, 2.0, -1.0, 1.0), 64, alpha, tile_size=16, out=field):
+            pass
+    cache = model.feature_cache
+    assert (cache.misses, cache.hits, cache.bypasses) == (16, 16, 0)
+    reference = next(stream_field(model, (-1.0, 2.0, -1.0, 1.0), 64, 0.1, tile_size=64, cache=False))
+    assert np.allclose(out[1], np.stack(reference[1:]), atol=1e-6)
+
+def test_stream_field_bypasses_a_grid_larger_than_the_cache(model):
+    # Room for a few tiles but not the whole grid: an LRU sweep would evict each tile before reuse
+    model.feature_cache = TensorCache(4 * model.latent_bytes(16**2))
+    for alpha in (0.0, 0.1):
+        for _ in stream_field(model, (-1.0, 2.0, -1.0, 1.0), 64, alpha, tile_size=16):
+            pass
+    cache = model.feature_cache
+    assert (cache.misses, cache.hits, cache.bypasses, cache.bytes) == (0, 0, 2, 0)
@@ -0,0 +1,60 @@
+import torch
+import numpy as np
+import random
+from src.airfoil2D.PINN_Airfoil import PINN
+from src.airfoil2D.pinn_checkpoint import CheckpointWriter, load_checkpoint, rng_state, set_rng_state, snapshot
+
+
+def adamw_steps(model, optimizer, n_steps):
+    """
+    A few AdamW steps on freshly drawn random points (consumes the torch RNG like training).
+    """
+    for _ in range(n_steps):
+        x, y, alpha = torch.rand(64, 1), torch.rand(64, 1), torch.rand(64, 1)
+        optimizer.zero_grad()
+        model(x, y, alpha).pow(2).mean().backward()
+        optimizer.step()
+
+def test_resumed_training_matches_uninterrupted(tmp_path):
+    torch.manual_seed(0)
+    reference = PINN(hidden=16)
+    optimizer = torch.optim.AdamW(reference.parameters(), lr=1e-3)
+    adamw_steps(reference, optimizer, 3)
+
+    # Checkpoint after 3 steps, then 3 more steps without interruption
+    path = str(tmp_path / "checkpoint.pt")
+    writer = CheckpointWriter(path)
+    writer.save({"model": reference.state_dict(), "optimizer": optimizer.state_dict(), "rng": rng_state()})
+    writer.close()
+    adamw_steps(reference, optimizer, 3)
+
+    # Fresh process state: other weights and RNG, then resume from the checkpoint
+    torch.manual_seed(123)
+    resumed = PINN(hidden=16)
+    resumed_optimizer = torch.optim.AdamW(resumed.parameters(), lr=1e-3)
+    checkpoint = load_checkpoint(path)
+    resumed.load_state_dict(checkpoint["model"])
+    resumed_optimizer.load_state_dict(checkpoint["optimizer"])
+    set_rng_state(checkpoint["rng"])
+    adamw_steps(resumed, resumed_optimizer, 3)
+
+    for name, value in reference.state_dict().items():
+        assert torch.equal(value, resumed.state_dict()[name]), name
+
+def test_rng_state_round_trip():
+    state = rng_state()
+    expected = (torch.rand(3), np.random.rand(3), random.random())
+    set_rng_state(state)
+    assert torch.equal(torch.rand(3), expected[0])
+    assert np.array_equal(np.random.rand(3), expected[1])
+    assert random.random() == expected[2]
+
+def test_snapshot_is_detached_from_the_live_state():
+    weights = torch.zeros(3, requires_grad=True)
+    copy = snapshot({"w": [weights]})
+    with torch.no_grad():
+        weights.add_(1.0)
+    assert torch.equal(copy["w"][0], torch.zeros(3)) and not copy["w"][0].requires_grad
+
+def test_missing_checkpoint_loads_as_none(tmp_path):
+    assert load_checkpoint(str(tmp_path / "missing.pt")) is None
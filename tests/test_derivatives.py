@@ -0,0 +1,126 @@
+import torch
+import numpy as np
+import pytest
+from src.airfoil2D.PINN_Airfoil import (PINN, HardBoundary, calc_derivatives, taylor_derivatives, calc_loss,
+                                         calc_loss_multi, multi_angle_batch, surface_derivatives, _propagate, chunk_size_from_memory,
+                                         bf16_residual_error, enable_bf16)
+from src.airfoil2D.pinn_geometry import airfoil_polygon
+from conftest import points
+
+
+def autograd_derivatives(model, x, y, alpha):
+    """
+    Reference (out, d_dx, d_dy, d2_dx2, d2_dy2) of model(x, y, alpha) by reverse-mode autograd.
+    """
+    x = x.clone().requires_grad_(True)
+    y = y.clone().requires_grad_(True)
+    out = model(x, y, alpha)
+    first, second = [], []
+    for k in range(3):
+        d_dx, d_dy = torch.autograd.grad(out[:, k].sum(), (x, y), create_graph=True)
+        first.append((d_dx, d_dy))
+        second.append((torch.autograd.grad(d_dx.sum(), x, retain_graph=True)[0],
+                       torch.autograd.grad(d_dy.sum(), y, retain_graph=True)[0]))
+    columns = lambda values: torch.cat(values, dim=1).detach()
+    return (out.detach(), columns([f[0] for f in first]), columns([f[1] for f in first]),
+            columns([s[0] for s in second]), columns([s[1] for s in second]))
+
+@pytest.fixture
+def constrained(airfoil):
+    x_airfoil, y_airfoil, _ = airfoil
+    torch.manual_seed(0)
+    return PINN(constraint=HardBoundary(airfoil_polygon(x_airfoil, y_airfoil)))
+
+@pytest.mark.parametrize("engine", [calc_derivatives, taylor_derivatives])
+def test_derivatives_match_autograd(model, engine):
+    x, y = points(256)
+    alpha = torch.full_like(x, 0.07)
+    reference = autograd_derivatives(model, x, y, alpha)
+    for value, expected in zip(engine(model, x, y, alpha), reference):
+        assert torch.allclose(value.detach(), expected, rtol=1e-4, atol=1e-5)
+
+def test_hard_constrained_derivatives_match_autograd(constrained):
+    # Away from the polygon vertices, where the distance function is smooth
+    x, y = points(256, x_range=(-0.9, 1.9), y_range=(0.2, 0.9))
+    alpha = torch.full_like(x, -0.05)
+    reference = autograd_derivatives(constrained, x, y, alpha)
+    for value, expected in zip(calc_derivatives(constrained, x, y, alpha), reference):
+        assert torch.allclose(value.detach(), expected, rtol=1e-4, atol=1e-5)
+
+def test_surface_derivatives_match_calc_derivatives(model):
+    x, y = points(128)
+    alphas = torch.tensor([-0.1, 0.0, 0.2])
+    out, d_dx, d_dy = surface_derivatives(model, x, y, alphas)
+    for i, alpha in enumerate(alphas.tolist()):
+        expected = calc_derivatives(model, x, y, alpha, order=1)
+        for value, reference in zip((out[i], d_dx[i], d_dy[i]), expected):
+            assert torch.allclose(value.detach(), reference.detach(), rtol=1e-4, atol=1e-6)
+
+@pytest.mark.parametrize("chunk_size", [None, 700])
+def test_calc_loss_multi_matches_per_angle_loop(model, airfoil, chunk_size):
+    x_airfoil, y_airfoil, surface = airfoil
+    rho, mu = 1.0, 0.01
+    angles = np.array([-4.0, 0.0, 8.0]) * np.pi / 180
+    batch = multi_angle_batch(x_airfoil, y_airfoil, surface, angles, 400, torch.device('cpu'))
+
+    model.zero_grad()
+    fused = calc_loss_multi(batch, rho, mu, model, chunk_size=chunk_size)
+    fused_grad = [param.grad.clone() for param in model.parameters()]
+
+    # Same points, one calc_loss per angle
+    model.zero_grad()
+    total = 0
+    for angle in angles:
+        col = batch['alpha_col'].view(-1) == torch.tensor(angle, dtype=torch.float32)
+        bc = batch['alpha_bc'].view(-1) == torch.tensor(angle, dtype=torch.float32)
+        loss, *_ = calc_loss(batch['x_col'][col], batch['y_col'][col], batch['x_bc'][bc], batch['y_bc'][bc],
+                             x_airfoil, y_airfoil, batch['u_bc'][bc], batch['v_bc'][bc], batch['p_bc'][bc],
+                             rho, mu, angle, batch['side_bc'][bc].view(-1, 1), model)
+        total = total + loss / len(angles)
+    total.backward()
+
+    assert torch.isclose(fused[0], total.detach(), rtol=1e-5)
+    for value, reference in zip(fused_grad, (param.grad for param in model.parameters())):
+        assert torch.allclose(value, reference, rtol=1e-4, atol=1e-7)
+
+def test_calc_loss_multi_without_backward_at_lbfgs_iterate(model, airfoil):
+    x_airfoil, y_airfoil, surface = airfoil
+    rho, mu = 1.0, 0.01
+    batch = multi_angle_batch(x_airfoil, y_airfoil, surface, np.array([0.0, 6.0]) * np.pi / 180, 300, torch.device('cpu'))
+    optimizer = torch.optim.LBFGS(model.parameters(), max_iter=5, line_search_fn='strong_wolfe')
+
+    def closure():
+        optimizer.zero_grad()
+        return calc_loss_multi(batch, rho, mu, model)[0]
+
+    optimizer.step(closure)
+    grads = [param.grad.clone() for param in model.parameters()]
+    # Telemetry of the training loop: gradients untouched
+    telemetry = torch.stack(calc_loss_multi(batch, rho, mu, model, backward=False))
+    assert all(torch.equal(param.grad, grad) for param, grad in zip(model.parameters(), grads))
+
+    model.zero_grad()
+    reference = torch.stack(calc_loss_multi(batch, rho, mu, model))
+    assert torch.allclose(telemetry, reference, rtol=1e-5, atol=1e-8)
+
+def test_bf16_propagation_keeps_derivatives_in_fp32():
+    net = torch.nn.Sequential(torch.nn.Linear(16, 32), torch.nn.Linear(32, 8))
+    h, dh, d2h = torch.randn(100, 16), torch.randn(2, 100, 16), torch.randn(2, 100, 16)
+    _, dh_fp32, d2h_fp32 = _propagate(net, h, dh, d2h)
+    _, dh_bf16, d2h_bf16 = _propagate(net, h, dh, d2h, autocast=True)
+    # Only the values go through bf16: the tangents of a linear stack do not depend on them
+    assert dh_bf16.dtype == torch.float32 and torch.equal(dh_bf16, dh_fp32) and torch.equal(d2h_bf16, d2h_fp32)
+
+def test_bf16_guard_holds_tolerance(model):
+    x, y = points(2000)
+    probe = (x, y, torch.full_like(x, 0.05))
+    error = bf16_residual_error(model, probe, 1.0, 0.01)
+    assert error < 0.05
+    assert enable_bf16(model, probe, 1.0, 0.01, tol=0.05) == (True, error)
+    # A tolerance below the bf16 error keeps the model in fp32
+    assert enable_bf16(model, probe, 1.0, 0.01, tol=error/2) == (False, error) and not model.mixed_precision
+
+def test_chunk_size_follows_the_model_width():
+    # The activation memory per point scales with the hidden width of the trained network
+    narrow, wide = PINN(hidden=64), PINN(hidden=128)
+    assert abs(chunk_size_from_memory(100, narrow.hidden) - 2 * chunk_size_from_memory(100, wide.hidden)) <= 1
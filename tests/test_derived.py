@@ -0,0 +1,54 @@
+import torch
+import numpy as np
+from src.airfoil2D.PINN_Airfoil import stream_field
+from src.airfoil2D.pinn_cache import TensorCache
+from src.airfoil2D.pinn_derived import derived_fields, pointwise_fields, DERIVED_FIELDS, GRADIENT_FIELDS
+
+BOUNDS = (-1.0, 2.0, -1.0, 1.0)
+
+
+def test_derived_fields_return_the_primary_fields(model, airfoil):
+    _, _, surface = airfoil
+    fields = derived_fields(model, BOUNDS, 48, 0.05, surface=surface, tile_size=16)
+    assert set(DERIVED_FIELDS) <= set(fields)
+    reference = np.empty((3, 48, 48), dtype=np.float32)
+    for _ in stream_field(model, BOUNDS, 48, 0.05, surface=surface, out=reference, cache=False):
+        pass
+    for k, name in enumerate('uvp'):
+        assert np.allclose(fields[name], reference[k], atol=1e-5, equal_nan=True)
+
+def test_pointwise_fields_complete_the_gradient_fields(model, airfoil):
+    _, _, surface = airfoil
+    fields = derived_fields(model, BOUNDS, 48, 0.05, surface=surface, tile_size=16)
+    reference = np.empty((3, 48, 48), dtype=np.float32)
+    for _ in stream_field(model, BOUNDS, 48, 0.05, surface=surface, out=reference, cache=False):
+        pass
+    # The app derives these from the stream_field output, without the derivative pass
+    pointwise = pointwise_fields(*reference)
+    assert set(pointwise) | set(GRADIENT_FIELDS) == set(DERIVED_FIELDS)
+    for name, values in pointwise.items():
+        assert np.allclose(values, fields[name], rtol=1e-4, atol=1e-4, equal_nan=True)
+
+def test_derived_fields_match_finite_differences(model):
+    grid_size = 256
+    fields = derived_fields(model, BOUNDS, grid_size, 0.05, tile_size=128)
+    dx = (BOUNDS[1] - BOUNDS[0]) / (grid_size - 1)
+    dy = (BOUNDS[3] - BOUNDS[2]) / (grid_size - 1)
+    u, v, psi = (fields[name].astype(np.float64) for name in ('u', 'v', 'stream_function'))
+    vorticity = np.gradient(v, dx, axis=1) - np.gradient(u, dy, axis=0)
+    interior = (slice(2, -2), slice(2, -2))
+    scale = np.abs(vorticity[interior]).max()
+    assert np.abs(fields['vorticity'] - vorticity)[interior].max() < 0.05 * scale
+    # dpsi/dy = u, dpsi/dx = -v
+    assert np.abs(np.gradient(psi, dy, axis=0) - u)[interior].max() < 0.05 * np.abs(u).max()
+    assert np.abs(np.gradient(psi, dx, axis=1) + v)[interior].max() < 0.05 * np.abs(u).max()
+
+def test_derived_fields_sweep_reuses_the_tile_jacobians(model):
+    for alpha in (0.0, 0.1):
+        derived_fields(model, BOUNDS, 32, alpha, tile_size=16)
+    assert (model.feature_cache.misses, model.feature_cache.hits) == (4, 4)
+    # Jacobians of the whole grid larger than the cache: no thrashing, nothing stored
+    model.feature_cache = TensorCache(model.latent_bytes(32**2, order=1) - 1)
+    for alpha in (0.0, 0.1):
+        derived_fields(model, BOUNDS, 32, alpha, tile_size=16)
+    assert (model.feature_cache.hits, model.feature_cache.bytes, model.feature_cache.bypasses) == (0, 0, 2)
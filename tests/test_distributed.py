@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+
+from src.airfoil2D.pinn_distributed import shard
+
+
+@pytest.mark.parametrize("n, world_size", [(20, 1), (20, 3), (20, 20), (40, 7)])
+def test_shard_partitions_items(n, world_size):
+    items = np.arange(n)
+    shares = [shard(items, rank, world_size) for rank in range(world_size)]
+    assert all(len(share) > 0 for share in shares)
+    np.testing.assert_array_equal(np.concatenate(shares), items)
+
+def test_shard_rejects_more_ranks_than_items():
+    with pytest.raises(ValueError):
+        shard(np.arange(20), 0, 21)
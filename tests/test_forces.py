@@ -0,0 +1,35 @@
+import torch
+import numpy as np
+import pytest
+from src.airfoil2D.PINN_Airfoil import PINN, calc_force, polar, generate_airfoil
+from src.airfoil2D.pinn_geometry import panel_geometry
+from conftest import M, P, T
+
+MU, RHO = 0.01, 1.0
+
+
+@pytest.mark.parametrize("geometric", [False, True])
+def test_polar_matches_calc_force(geometric):
+    torch.manual_seed(0)
+    model = PINN(geometric=geometric)
+    device = torch.device('cpu')
+    alphas = np.array([-4.0, 0.0, 8.0]) * np.pi / 180
+    result = polar(M, P, T, alphas, MU, RHO, model, device, chunk_size=2000)
+    for i, alpha in enumerate(alphas):
+        cl, cd = calc_force(M, P, T, MU, RHO, alpha, model, device)
+        assert np.isclose(result['cl'][i], float(cl.detach()), rtol=1e-5, atol=1e-7)
+        assert np.isclose(result['cd'][i], float(cd.detach()), rtol=1e-5, atol=1e-7)
+
+def test_polar_slope_matches_finite_difference(model):
+    device = torch.device('cpu')
+    alpha, h = 0.05, 1e-3
+    result = polar(M, P, T, [alpha - h, alpha, alpha + h], MU, RHO, model, device, slope=True)
+    finite_difference = (result['cl'][2] - result['cl'][0]) / (2*h)
+    assert np.isclose(result['dcl_dalpha'][1], finite_difference, rtol=1e-2, atol=1e-4)
+
+def test_geometry_given_as_digits_is_rejected():
+    # NACA 2412 as digits would be integrated over a different, huge airfoil
+    with pytest.raises(ValueError):
+        panel_geometry(2, 4, 12)
+    with pytest.raises(ValueError):
+        generate_airfoil(2, 4, 12, torch.device('cpu'))
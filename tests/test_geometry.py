@@ -0,0 +1,45 @@
+import torch
+import numpy as np
+from shapely.geometry import Point, Polygon
+from src.airfoil2D.generate_naca import generate_naca4
+from src.airfoil2D.pinn_geometry import AirfoilMask, naca4_batch, panel_geometry
+from conftest import M, P, T, points
+
+
+def test_airfoil_mask_matches_shapely(airfoil):
+    x_airfoil, y_airfoil, surface = airfoil
+    polygon = Polygon(np.column_stack((x_airfoil.numpy().ravel(), y_airfoil.numpy().ravel())))
+    # Uniform points plus a band around the contour, where the classification is delicate
+    x, y = points(3000)
+    x_near, y_near = points(3000, x_range=(-0.05, 1.05), y_range=(-0.08, 0.1))
+    x, y = torch.cat([x, x_near]), torch.cat([y, y_near])
+
+    inside = surface.contains(x, y).view(-1).numpy()
+    reference = np.array([polygon.contains(Point(px, py)) for px, py in zip(x.view(-1).tolist(), y.view(-1).tolist())])
+    assert reference.sum() > 100
+    assert np.array_equal(inside, reference)
+
+def test_airfoil_mask_keeps_the_input_shape(airfoil):
+    _, _, surface = airfoil
+    x, y = torch.full((4, 5), 0.5), torch.zeros(4, 5)
+    inside = surface.contains(x, y)
+    assert inside.shape == (4, 5) and inside.dtype == torch.bool and inside.all()
+
+def test_naca4_batch_matches_generate_naca4():
+    cases = [(M, P, T), (0.0, 0.4, 0.12), (0.06, 0.2, 0.18)]
+    x, y = naca4_batch(*zip(*cases), n_points=200)
+    for i, case in enumerate(cases):
+        x_ref, y_ref = generate_naca4(*case, 200)
+        assert np.allclose(x[i].numpy(), x_ref, atol=1e-6)
+        assert np.allclose(y[i].numpy(), y_ref, atol=1e-6)
+
+def test_panel_geometry_matches_panel_loop():
+    vec_n, dl, x_mid, y_mid = panel_geometry(M, P, T, 1000)
+    x_s, y_s = generate_naca4(M, P, T, 1000)
+    for i in (0, 500, len(x_s) - 2):
+        dx, dy = x_s[i+1] - x_s[i], y_s[i+1] - y_s[i]
+        length = np.sqrt(dx**2 + dy**2)
+        assert np.isclose(dl[i, 0].item(), length)
+        assert np.allclose(vec_n[i].numpy(), (dy/length, -dx/length))
+        assert np.isclose(x_mid[i, 0].item(), (x_s[i] + x_s[i+1])/2, atol=1e-7)
+        assert np.isclose(y_mid[i, 0].item(), (y_s[i] + y_s[i+1])/2, atol=1e-7)